@@ -0,0 +1,276 @@
+"""Command line front end for headless servers and shell pipelines.
+
+    cat access.log | python duplicate_cli.py dedup --ignore-case | gzip > unique.log.gz
+    python duplicate_cli.py dedup --workers 8 huge.log > unique.log
+    python duplicate_cli.py dedup --approximate 0.001 firehose.log > unique.log
+    python duplicate_cli.py merge --mode count a.txt b.txt > merged.txt
+    python duplicate_cli.py sort --type alphabetical big.txt > sorted.txt
+    python duplicate_cli.py batch logs/*.txt
+
+Only the Qt-free modules are imported, so startup costs no more than the
+standard library. Input comes from the named files, or stdin when there are
+none or for '-'. dedup, merge and sort stream within --memory-limit; undecodable
+bytes are passed through unchanged.
+"""
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+import duplicate_engine
+import duplicate_files
+import duplicate_manifest
+import duplicate_report
+
+ERRORS = duplicate_files.DECODE_ERRORS
+
+
+def iter_input_lines(paths, encoding=None):
+    for path in paths or ['-']:
+        if path == '-':
+            sys.stdin.reconfigure(encoding=encoding, errors=ERRORS)
+            yield from duplicate_engine.iter_file_lines(sys.stdin)
+            continue
+        with open(path, 'r', encoding=encoding, errors=ERRORS) as file:
+            yield from duplicate_engine.iter_file_lines(file)
+
+
+def input_size_hint(paths):
+    if not paths or '-' in paths:
+        return None
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def key_from_args(args):
+    normalize = duplicate_engine.make_key_function(not args.ignore_case, args.ignore_whitespace, args.unicode)
+    if args.regex:
+        return duplicate_engine.regex_key_function(args.regex, normalize=normalize)
+    return normalize
+
+
+def write_lines(lines, encoding):
+    sys.stdout.reconfigure(encoding=encoding, errors=ERRORS, newline='\n', line_buffering=False)
+    write = sys.stdout.write
+    for line in lines:
+        write(line)
+        write('\n')
+    sys.stdout.flush()
+
+
+def _report(args, total_lines, unique_lines):
+    if args.stats:
+        print(f"{total_lines} lines, {unique_lines} unique, {total_lines - unique_lines} duplicates", file=sys.stderr)
+
+
+def error_rate(value):
+    rate = float(value)
+    if not 0 < rate < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not between 0 and 1")
+    return rate
+
+
+def seen_set_from_args(args):
+    if args.fingerprint:
+        return duplicate_engine.FingerprintSet(args.fingerprint)
+    if args.approximate:
+        return duplicate_engine.BloomFilter.for_memory(args.memory_limit, args.approximate)
+    return None
+
+
+def run_dedup(args):
+    if args.workers > 1:
+        return run_parallel_dedup(args)
+    seen = seen_set_from_args(args)
+    if seen is not None:
+        return run_compact_dedup(args, seen)
+    if (len(args.files) == 1 and args.files[0] != '-' and key_from_args(args) is None
+            and duplicate_files.maps_exact_dedup(args.files[0], args.memory_limit, args.encoding)):
+        return run_mapped_dedup(args)
+    deduplicator = duplicate_files.ExternalDeduplicator(args.memory_limit, key=key_from_args(args))
+    write_lines(deduplicator.unique(iter_input_lines(args.files, args.encoding), input_size_hint(args.files)), args.encoding)
+    _report(args, deduplicator.total_lines, deduplicator.unique_lines)
+    return 0
+
+
+def run_mapped_dedup(args):
+    # Kept lines are copied from the map as raw bytes, so nothing is decoded or re-encoded
+    deduplicator = duplicate_files.MappedDeduplicator(encoding=args.encoding)
+    write = sys.stdout.buffer.write
+    with duplicate_files.MappedLineScanner(args.files[0]) as scanner:
+        for line in deduplicator.unique_raw(scanner):
+            write(line)
+            write(b'\n')
+    sys.stdout.buffer.flush()
+    _report(args, deduplicator.total_lines, deduplicator.unique_lines)
+    return 0
+
+
+def run_compact_dedup(args, seen):
+    # The digests or filter bits are all that is kept, so nothing spills
+    total_lines = 0
+    unique_lines = 0
+
+    def counted(lines, unique=False):
+        nonlocal total_lines, unique_lines
+        for line in lines:
+            if unique:
+                unique_lines += 1
+            else:
+                total_lines += 1
+            yield line
+
+    lines = counted(iter_input_lines(args.files, args.encoding))
+    write_lines(counted(duplicate_engine.iter_unique(lines, key_from_args(args), seen), unique=True), args.encoding)
+    _report(args, total_lines, unique_lines)
+    if args.stats and args.approximate:
+        print(f"expected false positive rate {seen.expected_error:.3g}", file=sys.stderr)
+    return 0
+
+
+def run_parallel_dedup(args):
+    if len(args.files) != 1 or args.files[0] == '-' or key_from_args(args) is not None or args.fingerprint or args.approximate:
+        print("--workers needs exactly one input file and exact matching", file=sys.stderr)
+        return 2
+    try:
+        total_lines, unique_lines = duplicate_files.parallel_dedup(args.files[0], sys.stdout.buffer, args.workers,
+                                                                   encoding=args.encoding, memory_limit=args.memory_limit)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    sys.stdout.buffer.flush()
+    _report(args, total_lines, unique_lines)
+    return 0
+
+
+def run_merge(args):
+    merger = duplicate_files.ExternalDeduplicator(args.memory_limit, key=key_from_args(args))
+    write_lines(merger.merge(iter_input_lines(args.files, args.encoding), args.mode, input_size_hint(args.files)),
+                args.encoding)
+    return 0
+
+
+def run_sort(args):
+    lines = iter_input_lines(args.files, args.encoding)
+    write_lines(duplicate_files.external_sort(lines, args.type, args.memory_limit), args.encoding)
+    return 0
+
+
+def run_batch(args):
+    key = key_from_args(args)
+    manifest = None
+    if args.manifest:
+        options = repr((args.ignore_case, args.ignore_whitespace, args.unicode, args.regex))
+        manifest = duplicate_manifest.BatchManifest(args.manifest, options)
+    report = duplicate_report.BatchReport(args.report) if args.report else None
+    removed_dir = tempfile.mkdtemp(prefix='duplicate-batch-')
+    try:
+        status = _run_batch_files(args, key, manifest, report, removed_dir)
+    finally:
+        shutil.rmtree(removed_dir, ignore_errors=True)
+    if manifest is not None:
+        manifest.save()
+    if report is not None:
+        report.close()
+    return status
+
+
+def _run_batch_files(args, key, manifest, report, removed_dir):
+    status = 0
+    for path in args.files:
+        if manifest is not None and manifest.unchanged(path) is not None:
+            result = None
+        else:
+            try:
+                result = duplicate_files.dedup_file_job(path, args.memory_limit, key, args.encoding,
+                                                        manifest.known_hash(path) if manifest is not None else None,
+                                                        removed_dir, hash_content=manifest is not None)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"{path}: {e}", file=sys.stderr)
+                if report is not None:
+                    report.add(path, str(e), 0, "Error")
+                status = 1
+                continue
+        if result is None or result.skipped:
+            if result is not None:
+                manifest.touch(path, result.size, result.mtime_ns)
+            if report is not None:
+                report.add(path, "", 0, "Unchanged, skipped")
+            print(f"{path}: unchanged, skipped")
+            continue
+        if manifest is not None:
+            manifest.record(path, result.total_lines, result.unique_lines, result.content_hash, result.size, result.mtime_ns)
+        if report is not None:
+            if result.removed_path is not None:
+                report.add_removed(path, result.removed_path)
+            else:
+                report.add(path, "", 0, f"No duplicates found in {result.total_lines} lines")
+        if result.removed_path is not None:
+            os.remove(result.removed_path)
+        print(f"{path}: {result.total_lines} lines, {result.total_lines - result.unique_lines} duplicates removed")
+    return status
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='duplicate_cli', description="Remove, merge and sort duplicate lines without the GUI.")
+    parser.add_argument('--encoding', help="Text encoding of inputs and output (default: locale encoding)")
+    parser.add_argument('--memory-limit', type=int, default=duplicate_files.DEFAULT_MEMORY_LIMIT // (1024 * 1024),
+                        metavar='MB', help="Memory ceiling before spilling to temporary files")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    key_options = argparse.ArgumentParser(add_help=False)
+    key_options.add_argument('-i', '--ignore-case', action='store_true')
+    key_options.add_argument('-w', '--ignore-whitespace', action='store_true')
+    key_options.add_argument('--unicode', choices=duplicate_engine.UNICODE_FORMS, help="Compare lines after Unicode normalization")
+    key_options.add_argument('--regex', help="Compare only the part of each line matched by this pattern")
+
+    dedup = commands.add_parser('dedup', parents=[key_options], help="Keep the first occurrence of every line")
+    dedup.add_argument('--stats', action='store_true', help="Print line counts to stderr")
+    dedup.add_argument('--workers', type=int, default=1, metavar='N',
+                       help="Split exact dedup of one file across N processes sharing --memory-limit")
+    compact = dedup.add_mutually_exclusive_group()
+    compact.add_argument('--fingerprint', type=int, choices=(64, 128), metavar='BITS',
+                         help="Remember 64 or 128-bit digests instead of lines; a digest collision drops a distinct line")
+    compact.add_argument('--approximate', type=error_rate, metavar='RATE',
+                         help="Remember lines in a Bloom filter of --memory-limit that drops a distinct line "
+                              "with about this probability")
+    dedup.set_defaults(handler=run_dedup)
+
+    merge = commands.add_parser('merge', parents=[key_options], help="Concatenate inputs and merge repeated lines")
+    merge.add_argument('--mode', choices=duplicate_engine.MERGE_MODES, default='first')
+    merge.set_defaults(handler=run_merge)
+
+    sort = commands.add_parser('sort', help="Sort lines")
+    sort.add_argument('--type', choices=duplicate_engine.SORT_TYPES, default='alphabetical')
+    sort.set_defaults(handler=run_sort)
+
+    batch = commands.add_parser('batch', parents=[key_options], help="Remove duplicates from each file in place")
+    batch.add_argument('--manifest', metavar='PATH', help="Skip files unchanged since a run that used this manifest")
+    batch.add_argument('--report', metavar='PATH', help="Write a JSON Lines report of removed lines with counts per file")
+    batch.set_defaults(handler=run_batch)
+
+    for command in (dedup, merge, sort):
+        command.add_argument('files', nargs='*', help="Input files; stdin when omitted or '-'")
+    batch.add_argument('files', nargs='+')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.memory_limit *= 1024 * 1024
+    try:
+        return args.handler(args)
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); silence the flush at interpreter exit
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    except re.error as e:
+        print(f"Invalid regular expression: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,713 @@
+"""Qt-free duplicate detection engine.
+
+Every function accepts any iterable of lines (a list, a file object, a
+generator) and only keeps the bookkeeping it needs, so the same code serves
+the editor tabs, the batch tools and headless ingestion workers.
+"""
+
+import math
+import re
+import unicodedata
+from array import array
+from functools import lru_cache, partial
+from hashlib import blake2b
+from itertools import compress
+
+KEEP_POLICIES = ('first', 'last', 'none')
+MERGE_MODES = ('first', 'last', 'count')
+SORT_TYPES = ('line_size_asc', 'line_size_desc', 'alphabetical')
+UNICODE_FORMS = ('NFC', 'NFKC')
+NORMALIZED_KEY_CACHE_SIZE = 65536
+# Longer lines are normalized on every call, which bounds the cache to a few tens of MB
+NORMALIZED_KEY_CACHE_MAX_LENGTH = 256
+# Below this many lines the multi-pass merge loops beat building the hash array
+VECTORIZED_THRESHOLD = 200000
+# Hashing and sorting the whole list only pays off when most lines are distinct;
+# a strided sample of every VECTORIZED_SAMPLE_STEP-th line estimates that
+VECTORIZED_SAMPLE_STEP = 10
+VECTORIZED_MIN_DISTINCT = 0.8
+
+
+def iter_file_lines(file):
+    # Text-mode files already translate '\r\n', so only the trailing '\n' is dropped
+    for line in file:
+        if line.endswith('\n'):
+            line = line[:-1]
+        yield line
+
+
+def collapse_whitespace(line):
+    return ' '.join(line.split())
+
+
+def make_key_function(case_sensitive=True, ignore_whitespace=False, unicode_form=None, cache_size=NORMALIZED_KEY_CACHE_SIZE):
+    """Compile normalization options into a single key function.
+
+    Returns None when no option is active so callers keep their raw-line fast
+    path. The compiled function memoizes the keys of lines up to
+    NORMALIZED_KEY_CACHE_MAX_LENGTH characters in a bounded LRU cache, which
+    lives as long as the function, so callers should make one per run.
+    """
+    if unicode_form is not None and unicode_form not in UNICODE_FORMS:
+        raise ValueError(f"Unknown Unicode normalization form: {unicode_form}")
+    steps = []
+    if unicode_form:
+        steps.append(partial(unicodedata.normalize, unicode_form))
+    if not case_sensitive:
+        steps.append(str.casefold)
+        if unicode_form:
+            # Case folding can denormalize some characters again
+            steps.append(partial(unicodedata.normalize, unicode_form))
+    if ignore_whitespace:
+        steps.append(collapse_whitespace)
+    if not steps:
+        return None
+
+    if len(steps) == 1:
+        key = steps[0]
+    else:
+        def key(line):
+            for step in steps:
+                line = step(line)
+            return line
+    if not cache_size:
+        return key
+    cached_key = lru_cache(maxsize=cache_size)(key)
+
+    def key_function(line):
+        return cached_key(line) if len(line) <= NORMALIZED_KEY_CACHE_MAX_LENGTH else key(line)
+    return key_function
+
+
+@lru_cache(maxsize=64)
+def compile_pattern(pattern, flags=0):
+    return re.compile(pattern, flags)
+
+
+def regex_key_function(pattern, flags=0, normalize=None):
+    """Key function returning the part of a line selected by `pattern`.
+
+    With capture groups the key is the captured text (a tuple for several
+    groups), otherwise the whole match. Lines that do not match get None and
+    are left out of duplicate detection. `normalize` is applied to the
+    extracted text, so it composes with make_key_function.
+    """
+    search = compile_pattern(pattern, flags).search
+    group_count = search.__self__.groups
+
+    if group_count == 0:
+        def extract(line):
+            match = search(line)
+            return None if match is None else match.group(0)
+    elif group_count == 1:
+        def extract(line):
+            match = search(line)
+            return None if match is None else match.group(1)
+    else:
+        def extract(line):
+            match = search(line)
+            return None if match is None else match.groups()
+
+    if normalize is None:
+        return extract
+
+    def normalized_extract(line):
+        value = extract(line)
+        if value is None:
+            return None
+        if group_count > 1:
+            return tuple(None if part is None else normalize(part) for part in value)
+        return normalize(value)
+    return normalized_extract
+
+
+def extract_keys(lines, key):
+    """Compute every key in one batched pass."""
+    return list(map(key, lines))
+
+
+def first_word(line):
+    words = line.split(None, 1)
+    return words[0] if words else None
+
+
+_UINT64_MASK = (1 << 64) - 1
+
+
+def _key_bytes(line_key):
+    if isinstance(line_key, str):
+        return line_key.encode('utf-8', 'surrogatepass')
+    if isinstance(line_key, (bytes, bytearray, memoryview)):
+        return line_key
+    return repr(line_key).encode('utf-8', 'surrogatepass')
+
+
+class FingerprintSet:
+    """Seen-set storing fixed-size blake2b digests of keys in flat arrays.
+
+    Memory is 16 bytes per slot for 64-bit digests (24 for 128-bit) no matter
+    how long the keys are. The first position of every key is kept, so a
+    digest match can be checked against the source with `verify(key,
+    earlier_position)`; keys that turn out to collide fall back to an exact set.
+    """
+
+    def __init__(self, bits=64, capacity=1024, verify=None):
+        if bits not in (64, 128):
+            raise ValueError("Fingerprint size must be 64 or 128 bits")
+        self.bits = bits
+        self.verify = verify
+        self.collisions = 0
+        self._digest_size = bits // 8
+        self._size = 0
+        self._collided = set()
+        self._allocate(max(16, 1 << (2 * capacity - 1).bit_length()))
+
+    def _allocate(self, slots):
+        self._mask = slots - 1
+        self._high = array('Q', [0]) * slots
+        self._low = array('Q', [0]) * slots if self.bits == 128 else None
+        self._positions = array('q', [-1]) * slots
+
+    def __len__(self):
+        return self._size + len(self._collided)
+
+    def fingerprint(self, line_key):
+        value = int.from_bytes(blake2b(_key_bytes(line_key), digest_size=self._digest_size).digest(), 'little')
+        if self._low is None:
+            return value or 1, 0
+        # The high word doubles as the empty-slot marker, so it must never be 0
+        return (value >> 64) or 1, value & _UINT64_MASK
+
+    def _find(self, high, low):
+        table = self._high
+        lows = self._low
+        mask = self._mask
+        slot = high & mask
+        while True:
+            stored = table[slot]
+            if stored == 0 or (stored == high and (lows is None or lows[slot] == low)):
+                return slot
+            slot = (slot + 1) & mask
+
+    def add(self, line_key, position=-1):
+        """Record `line_key`; returns True when it had not been seen before."""
+        high, low = self.fingerprint(line_key)
+        slot = self._find(high, low)
+        if self._high[slot] == 0:
+            self._high[slot] = high
+            if self._low is not None:
+                self._low[slot] = low
+            self._positions[slot] = position
+            self._size += 1
+            if self._size * 10 > (self._mask + 1) * 7:
+                self._grow()
+            return True
+        earlier = self._positions[slot]
+        if self.verify is None or earlier < 0 or self.verify(line_key, earlier):
+            return False
+        if line_key in self._collided:
+            return False
+        self.collisions += 1
+        # Memoryview keys may point into a buffer that is about to go away
+        self._collided.add(bytes(line_key) if isinstance(line_key, memoryview) else line_key)
+        return True
+
+    def __contains__(self, line_key):
+        high, low = self.fingerprint(line_key)
+        slot = self._find(high, low)
+        if self._high[slot] == 0:
+            return False
+        earlier = self._positions[slot]
+        if self.verify is None or earlier < 0 or self.verify(line_key, earlier):
+            return True
+        return line_key in self._collided
+
+    def first_position(self, line_key):
+        """Position recorded for the key's digest, or None; check it against the source to rule out a collision."""
+        high, low = self.fingerprint(line_key)
+        slot = self._find(high, low)
+        if self._high[slot] == 0 or self._positions[slot] < 0:
+            return None
+        return self._positions[slot]
+
+    def _grow(self):
+        highs, lows, positions = self._high, self._low, self._positions
+        self._allocate((self._mask + 1) * 2)
+        for slot, high in enumerate(highs):
+            if high:
+                low = 0 if lows is None else lows[slot]
+                new_slot = self._find(high, low)
+                self._high[new_slot] = high
+                if lows is not None:
+                    self._low[new_slot] = low
+                self._positions[new_slot] = positions[slot]
+
+
+class BloomFilter:
+    """Approximate seen-set with a fixed memory footprint.
+
+    `add` may report a new key as already seen with probability close to
+    `expected_error`; it never reports a repeated key as new. The filter is
+    sized for `capacity` keys at `error_rate`, and the error grows past that
+    point, which `expected_error` reflects.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        if capacity <= 0:
+            raise ValueError("Bloom filter capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("Bloom filter error rate must be between 0 and 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    @classmethod
+    def for_memory(cls, memory_bytes, error_rate=0.001):
+        """Largest filter for `error_rate` that fits in `memory_bytes`."""
+        capacity = int(memory_bytes * 8 * (math.log(2) ** 2) / -math.log(error_rate))
+        return cls(max(1, capacity), error_rate)
+
+    @property
+    def memory_bytes(self):
+        return len(self._bits)
+
+    @property
+    def expected_error(self):
+        """Current false-positive probability given the keys added so far."""
+        return (1.0 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+    def _indexes(self, line_key):
+        value = int.from_bytes(blake2b(_key_bytes(line_key), digest_size=16).digest(), 'little')
+        first = value & _UINT64_MASK
+        step = (value >> 64) | 1
+        size = self.size
+        return [(first + i * step) % size for i in range(self.hash_count)]
+
+    def add(self, line_key, position=-1):
+        """Record `line_key`; returns True when it was (probably) not seen before."""
+        bits = self._bits
+        is_new = False
+        for index in self._indexes(line_key):
+            byte, mask = index >> 3, 1 << (index & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                is_new = True
+        if is_new:
+            self.count += 1
+        return is_new
+
+    def __contains__(self, line_key):
+        bits = self._bits
+        return all(bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(line_key))
+
+    def __len__(self):
+        return self.count
+
+
+def find_duplicates_approximate(lines, capacity, error_rate=0.001, key=None):
+    """Approximate find_duplicates in fixed memory; returns (duplicates, bloom_filter)."""
+    bloom = BloomFilter(capacity, error_rate)
+    return find_duplicates(lines, key, bloom), bloom
+
+
+def sequence_verifier(lines, key=None):
+    """Build a FingerprintSet `verify` callback that compares against `lines[position]`."""
+    if key is None:
+        return lambda line_key, position: lines[position] == line_key
+    return lambda line_key, position: key(lines[position]) == line_key
+
+
+def _iter_seen(lines, key, seen):
+    add = seen.add
+    for position, line in enumerate(lines):
+        line_key = line if key is None else key(line)
+        yield position, line, line_key is None or add(line_key, position)
+
+
+def iter_duplicates(lines, key=None, seen=None):
+    """Yield (position, line) for every repeated occurrence as soon as it is seen.
+
+    Lines whose key is None are never reported as duplicates.
+
+    `seen` swaps the exact in-memory set for another seen-set such as a
+    FingerprintSet; it must start empty.
+    """
+    if seen is not None:
+        for position, line, is_new in _iter_seen(lines, key, seen):
+            if not is_new:
+                yield position, line
+        return
+    seen = set()
+    add = seen.add
+    for position, line in enumerate(lines):
+        line_key = line if key is None else key(line)
+        if line_key in seen:
+            yield position, line
+        elif line_key is not None:
+            add(line_key)
+
+
+def iter_unique(lines, key=None, seen=None):
+    """Yield the first occurrence of every line, in input order."""
+    if seen is not None:
+        for _, line, is_new in _iter_seen(lines, key, seen):
+            if is_new:
+                yield line
+        return
+    seen = set()
+    add = seen.add
+    for line in lines:
+        line_key = line if key is None else key(line)
+        if line_key not in seen:
+            if line_key is not None:
+                add(line_key)
+            yield line
+
+
+def iter_duplicate_groups(lines, key=None):
+    """Yield (line, positions) for every line occurring more than once, ordered by first occurrence."""
+    groups = {}
+    for position, line in enumerate(lines):
+        line_key = line if key is None else key(line)
+        if line_key is None:
+            continue
+        group = groups.get(line_key)
+        if group is None:
+            groups[line_key] = (line, [position])
+        else:
+            group[1].append(position)
+    for line, positions in groups.values():
+        if len(positions) > 1:
+            yield line, positions
+
+
+def count_lines(lines, key=None):
+    """Return a dict mapping each key to its number of occurrences, in first-seen order."""
+    counts = {}
+    get = counts.get
+    for line in lines:
+        line_key = line if key is None else key(line)
+        counts[line_key] = get(line_key, 0) + 1
+    return counts
+
+
+def duplicate_summary(lines, key=None):
+    total = 0
+    seen = set()
+    add = seen.add
+    for line in lines:
+        total += 1
+        add(line if key is None else key(line))
+    return {'total': total, 'unique': len(seen), 'duplicates': total - len(seen)}
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    # Imported on first use: NumPy roughly doubles the import time of this module
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _mostly_distinct(lines):
+    sample = lines[::VECTORIZED_SAMPLE_STEP]
+    return len(set(sample)) >= len(sample) * VECTORIZED_MIN_DISTINCT
+
+
+def _use_vectorized(lines, *options):
+    return (isinstance(lines, list) and len(lines) >= VECTORIZED_THRESHOLD
+            and all(option is None for option in options) and _mostly_distinct(lines) and _numpy() is not None)
+
+
+def _vectorized_occurrences(lines):
+    """Group a list of lines by hash(line) with one np.unique call.
+
+    Returns (hashes, first, counts) as given by np.unique, or None when two
+    different lines share a hash so the caller must use the exact loop.
+    """
+    np = _numpy()
+    hashes = np.fromiter(map(hash, lines), dtype=np.int64, count=len(lines))
+    _, first, counts = np.unique(hashes, return_index=True, return_counts=True)
+    # Equal lines always hash equal, so as many hash groups as distinct lines rules out collisions
+    if len(counts) != len(set(lines)):
+        return None
+    return hashes, first, counts
+
+
+def find_duplicates(lines, key=None, seen=None):
+    return [line for _, line in iter_duplicates(lines, key, seen)]
+
+
+def find_duplicates_with_context(lines, context_size=2):
+    return DuplicateIndex(lines).duplicates_with_context(context_size)
+
+
+class DuplicateIndex:
+    """Single-pass index mapping each line key to the positions where it occurs.
+
+    Keys come from `key(line)`, or from `keys`, an iterable aligned with
+    `lines` (used for group ids computed over the whole document). Lines whose
+    key is None are left out of the index, which lets key functions exclude
+    lines from duplicate detection.
+    """
+
+    def __init__(self, lines, key=None, keys=None):
+        self.lines = lines if isinstance(lines, list) else list(lines)
+        self._first = {}
+        self._groups = {}
+        self._repeat_positions = []
+
+        first = self._first
+        groups = self._groups
+        repeats = self._repeat_positions
+        if keys is None:
+            keys = self.lines if key is None else map(key, self.lines)
+        for position, line_key in enumerate(keys):
+            if line_key is None:
+                continue
+            earlier = first.setdefault(line_key, position)
+            if earlier != position:
+                group = groups.get(line_key)
+                if group is None:
+                    groups[line_key] = [earlier, position]
+                else:
+                    group.append(position)
+                repeats.append(position)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def has_duplicates(self):
+        return bool(self._groups)
+
+    @property
+    def unique_count(self):
+        return len(self._first)
+
+    @property
+    def duplicate_count(self):
+        return len(self._repeat_positions)
+
+    def positions(self, line_key):
+        group = self._groups.get(line_key)
+        if group is not None:
+            return group
+        first = self._first.get(line_key)
+        return [] if first is None else [first]
+
+    def group_keys(self):
+        """Every duplicated key, ordered by first occurrence."""
+        groups = self._groups
+        return sorted(groups, key=lambda k: groups[k][0])
+
+    def groups(self):
+        """Yield (key, positions) for every duplicated key, ordered by first occurrence."""
+        for line_key in self.group_keys():
+            yield line_key, self._groups[line_key]
+
+    def duplicate_positions(self):
+        """Positions of every repeated occurrence (all but the first), in document order."""
+        return self._repeat_positions
+
+    def duplicates(self):
+        lines = self.lines
+        return [lines[position] for position in self._repeat_positions]
+
+    def keep_mask(self, selected_keys, keep='first'):
+        """Return a bytearray with 1 for every line that survives removing the selected keys."""
+        if keep not in KEEP_POLICIES:
+            raise ValueError(f"Unknown keep policy: {keep}")
+        mask = bytearray(b'\x01') * len(self.lines)
+        groups = self._groups
+        for line_key in selected_keys:
+            positions = groups.get(line_key)
+            if positions is None:
+                continue
+            if keep == 'first':
+                positions = positions[1:]
+            elif keep == 'last':
+                positions = positions[:-1]
+            for position in positions:
+                mask[position] = 0
+        return mask
+
+    def remove(self, selected_keys, keep='first'):
+        return list(compress(self.lines, self.keep_mask(selected_keys, keep)))
+
+    def merge(self, selected_keys, mode='first'):
+        """Merge the selected keys like merge_lines, using the indexed keys."""
+        if mode not in MERGE_MODES:
+            raise ValueError(f"Unknown merge mode: {mode}")
+        if mode != 'count':
+            return self.remove(selected_keys, mode)
+        mask = self.keep_mask(selected_keys, 'first')
+        counts = {}
+        for line_key in selected_keys:
+            positions = self._groups.get(line_key)
+            if positions is not None:
+                counts[positions[0]] = len(positions)
+        get = counts.get
+        return [format_count(get(position, 1), line) for position, (line, keep) in enumerate(zip(self.lines, mask)) if keep]
+
+    def context(self, position, context_size=2):
+        lines = self.lines
+        return {'previous': lines[max(0, position - context_size):position],
+                'next': lines[position + 1:position + context_size + 1]}
+
+    def duplicates_with_context(self, context_size=2):
+        lines = self.lines
+        return [(lines[position], self.context(position, context_size)) for position in self._repeat_positions]
+
+
+class LineMultiset:
+    """Lines of an edited document with the occurrence count of every key.
+
+    `lines` mirrors the document line by line. replace() swaps a run of
+    lines and only adjusts the counts of the lines it removes and adds, so an
+    editor can follow each edit without rescanning the document. Lines whose
+    key is None are not counted.
+    """
+
+    def __init__(self, lines=(), key=None):
+        self.key = key
+        self.lines = []
+        self.counts = {}
+        self.total = 0
+        self.replace(0, 0, lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def replace(self, start, stop, new_lines):
+        """Replace `lines[start:stop]` with `new_lines`."""
+        key = self.key
+        counts = self.counts
+        new_lines = list(new_lines)
+        for line in self.lines[start:stop]:
+            line_key = line if key is None else key(line)
+            if line_key is None:
+                continue
+            remaining = counts[line_key] - 1
+            if remaining:
+                counts[line_key] = remaining
+            else:
+                del counts[line_key]
+            self.total -= 1
+        get = counts.get
+        for line in new_lines:
+            line_key = line if key is None else key(line)
+            if line_key is None:
+                continue
+            counts[line_key] = get(line_key, 0) + 1
+            self.total += 1
+        self.lines[start:stop] = new_lines
+
+    def count(self, line):
+        return self.counts.get(line if self.key is None else self.key(line), 0)
+
+    @property
+    def unique_count(self):
+        return len(self.counts)
+
+    @property
+    def duplicate_count(self):
+        return self.total - len(self.counts)
+
+
+def format_count(count, line):
+    # Same layout as `uniq -c`
+    return f"{count:7d} {line}"
+
+
+def iter_merge_lines(lines, duplicates=None, mode='first', key=None):
+    """Collapse repeated lines in input order; lines whose key is None are never merged.
+
+    Only keys in `duplicates` are merged when it is given; other lines pass
+    through untouched. `mode` keeps the first or last occurrence, or emits the
+    first occurrence prefixed with its count.
+    """
+    if mode not in MERGE_MODES:
+        raise ValueError(f"Unknown merge mode: {mode}")
+    if duplicates is not None and not isinstance(duplicates, (set, frozenset, dict)):
+        duplicates = set(duplicates)
+
+    if mode == 'first':
+        seen = set()
+        add = seen.add
+        for line in lines:
+            line_key = line if key is None else key(line)
+            if duplicates is not None and line_key not in duplicates:
+                yield line
+            elif line_key not in seen:
+                if line_key is not None:
+                    add(line_key)
+                yield line
+        return
+
+    if not isinstance(lines, list):
+        lines = list(lines)
+    keys = lines if key is None else [key(line) for line in lines]
+
+    if mode == 'last':
+        last = {line_key: position for position, line_key in enumerate(keys)}
+        for position, line_key in enumerate(keys):
+            if line_key is None or (duplicates is not None and line_key not in duplicates) or last[line_key] == position:
+                yield lines[position]
+        return
+
+    counts = {}
+    get = counts.get
+    for line_key in keys:
+        counts[line_key] = get(line_key, 0) + 1
+    emitted = set()
+    add = emitted.add
+    for line, line_key in zip(lines, keys):
+        if line_key is None or (duplicates is not None and line_key not in duplicates):
+            yield format_count(1, line)
+        elif line_key not in emitted:
+            add(line_key)
+            yield format_count(counts[line_key], line)
+
+
+def _vectorized_merge(lines, mode):
+    occurrences = _vectorized_occurrences(lines)
+    if occurrences is None:
+        return None
+    hashes, first, counts = occurrences
+    np = _numpy()
+    if mode == 'last':
+        # np.unique sorts the same hashes either way, so groups line up with `first`
+        _, reversed_first = np.unique(hashes[::-1], return_index=True)
+        return [lines[position] for position in np.sort(len(lines) - 1 - reversed_first).tolist()]
+    order = np.argsort(first)
+    positions = first[order].tolist()
+    return [format_count(line_count, lines[position]) for position, line_count in zip(positions, counts[order].tolist())]
+
+
+def merge_lines(lines, duplicates=None, mode='first', key=None):
+    """List form of iter_merge_lines.
+
+    Large exact 'last' and 'count' merges of mostly distinct lines run on
+    NumPy when it is installed; with many repeats, and for 'first', the set
+    and dict passes are faster than hashing and sorting the whole list.
+    """
+    if mode in ('last', 'count') and _use_vectorized(lines, duplicates, key):
+        merged = _vectorized_merge(lines, mode)
+        if merged is not None:
+            return merged
+    return list(iter_merge_lines(lines, duplicates, mode, key))
+
+
+def sort_lines(lines, sort_type):
+    if sort_type == 'line_size_asc':
+        return sorted(lines, key=len)
+    if sort_type == 'line_size_desc':
+        return sorted(lines, key=len, reverse=True)
+    if sort_type == 'alphabetical':
+        return sorted(lines)
+    raise ValueError(f"Unknown sort type: {sort_type}")
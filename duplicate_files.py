@@ -0,0 +1,1038 @@
+"""File-level duplicate removal with bounded memory.
+
+Inputs that do not fit in the memory ceiling are hash-partitioned into
+temporary bucket files, every bucket is deduplicated on its own, and the
+surviving lines are merged back by their original position so the output
+keeps first-occurrence order. Exact dedup of single-byte-newline encodings
+can instead run on a read-only memory map, without decoding kept lines.
+"""
+
+import heapq
+import io
+import json
+import locale
+import mmap
+import os
+import shutil
+import stat
+import struct
+import tempfile
+import zlib
+from array import array
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, compress, count
+
+import duplicate_engine
+import duplicate_manifest
+
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+DEFAULT_BUCKETS = 64
+MAX_BUCKETS = 512
+MAX_PARTITION_DEPTH = 4
+MAX_MERGE_RUNS = 256
+# Approximate cost of one short str held in a set, on top of its characters
+LINE_OVERHEAD = 90
+# Worst-case fingerprint table bytes per distinct line, including growth
+MAPPED_LINE_COST = 64
+# Worst-case removed-count bytes per line: up to half the lines own a dropped copy
+MAPPED_COUNT_COST = 64
+REMOVED_COUNTS_BATCH = 10000
+MAPPED_SAMPLE_SIZE = 1024 * 1024
+# Undecodable bytes become lone surrogates and are written back unchanged,
+# the same on the text and the memory-mapped paths
+DECODE_ERRORS = 'surrogateescape'
+
+_RECORD_HEADER = struct.Struct('<QI')
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _write_raw_record(file, position, data):
+    file.write(_RECORD_HEADER.pack(position, len(data)))
+    file.write(data)
+    return _RECORD_HEADER.size + len(data)
+
+
+def _read_raw_records(path):
+    header_size = _RECORD_HEADER.size
+    unpack = _RECORD_HEADER.unpack
+    with open(path, 'rb') as file:
+        while True:
+            header = file.read(header_size)
+            if not header:
+                return
+            position, length = unpack(header)
+            yield position, file.read(length)
+
+
+def _write_record(file, position, line):
+    return _write_raw_record(file, position, line.encode('utf-8', 'surrogatepass'))
+
+
+def _read_records(path):
+    for position, data in _read_raw_records(path):
+        yield position, data.decode('utf-8', 'surrogatepass')
+
+
+def _merge_by_position(paths, work_dir):
+    """Yield the (position, bytes) records of `paths` in position order.
+
+    Re-split buckets can leave thousands of survivor files, so they are
+    merged MAX_MERGE_RUNS at a time into intermediate files until one final
+    pass can keep them all open.
+    """
+    generation = count()
+    while len(paths) > MAX_MERGE_RUNS:
+        merged_paths = []
+        for start in range(0, len(paths), MAX_MERGE_RUNS):
+            group = paths[start:start + MAX_MERGE_RUNS]
+            merged_path = os.path.join(work_dir, f"merged-{next(generation)}")
+            with open(merged_path, 'wb', buffering=1024 * 1024) as out:
+                for position, data in heapq.merge(*(_read_raw_records(path) for path in group)):
+                    _write_raw_record(out, position, data)
+            for path in group:
+                os.remove(path)
+            merged_paths.append(merged_path)
+        paths = merged_paths
+    return heapq.merge(*(_read_raw_records(path) for path in paths))
+
+
+def iter_files_lines(file_paths, encoding=None):
+    for file_path in file_paths:
+        with open(file_path, 'r', encoding=encoding, errors=DECODE_ERRORS) as file:
+            yield from duplicate_engine.iter_file_lines(file)
+
+
+class ExternalDeduplicator:
+    """Order-preserving dedup of arbitrarily large inputs within a memory ceiling.
+
+    Lines whose key is None are always kept. `total_lines` and `unique_lines`
+    are filled in while `unique()` or `merge()` is consumed.
+    `on_duplicate(position, line)` is called for every dropped occurrence; with
+    spilled inputs the calls come bucket by bucket rather than in input order.
+    `on_removed_counts(counts)` receives {line: dropped occurrences} once per
+    in-memory run or bucket. All occurrences of a key share a bucket, so every
+    line appears in exactly one call and no dict outlives its bucket.
+    """
+
+    def __init__(self, memory_limit=DEFAULT_MEMORY_LIMIT, key=None, tmp_dir=None, on_duplicate=None, on_removed_counts=None):
+        self.memory_limit = memory_limit
+        self.key = key
+        self.tmp_dir = tmp_dir
+        self.on_duplicate = on_duplicate
+        self.on_removed_counts = on_removed_counts
+        self.total_lines = 0
+        self.unique_lines = 0
+        self.spilled = False
+        self._partition_ids = count()
+
+    def _line_key(self, line):
+        return line if self.key is None else self.key(line)
+
+    def unique(self, lines, size_hint=None):
+        return self._stream(lines, size_hint, self._unique_in_memory, self._write_unique)
+
+    def merge(self, lines, mode='first', size_hint=None):
+        """Stream duplicate_engine.iter_merge_lines within the memory ceiling.
+
+        'first' is unique(). For 'last' and 'count' every occurrence of a key
+        shares a bucket, so each bucket picks its last occurrences or counts
+        its keys on its own and the survivors are merged back by position.
+        Only the line counters are filled in; the duplicate callbacks are not
+        called.
+        """
+        if mode not in duplicate_engine.MERGE_MODES:
+            raise ValueError(f"Unknown merge mode: {mode}")
+        if mode == 'first':
+            return self.unique(lines, size_hint)
+
+        def merge_in_memory(buffered):
+            self.total_lines += len(buffered)
+            for line in duplicate_engine.iter_merge_lines(buffered, mode=mode, key=self.key):
+                self.unique_lines += 1
+                yield line
+        return self._stream(lines, size_hint, merge_in_memory,
+                            self._write_last if mode == 'last' else self._write_counts)
+
+    def _stream(self, lines, size_hint, in_memory, write_survivors):
+        lines = iter(lines)
+        buffered = []
+        used = 0
+        for line in lines:
+            buffered.append(line)
+            used += len(line) + LINE_OVERHEAD
+            if used > self.memory_limit:
+                break
+        else:
+            yield from in_memory(buffered)
+            return
+
+        self.spilled = True
+        work_dir = tempfile.mkdtemp(prefix='dedup-', dir=self.tmp_dir)
+        try:
+            buckets = self._bucket_count(size_hint)
+            bucket_paths = self._partition(enumerate(chain(buffered, lines)), work_dir, buckets, 0)
+            del buffered
+            survivors = []
+            for bucket_path, (size, records) in bucket_paths:
+                self._dedup_bucket(bucket_path, size, records, work_dir, 1, survivors, write_survivors)
+            for _, data in _merge_by_position(survivors, work_dir):
+                self.unique_lines += 1
+                yield data.decode('utf-8', 'surrogatepass')
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _unique_in_memory(self, lines):
+        seen = set()
+        add = seen.add
+        on_duplicate = self.on_duplicate
+        removed = {} if self.on_removed_counts is not None else None
+        for position, line in enumerate(lines):
+            self.total_lines += 1
+            line_key = self._line_key(line)
+            if line_key in seen:
+                if on_duplicate is not None:
+                    on_duplicate(position, line)
+                if removed is not None:
+                    removed[line] = removed.get(line, 0) + 1
+            else:
+                if line_key is not None:
+                    add(line_key)
+                self.unique_lines += 1
+                yield line
+        if removed:
+            self.on_removed_counts(removed)
+
+    def _bucket_count(self, size_hint):
+        if not size_hint:
+            return DEFAULT_BUCKETS
+        # Aim for buckets at half the ceiling so that line overhead still fits
+        wanted = -(-size_hint * 2 // self.memory_limit)
+        return max(2, min(MAX_BUCKETS, wanted))
+
+    def _partition(self, records, work_dir, buckets, depth):
+        partition_id = next(self._partition_ids)
+        paths = [os.path.join(work_dir, f"bucket-{partition_id}-{i}") for i in range(buckets)]
+        files = [open(path, 'wb', buffering=1024 * 1024) for path in paths]
+        sizes = [0] * buckets
+        counts = [0] * buckets
+        try:
+            for position, line in records:
+                if depth == 0:
+                    self.total_lines += 1
+                line_key = self._line_key(line)
+                bucket = (hash(line_key) if depth == 0 else hash((depth, line_key))) % buckets
+                sizes[bucket] += _write_record(files[bucket], position, line)
+                counts[bucket] += 1
+        finally:
+            for file in files:
+                file.close()
+        return list(zip(paths, zip(sizes, counts)))
+
+    def _dedup_bucket(self, path, size, records, work_dir, depth, survivors, write_survivors):
+        if size + records * LINE_OVERHEAD > self.memory_limit and depth <= MAX_PARTITION_DEPTH and records > 1:
+            sub_buckets = max(2, min(MAX_BUCKETS, -(-(size + records * LINE_OVERHEAD) * 2 // self.memory_limit)))
+            parts = self._partition(_read_records(path), work_dir, sub_buckets, depth)
+            os.remove(path)
+            # A bucket dominated by one key cannot be split further; its key set is small anyway
+            if not any(part_records == records for _, (_, part_records) in parts):
+                for part_path, (part_size, part_records) in parts:
+                    self._dedup_bucket(part_path, part_size, part_records, work_dir, depth + 1, survivors, write_survivors)
+                return
+            for part_path, (part_size, part_records) in parts:
+                if part_records:
+                    self._dedup_bucket(part_path, part_size, part_records, work_dir, MAX_PARTITION_DEPTH + 1, survivors,
+                                       write_survivors)
+                else:
+                    os.remove(part_path)
+            return
+
+        survivor_path = path + '.unique'
+        with open(survivor_path, 'wb', buffering=1024 * 1024) as out:
+            write_survivors(_read_records(path), out)
+        os.remove(path)
+        survivors.append(survivor_path)
+
+    def _write_unique(self, records, out):
+        seen = set()
+        add = seen.add
+        on_duplicate = self.on_duplicate
+        removed = {} if self.on_removed_counts is not None else None
+        for position, line in records:
+            line_key = self._line_key(line)
+            if line_key in seen:
+                if on_duplicate is not None:
+                    on_duplicate(position, line)
+                if removed is not None:
+                    removed[line] = removed.get(line, 0) + 1
+            else:
+                if line_key is not None:
+                    add(line_key)
+                _write_record(out, position, line)
+        if removed:
+            self.on_removed_counts(removed)
+
+    def _write_last(self, records, out):
+        # Survivor files must stay in position order, so a repeated key moves to the end
+        last = {}
+        always = []
+        for position, line in records:
+            line_key = self._line_key(line)
+            if line_key is None:
+                always.append((position, line))
+            else:
+                last.pop(line_key, None)
+                last[line_key] = position, line
+        for position, line in heapq.merge(always, last.values()):
+            _write_record(out, position, line)
+
+    def _write_counts(self, records, out):
+        # key -> [first position, first line, occurrences], in first-occurrence order
+        counts = {}
+        always = []
+        for position, line in records:
+            line_key = self._line_key(line)
+            if line_key is None:
+                always.append([position, line, 1])
+                continue
+            entry = counts.get(line_key)
+            if entry is None:
+                counts[line_key] = [position, line, 1]
+            else:
+                entry[2] += 1
+        for position, line, occurrences in heapq.merge(always, counts.values()):
+            _write_record(out, position, duplicate_engine.format_count(occurrences, line))
+
+
+def _is_byte_line_encoding(encoding):
+    # Lines can be split on raw bytes only if '\n' is the single byte 0x0A
+    encoding = encoding or locale.getpreferredencoding(False)
+    try:
+        return '\n'.encode(encoding) == b'\n' and '\r'.encode(encoding) == b'\r'
+    except LookupError:
+        return False
+
+
+class MappedLineScanner:
+    """Read-only memory map of a file whose lines are yielded as memoryview slices.
+
+    Line boundaries are found on the raw bytes, so no str is created unless
+    the caller decodes a line. The '\r' of CRLF endings is dropped, like text
+    mode does. Slices are only valid until the scanner is closed.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file = open(file_path, 'rb')
+        self.stat = os.fstat(self._file.fileno())
+        self.size = self.stat.st_size
+        # An empty file cannot be mapped
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self._view = memoryview(self._map if self._map is not None else b'')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._view.release()
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # A caller still holds a slice; the map goes away with it
+                pass
+        self._file.close()
+
+    def update_digest(self, digest):
+        """Feed the whole mapped file to a hashlib object."""
+        digest.update(self._view)
+
+    def estimated_lines(self):
+        if not self.size:
+            return 0
+        sample = self._map[:MAPPED_SAMPLE_SIZE]
+        return -(-self.size * (sample.count(b'\n') + 1) // len(sample))
+
+    def line_at(self, offset):
+        end = self._map.find(b'\n', offset)
+        if end < 0:
+            end = self.size
+        if end > offset and self._map[end - 1] == 13:
+            end -= 1
+        return self._view[offset:end]
+
+    def __iter__(self):
+        """Yield (byte offset, memoryview) for every line."""
+        find = self._map.find if self._map is not None else None
+        view = self._view
+        size = self.size
+        start = 0
+        while start < size:
+            end = find(b'\n', start)
+            if end < 0:
+                end = size
+            stop = end - 1 if end > start and view[end - 1] == 13 else end
+            yield start, view[start:stop]
+            start = end + 1
+
+
+class MappedDeduplicator:
+    """Exact dedup of a memory-mapped file on raw bytes.
+
+    Lines are hashed as memoryview slices into a FingerprintSet and digest
+    matches are confirmed against the earlier line in the map, so kept lines
+    are never copied or decoded. Exposes the same counters as
+    ExternalDeduplicator; `on_duplicate(line_number, line)` receives decoded
+    lines. Removed occurrences are counted per owning byte offset, and
+    `on_removed_counts` receives them as {decoded line: count} in batches once
+    the scan is done, every line in exactly one batch.
+    """
+
+    def __init__(self, bits=64, encoding=None, on_duplicate=None, on_removed_counts=None):
+        self.bits = bits
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self.on_duplicate = on_duplicate
+        self.on_removed_counts = on_removed_counts
+        self.total_lines = 0
+        self.unique_lines = 0
+        self.spilled = False
+        self.collisions = 0
+
+    def unique_raw(self, scanner):
+        """Yield the memoryview of every first occurrence in `scanner`."""
+        def same_line(line, earlier):
+            return scanner.line_at(earlier) == line
+
+        seen = duplicate_engine.FingerprintSet(self.bits, scanner.estimated_lines(), verify=same_line)
+        add = seen.add
+        on_duplicate = self.on_duplicate
+        removed = {} if self.on_removed_counts is not None else None
+        try:
+            for line_number, (offset, line) in enumerate(scanner):
+                self.total_lines += 1
+                if add(line, offset):
+                    self.unique_lines += 1
+                    yield line
+                    continue
+                if on_duplicate is not None:
+                    on_duplicate(line_number, str(line, self.encoding, DECODE_ERRORS))
+                if removed is not None:
+                    owner = seen.first_position(line)
+                    # A line that collided with another digest is counted by its bytes instead
+                    if owner is None or scanner.line_at(owner) != line:
+                        owner = bytes(line)
+                    removed[owner] = removed.get(owner, 0) + 1
+        finally:
+            self.collisions = seen.collisions
+        if removed:
+            self._report_removed(scanner, removed)
+
+    def _report_removed(self, scanner, removed):
+        encoding = self.encoding
+        batch = {}
+        for owner, count in removed.items():
+            line = owner if isinstance(owner, bytes) else scanner.line_at(owner)
+            batch[str(line, encoding, DECODE_ERRORS)] = count
+            if len(batch) >= REMOVED_COUNTS_BATCH:
+                self.on_removed_counts(batch)
+                batch = {}
+        if batch:
+            self.on_removed_counts(batch)
+
+    def unique(self, scanner):
+        encoding = self.encoding
+        for line in self.unique_raw(scanner):
+            yield str(line, encoding, DECODE_ERRORS)
+
+
+class _HashingIO(io.RawIOBase):
+    """Raw file wrapper that feeds every byte read or written to a hashlib object."""
+
+    def __init__(self, raw, digest):
+        self.raw = raw
+        self.digest = digest
+
+    def readable(self):
+        return self.raw.readable()
+
+    def writable(self):
+        return self.raw.writable()
+
+    def fileno(self):
+        return self.raw.fileno()
+
+    def readinto(self, buffer):
+        count = self.raw.readinto(buffer)
+        if count:
+            self.digest.update(memoryview(buffer)[:count])
+        return count
+
+    def write(self, data):
+        count = self.raw.write(data)
+        if count:
+            self.digest.update(memoryview(data)[:count])
+        return count
+
+    def close(self):
+        if not self.closed:
+            self.raw.close()
+        super().close()
+
+
+def _open_hashed(raw, mode, digest, encoding=None, buffering=1024 * 1024, newline=None, errors=None):
+    raw = _HashingIO(raw, digest)
+    buffered = io.BufferedReader(raw, buffering) if 'r' in mode else io.BufferedWriter(raw, buffering)
+    if 'b' in mode:
+        return buffered
+    return io.TextIOWrapper(buffered, encoding=encoding, errors=errors, newline=newline)
+
+
+class AtomicWriter:
+    """File object for `path` that only replaces it once everything is on disk.
+
+    Output goes to a temporary file in the same directory, which on a clean
+    exit is flushed, fsynced and renamed over `path`, after which the
+    directory itself is fsynced. On an exception, or after discard(), the
+    temporary file is removed and `path` is left untouched, so an interrupted
+    run can never leave a half-written file behind. An existing target keeps
+    its permission bits. A `digest` is fed every byte written, and `stat`
+    holds the new file's stat once it is in place.
+    """
+
+    def __init__(self, path, mode='w', encoding=None, buffering=1024 * 1024, newline=None, digest=None, errors=None):
+        self.path = path
+        self.mode = mode
+        self.encoding = encoding
+        self.errors = errors
+        self.newline = newline
+        self.buffering = buffering
+        self.digest = digest
+        self.discarded = False
+        self.file = None
+        self.tmp_path = None
+        self.stat = None
+
+    def __enter__(self):
+        directory, name = os.path.split(os.path.abspath(self.path))
+        fd, self.tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix='.tmp', dir=directory)
+        try:
+            mode = stat.S_IMODE(os.stat(self.path).st_mode)
+        except FileNotFoundError:
+            # mkstemp creates owner-only files; new outputs get the usual umask-based mode
+            mode = 0o666 & ~_UMASK
+        os.chmod(self.tmp_path, mode)
+        if self.digest is None:
+            self.file = os.fdopen(fd, self.mode, encoding=self.encoding, errors=self.errors, buffering=self.buffering,
+                                  newline=self.newline)
+        else:
+            self.file = _open_hashed(io.FileIO(fd, 'w'), self.mode, self.digest, self.encoding, self.buffering, self.newline,
+                                     self.errors)
+        return self
+
+    def write(self, data):
+        return self.file.write(data)
+
+    def discard(self):
+        self.discarded = True
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None and not self.discarded:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                # The rename keeps the inode, so this is the stat the target will have
+                self.stat = os.fstat(self.file.fileno())
+                self.file.close()
+                os.replace(self.tmp_path, self.path)
+                _fsync_directory(os.path.dirname(os.path.abspath(self.path)))
+        finally:
+            if not self.file.closed:
+                self.file.close()
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+        return False
+
+
+def _fsync_directory(directory):
+    # Makes the rename itself durable; directories cannot be opened on Windows
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_lines(lines, out, newline='\n'):
+    write = out.write
+    for line in lines:
+        write(line)
+        write(newline)
+
+
+def dedup_to_file(lines, out_path, memory_limit=DEFAULT_MEMORY_LIMIT, size_hint=None, key=None, on_duplicate=None, encoding=None):
+    """Atomically write the unique lines of `lines` to `out_path`; returns the deduplicator for its counters."""
+    deduplicator = ExternalDeduplicator(memory_limit, key=key, on_duplicate=on_duplicate)
+    with AtomicWriter(out_path, 'w', encoding, errors=DECODE_ERRORS) as out:
+        _write_lines(deduplicator.unique(lines, size_hint), out)
+    return deduplicator
+
+
+def _fits_mapped(file_path, memory_limit, counting=False):
+    line_cost = MAPPED_LINE_COST + (MAPPED_COUNT_COST if counting else 0)
+    with MappedLineScanner(file_path) as scanner:
+        lines = scanner.estimated_lines()
+        return lines * line_cost <= memory_limit < scanner.size + lines * LINE_OVERHEAD
+
+
+def maps_exact_dedup(file_path, memory_limit=DEFAULT_MEMORY_LIMIT, encoding=None, counting=False):
+    """Whether exact dedup of `file_path` runs on a memory map rather than on decoded lines.
+
+    That is when its lines split on raw newline bytes and would not fit in
+    `memory_limit` as strings, but its fingerprint table (and removed counts
+    with `counting`) would.
+    """
+    return _is_byte_line_encoding(encoding) and _fits_mapped(file_path, memory_limit, counting)
+
+
+def dedup_file(file_path, memory_limit=DEFAULT_MEMORY_LIMIT, key=None, on_duplicate=None, encoding=None, on_removed_counts=None,
+               hash_content=False):
+    """Remove duplicate lines from `file_path` in place, keeping first occurrences in order.
+
+    Unique lines stream into an AtomicWriter, and the file is only replaced
+    when duplicates were found. Exact dedup of a file whose lines would not
+    fit in `memory_limit` as strings runs on a memory map instead of
+    spilling, as long as its fingerprint table (and removed counts) fit.
+
+    With `hash_content` the returned deduplicator also gets `content_hash`
+    and `file_stat` for the file as left behind, hashed from the bytes read
+    or written on the way rather than by reading the file again.
+    """
+    # The source is always closed before the writer renames over it
+    source_digest = duplicate_manifest.new_digest() if hash_content else None
+    output_digest = duplicate_manifest.new_digest() if hash_content else None
+    if key is None and maps_exact_dedup(file_path, memory_limit, encoding, on_removed_counts is not None):
+        deduplicator = MappedDeduplicator(encoding=encoding, on_duplicate=on_duplicate, on_removed_counts=on_removed_counts)
+        with AtomicWriter(file_path, 'wb', digest=output_digest) as out:
+            with MappedLineScanner(file_path) as scanner:
+                source_stat = scanner.stat
+                _write_lines(deduplicator.unique_raw(scanner), out, os.linesep.encode('ascii'))
+                if hash_content and deduplicator.unique_lines == deduplicator.total_lines:
+                    scanner.update_digest(source_digest)
+            if deduplicator.unique_lines == deduplicator.total_lines:
+                out.discard()
+    else:
+        deduplicator = ExternalDeduplicator(memory_limit, key=key, on_duplicate=on_duplicate, on_removed_counts=on_removed_counts)
+        with AtomicWriter(file_path, 'w', encoding, digest=output_digest, errors=DECODE_ERRORS) as out:
+            if hash_content:
+                file = _open_hashed(io.FileIO(file_path, 'r'), 'r', source_digest, encoding, errors=DECODE_ERRORS)
+            else:
+                file = open(file_path, 'r', encoding=encoding, errors=DECODE_ERRORS)
+            with file:
+                source_stat = os.fstat(file.fileno())
+                _write_lines(deduplicator.unique(duplicate_engine.iter_file_lines(file), source_stat.st_size), out)
+            if deduplicator.unique_lines == deduplicator.total_lines:
+                out.discard()
+    if hash_content:
+        if out.discarded:
+            deduplicator.content_hash, deduplicator.file_stat = source_digest.hexdigest(), source_stat
+        else:
+            deduplicator.content_hash, deduplicator.file_stat = output_digest.hexdigest(), out.stat
+    return deduplicator
+
+
+BatchResult = namedtuple('BatchResult', 'total_lines unique_lines removed_path content_hash size mtime_ns skipped')
+
+
+def iter_removed_counts(removed_path):
+    """Yield the (line, count) rows of a dedup_file_job removed-lines file."""
+    with open(removed_path, 'rb') as file:
+        for data in file:
+            line, count = json.loads(data.decode('utf-8', 'surrogatepass'))
+            yield line, count
+
+
+def dedup_file_job(file_path, memory_limit=DEFAULT_MEMORY_LIMIT, key=None, encoding=None, known_hash=None, removed_dir=None,
+                   hash_content=False):
+    """Process-pool entry point for dedup_file, returning a picklable BatchResult.
+
+    Every removed line and its number of removed occurrences is streamed to
+    a JSON Lines file in `removed_dir` as it is counted, bucket by bucket;
+    `removed_path` names it (None when nothing was removed) and the caller
+    deletes it after reading it with iter_removed_counts. A file whose content
+    still hashes to `known_hash` is left alone and reported as skipped.
+    `content_hash`, `size` and `mtime_ns` describe the file as left behind
+    when `hash_content` or `known_hash` is given, for a manifest to record;
+    otherwise they are None.
+    """
+    if known_hash is not None:
+        file_hash, size, mtime_ns = duplicate_manifest.file_state(file_path)
+        if file_hash == known_hash:
+            return BatchResult(0, 0, None, file_hash, size, mtime_ns, True)
+        hash_content = True
+    removed_path = None
+    removed_file = None
+
+    def write_removed(counts):
+        nonlocal removed_path, removed_file
+        if removed_file is None:
+            fd, removed_path = tempfile.mkstemp(prefix='removed-', suffix='.jsonl', dir=removed_dir)
+            removed_file = os.fdopen(fd, 'wb', buffering=1024 * 1024)
+        for line, count in counts.items():
+            removed_file.write(json.dumps([line, count], ensure_ascii=False).encode('utf-8', 'surrogatepass') + b'\n')
+
+    try:
+        result = dedup_file(file_path, memory_limit, key, encoding=encoding, on_removed_counts=write_removed,
+                            hash_content=hash_content)
+    except BaseException:
+        if removed_file is not None:
+            removed_file.close()
+            os.remove(removed_path)
+        raise
+    if removed_file is not None:
+        removed_file.close()
+    if not hash_content:
+        return BatchResult(result.total_lines, result.unique_lines, removed_path, None, None, None, False)
+    return BatchResult(result.total_lines, result.unique_lines, removed_path, result.content_hash,
+                       result.file_stat.st_size, result.file_stat.st_mtime_ns, False)
+
+
+_SORT_ORDERS = {
+    'line_size_asc': (len, False),
+    'line_size_desc': (len, True),
+    'alphabetical': (None, False),
+}
+
+
+def _merge_runs(paths, sort_key, reverse):
+    runs = [(line for _, line in _read_records(path)) for path in paths]
+    return heapq.merge(*runs, key=sort_key, reverse=reverse)
+
+
+def external_sort(lines, sort_type, memory_limit=DEFAULT_MEMORY_LIMIT, tmp_dir=None):
+    """Stable sort_lines for inputs larger than the memory ceiling.
+
+    Runs that fit in memory are sorted on their own and spilled to temporary
+    files, then merged with heapq.merge, which keeps equal lines in input
+    order across runs.
+    """
+    if sort_type not in _SORT_ORDERS:
+        raise ValueError(f"Unknown sort type: {sort_type}")
+    sort_key, reverse = _SORT_ORDERS[sort_type]
+    lines = iter(lines)
+    work_dir = None
+    run_paths = []
+    try:
+        while True:
+            run = []
+            used = 0
+            for line in lines:
+                run.append(line)
+                used += len(line) + LINE_OVERHEAD
+                if used > memory_limit:
+                    break
+            else:
+                if not run_paths:
+                    yield from duplicate_engine.sort_lines(run, sort_type)
+                    return
+            if run:
+                if work_dir is None:
+                    work_dir = tempfile.mkdtemp(prefix='sort-', dir=tmp_dir)
+                run_path = os.path.join(work_dir, f"run-{len(run_paths)}")
+                with open(run_path, 'wb', buffering=1024 * 1024) as out:
+                    for line in duplicate_engine.sort_lines(run, sort_type):
+                        _write_record(out, 0, line)
+                run_paths.append(run_path)
+            if used <= memory_limit:
+                break
+        del run
+        # Merge in passes so the number of open run files stays bounded
+        while len(run_paths) > MAX_MERGE_RUNS:
+            merged_paths = []
+            for start in range(0, len(run_paths), MAX_MERGE_RUNS):
+                merged_path = os.path.join(work_dir, f"run-{len(run_paths)}-{start}")
+                with open(merged_path, 'wb', buffering=1024 * 1024) as out:
+                    for line in _merge_runs(run_paths[start:start + MAX_MERGE_RUNS], sort_key, reverse):
+                        _write_record(out, 0, line)
+                merged_paths.append(merged_path)
+            run_paths = merged_paths
+        yield from _merge_runs(run_paths, sort_key, reverse)
+    finally:
+        if work_dir is not None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def line_aligned_ranges(file_path, parts):
+    """Split a file into up to `parts` byte ranges that start and end on line boundaries."""
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return []
+    step = max(1, -(-size // parts))
+    ranges = []
+    with open(file_path, 'rb') as file:
+        start = 0
+        while start < size:
+            file.seek(min(size, start + step))
+            file.readline()
+            end = min(size, file.tell()) if start + step < size else size
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+PARALLEL_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def _range_chunks(file_path, start, end):
+    """Yield the lines of a line-aligned byte range in lists, without their '\n'.
+
+    A '\r' before the '\n' (or at the very end) is dropped, like
+    MappedLineScanner does, so CRLF lines compare and are written as LF.
+    """
+    with open(file_path, 'rb') as source:
+        source.seek(start)
+        position = start
+        while position < end:
+            data = source.read(min(PARALLEL_CHUNK_SIZE, end - position))
+            if position + len(data) < end and not data.endswith(b'\n'):
+                data += source.readline()
+            position += len(data)
+            lines = data.split(b'\n')
+            if data.endswith(b'\n'):
+                lines.pop()
+            if b'\r' in data:
+                lines = [line[:-1] if line.endswith(b'\r') else line for line in lines]
+            yield lines
+
+
+def _shard_path(work_dir, range_index, shard):
+    return os.path.join(work_dir, f"range-{range_index}-shard-{shard}")
+
+
+def _shard_range(file_path, start, end, shards, work_dir, range_index, memory_limit):
+    """Dedup one range locally and route its first occurrences to shards.
+
+    The range's keep map, one byte per line, is written to a `.keep` file.
+    Each shard gets a newline-separated file of lines and an array file of
+    their line numbers within the range. Lines are routed by crc32 so every
+    worker agrees on shard ownership. The local dedup is only a shortcut:
+    once its set outgrows `memory_limit` it starts over, and the shards drop
+    the repeats it let through.
+    """
+    paths = [_shard_path(work_dir, range_index, shard) for shard in range(shards)]
+    line_files = [open(path, 'wb', buffering=1024 * 1024) for path in paths]
+    number_files = [open(path + '.numbers', 'wb') for path in paths]
+    seen = set()
+    add = seen.add
+    used = 0
+    keep = bytearray()
+    keep_line = keep.append
+    line_number = 0
+    try:
+        for lines in _range_chunks(file_path, start, end):
+            shard_lines = [[] for _ in range(shards)]
+            shard_numbers = [array('Q') for _ in range(shards)]
+            for data in lines:
+                if data in seen:
+                    keep_line(0)
+                else:
+                    if used > memory_limit:
+                        seen.clear()
+                        used = 0
+                    add(data)
+                    used += len(data) + LINE_OVERHEAD
+                    keep_line(1)
+                    shard = zlib.crc32(data) % shards
+                    shard_lines[shard].append(data)
+                    shard_numbers[shard].append(line_number)
+                line_number += 1
+            for shard in range(shards):
+                if shard_lines[shard]:
+                    line_files[shard].write(b'\n'.join(shard_lines[shard]) + b'\n')
+                    shard_numbers[shard].tofile(number_files[shard])
+    finally:
+        for file in line_files + number_files:
+            file.close()
+    with open(os.path.join(work_dir, f"range-{range_index}.keep"), 'wb') as file:
+        file.write(keep)
+
+
+def _read_shard_file(path):
+    """(lines, line numbers) of one range's part of a shard; the files are removed."""
+    with open(path, 'rb') as file:
+        lines = file.read().split(b'\n')
+    lines.pop()
+    numbers = array('Q')
+    with open(path + '.numbers', 'rb') as file:
+        numbers.frombytes(file.read())
+    os.remove(path)
+    os.remove(path + '.numbers')
+    return lines, numbers
+
+
+def _read_numbers(file):
+    while True:
+        numbers = array('Q')
+        try:
+            numbers.fromfile(file, 65536)
+        except EOFError:
+            # The short last read still keeps what was there
+            yield from numbers
+            return
+        yield from numbers
+
+
+def _split_shard_file(path, parts):
+    """Re-split one range's part of a shard by line hash into `parts` files, a chunk at a time."""
+    part_lines = [[] for _ in range(parts)]
+    part_numbers = [array('Q') for _ in range(parts)]
+    buffered = 0
+
+    def flush():
+        for part in range(parts):
+            if part_lines[part]:
+                with open(f"{path}-{part}", 'ab') as file:
+                    file.write(b''.join(part_lines[part]))
+                with open(f"{path}-{part}.numbers", 'ab') as file:
+                    part_numbers[part].tofile(file)
+                part_lines[part].clear()
+                del part_numbers[part][:]
+
+    with open(path, 'rb') as lines, open(path + '.numbers', 'rb') as numbers:
+        for number, data in zip(_read_numbers(numbers), lines):
+            part = hash(data) % parts
+            part_lines[part].append(data)
+            part_numbers[part].append(number)
+            buffered += len(data)
+            if buffered > PARALLEL_CHUNK_SIZE:
+                flush()
+                buffered = 0
+    flush()
+    os.remove(path)
+    os.remove(path + '.numbers')
+    for part in range(parts):
+        # Every range needs a file for every part, even an empty one
+        open(f"{path}-{part}", 'ab').close()
+        open(f"{path}-{part}.numbers", 'ab').close()
+
+
+def _drop_repeats(paths):
+    """Append to `<path>.dropped` the line numbers of lines an earlier file in `paths` already had."""
+    seen = set()
+    add = seen.add
+    # Ranges are read in file order, so the first line seen is the first occurrence
+    for path, dropped_path in paths:
+        lines, numbers = _read_shard_file(path)
+        dropped = array('Q')
+        for number, data in zip(numbers, lines):
+            if data in seen:
+                dropped.append(number)
+            else:
+                add(data)
+        if dropped:
+            with open(dropped_path, 'ab') as file:
+                dropped.tofile(file)
+
+
+def _dedup_shard(shard, ranges, work_dir, memory_limit):
+    """Write, per range, the line numbers of the lines in `shard` already seen earlier.
+
+    A shard whose lines would not fit in `memory_limit` as a set is re-split
+    by line hash first, and every part is deduplicated on its own.
+    """
+    paths = [_shard_path(work_dir, range_index, shard) for range_index in range(ranges)]
+    size = sum(os.path.getsize(path) + os.path.getsize(path + '.numbers') // 8 * LINE_OVERHEAD for path in paths)
+    if size <= memory_limit:
+        _drop_repeats([(path, path + '.dropped') for path in paths])
+        return
+    parts = max(2, min(MAX_BUCKETS, -(-size * 2 // memory_limit)))
+    for path in paths:
+        _split_shard_file(path, parts)
+    for part in range(parts):
+        _drop_repeats([(f"{path}-{part}", path + '.dropped') for path in paths])
+
+
+def _write_range(file_path, start, end, range_index, shards, work_dir, out_path):
+    """Write the kept lines of one range to `out_path`; returns (lines, kept lines)."""
+    keep_path = os.path.join(work_dir, f"range-{range_index}.keep")
+    with open(keep_path, 'rb') as file:
+        keep = bytearray(file.read())
+    os.remove(keep_path)
+    for shard in range(shards):
+        dropped_path = _shard_path(work_dir, range_index, shard) + '.dropped'
+        if not os.path.exists(dropped_path):
+            continue
+        dropped = array('Q')
+        with open(dropped_path, 'rb') as file:
+            dropped.frombytes(file.read())
+        os.remove(dropped_path)
+        for line_number in dropped:
+            keep[line_number] = 0
+    line_number = 0
+    with open(out_path, 'wb', buffering=1024 * 1024) as out:
+        for lines in _range_chunks(file_path, start, end):
+            kept = list(compress(lines, keep[line_number:line_number + len(lines)]))
+            line_number += len(lines)
+            if kept:
+                out.write(b'\n'.join(kept) + b'\n')
+    return len(keep), keep.count(1)
+
+
+def parallel_dedup(file_path, out, workers=None, shards=None, tmp_dir=None, encoding=None,
+                   memory_limit=DEFAULT_MEMORY_LIMIT):
+    """Exact byte-level dedup of one large file across a process pool, written to binary file `out`.
+
+    Every phase runs in the pool: the file is cut into line-aligned ranges,
+    each range is deduplicated locally and its first occurrences are
+    hash-sharded, each shard finds the lines an earlier range already had,
+    and each range then copies its surviving lines to a part file. The parent
+    only concatenates the parts in order. Lines are compared and written as
+    raw bytes split on '\n', without the '\r' of CRLF endings, and every
+    written line ends with '\n'. `memory_limit` is shared by the workers:
+    there are enough shards for each to fit its share, a shard that still
+    does not fit is re-split on disk, and what passes between phases goes
+    through files. Returns (total_lines, unique_lines). Raises ValueError for
+    encodings whose newline is not the single byte 0x0A.
+    """
+    if not _is_byte_line_encoding(encoding):
+        raise ValueError(f"Cannot split {encoding} text on raw newline bytes")
+    workers = workers or os.cpu_count() or 1
+    ranges = line_aligned_ranges(file_path, workers)
+    if not ranges:
+        return 0, 0
+    worker_limit = max(1, memory_limit // workers)
+    if shards is None:
+        with MappedLineScanner(file_path) as scanner:
+            size = scanner.size + scanner.estimated_lines() * LINE_OVERHEAD
+        shards = max(workers * 4, min(MAX_BUCKETS, -(-size * 2 // worker_limit)))
+    work_dir = tempfile.mkdtemp(prefix='dedup-parallel-', dir=tmp_dir)
+    try:
+        part_paths = [os.path.join(work_dir, f"part-{range_index}") for range_index in range(len(ranges))]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(_shard_range, file_path, start, end, shards, work_dir, range_index, worker_limit)
+                           for range_index, (start, end) in enumerate(ranges)]:
+                future.result()
+            for future in [pool.submit(_dedup_shard, shard, len(ranges), work_dir, worker_limit) for shard in range(shards)]:
+                future.result()
+            write_futures = [pool.submit(_write_range, file_path, start, end, range_index, shards, work_dir,
+                                         part_paths[range_index])
+                             for range_index, (start, end) in enumerate(ranges)]
+            counts = [future.result() for future in write_futures]
+        for part_path in part_paths:
+            with open(part_path, 'rb') as part:
+                shutil.copyfileobj(part, out, 1024 * 1024)
+        return sum(total for total, _ in counts), sum(unique for _, unique in counts)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def parallel_dedup_file(file_path, out_path, workers=None, shards=None, tmp_dir=None, encoding=None,
+                        memory_limit=DEFAULT_MEMORY_LIMIT):
+    """parallel_dedup into an AtomicWriter for `out_path`."""
+    with AtomicWriter(out_path, 'wb') as out:
+        return parallel_dedup(file_path, out.file, workers, shards, tmp_dir, encoding, memory_limit)
@@ -0,0 +1,115 @@
+"""Manifest of files already deduplicated by earlier batch runs.
+
+Every entry keeps the file's size, mtime, a content hash and the last
+result. A file whose size and mtime still match its entry is skipped without
+being opened; when only the mtime moved, the content hash decides.
+"""
+
+import json
+import os
+import tempfile
+from hashlib import blake2b
+
+MANIFEST_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def new_digest():
+    """Hash object whose hexdigest() matches file_state for the same bytes."""
+    return blake2b(digest_size=16)
+
+
+def file_state(file_path):
+    """(content hash, size, mtime_ns) of a file.
+
+    The stat is taken before reading, so a change made while hashing leaves
+    a newer mtime behind and is never mistaken for the hashed content.
+    """
+    digest = new_digest()
+    with open(file_path, 'rb') as file:
+        stat = os.fstat(file.fileno())
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest(), stat.st_size, stat.st_mtime_ns
+
+
+class BatchManifest:
+    """Path -> entry map stored as JSON at `path`.
+
+    `options` names the duplicate criteria of a run; entries recorded under
+    other options never count as unchanged.
+    """
+
+    def __init__(self, path, options='exact'):
+        self.path = path
+        self.options = options
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == MANIFEST_VERSION:
+            self.entries = data.get('files', {})
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.manifest-', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump({'version': MANIFEST_VERSION, 'files': self.entries}, file)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def entry(self, file_path):
+        entry = self.entries.get(os.path.abspath(file_path))
+        if entry is None or entry['options'] != self.options:
+            return None
+        return entry
+
+    def unchanged(self, file_path):
+        """Return the entry when the file's size and mtime still match it, otherwise None."""
+        entry = self.entry(file_path)
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+            return entry
+        return None
+
+    def known_hash(self, file_path):
+        """Recorded hash of a file whose size still matches its entry, worth comparing against."""
+        entry = self.entry(file_path)
+        if entry is None:
+            return None
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            return None
+        return entry['hash'] if size == entry['size'] else None
+
+    def record(self, file_path, total_lines, unique_lines, file_hash, size, mtime_ns):
+        """Store a result; `size` and `mtime_ns` must describe the content that `file_hash` was taken from."""
+        self.entries[os.path.abspath(file_path)] = {
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'hash': file_hash,
+            'options': self.options,
+            'total_lines': total_lines,
+            'unique_lines': unique_lines,
+        }
+
+    def touch(self, file_path, size, mtime_ns):
+        """Refresh the stat of a file whose content hash matched its entry."""
+        entry = self.entries[os.path.abspath(file_path)]
+        entry['size'] = size
+        entry['mtime_ns'] = mtime_ns
@@ -0,0 +1,100 @@
+"""Batch reports aggregated per file and line, streamed to disk.
+
+Rows are (file, line, count, action). A removed line appears once per file
+with the number of occurrences dropped, instead of once per occurrence.
+Rows are appended to a JSON Lines file as results arrive and only their byte
+offsets stay in memory, so viewers can page rows in by index and exports
+stream straight from disk.
+"""
+
+import csv
+import json
+import os
+import shutil
+import tempfile
+from array import array
+from collections import OrderedDict
+
+import duplicate_files
+
+REPORT_FIELDS = ('file', 'line', 'count', 'action')
+REPORT_PAGE_SIZE = 256
+REPORT_CACHED_PAGES = 64
+
+
+class BatchReport:
+    """Append-only report stored as JSON Lines at `path` (a temporary file by default)."""
+
+    def __init__(self, path=None):
+        self.temporary = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='duplicate-report-', suffix='.jsonl')
+            os.close(fd)
+        self.path = path
+        self._file = open(path, 'w+b')
+        self._offsets = array('Q')
+        self._end = 0
+        self._at_end = True
+        self._pages = OrderedDict()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def add(self, file_path, line, count, action):
+        # Undecodable bytes survive as lone surrogates; they are written as JSON escapes so the file stays UTF-8
+        data = json.dumps([file_path, line, count, action], ensure_ascii=False).encode('utf-8', 'backslashreplace') + b'\n'
+        # The last page may have been cached while it was still short
+        self._pages.pop(len(self._offsets) // REPORT_PAGE_SIZE, None)
+        if not self._at_end:
+            self._file.seek(self._end)
+            self._at_end = True
+        self._file.write(data)
+        self._offsets.append(self._end)
+        self._end += len(data)
+
+    def add_removed(self, file_path, removed_path):
+        """Append the rows of a dedup_file_job removed-lines file."""
+        for line, count in duplicate_files.iter_removed_counts(removed_path):
+            self.add(file_path, line, count, "Removed")
+
+    def _read_page(self, page):
+        start = page * REPORT_PAGE_SIZE
+        stop = min(len(self._offsets), start + REPORT_PAGE_SIZE)
+        self._file.flush()
+        self._file.seek(self._offsets[start])
+        self._at_end = False
+        readline = self._file.readline
+        return [tuple(json.loads(readline().decode('utf-8', 'surrogatepass'))) for _ in range(start, stop)]
+
+    def row(self, index):
+        page = index // REPORT_PAGE_SIZE
+        rows = self._pages.get(page)
+        if rows is None:
+            rows = self._pages[page] = self._read_page(page)
+            if len(self._pages) > REPORT_CACHED_PAGES:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page)
+        return rows[index - page * REPORT_PAGE_SIZE]
+
+    def __iter__(self):
+        self._file.flush()
+        with open(self.path, 'rb') as file:
+            for data in file:
+                yield tuple(json.loads(data.decode('utf-8', 'surrogatepass')))
+
+    def export_jsonl(self, out_path):
+        self._file.flush()
+        with duplicate_files.AtomicWriter(out_path, 'wb') as out, open(self.path, 'rb') as source:
+            shutil.copyfileobj(source, out.file)
+
+    def export_csv(self, out_path):
+        with duplicate_files.AtomicWriter(out_path, 'w', 'utf-8', newline='', errors=duplicate_files.DECODE_ERRORS) as out:
+            writer = csv.writer(out.file)
+            writer.writerow(REPORT_FIELDS)
+            writer.writerows(self)
+
+    def close(self):
+        self._file.close()
+        if self.temporary and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,274 @@
+"""Near-duplicate grouping for the fuzzy duplicate criteria.
+
+Grouping functions return one key per input line; lines that ended up in the
+same group share a key, so the result plugs straight into
+duplicate_engine.DuplicateIndex(lines, keys=...).
+"""
+
+from collections import Counter
+
+_HASH_MASK = (1 << 64) - 1
+_EMPTY_BIN = 1 << 64
+# Members kept per LSH bucket as comparison candidates for later lines
+BUCKET_CANDIDATES = 4
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        parent = self.parent
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+        while parent[item] != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            # The smaller index stays the root so group keys follow document order
+            if second < first:
+                first, second = second, first
+            self.parent[second] = first
+
+
+def _group_keys(lines, distinct, union_find):
+    roots = [union_find.find(i) for i in range(len(distinct))]
+    first_positions = {}
+    keys = []
+    for line in lines:
+        root = roots[distinct[line]]
+        keys.append(first_positions.setdefault(root, len(keys)))
+    return keys
+
+
+def _distinct_texts(lines):
+    # Identical lines always group together, so only distinct texts are compared
+    distinct = {}
+    for line in lines:
+        if line not in distinct:
+            distinct[line] = len(distinct)
+    return distinct
+
+
+class MinHasher:
+    """MinHash signatures using one-permutation hashing.
+
+    A single hash per shingle is split into `num_perm` bins and each bin keeps
+    its minimum, instead of hashing every shingle `num_perm` times. Empty bins
+    borrow from the next filled bin (rotation densification) so signatures of
+    short lines stay comparable.
+    """
+
+    def __init__(self, num_perm=64, shingle_size=3):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+    def shingles(self, text):
+        size = self.shingle_size
+        if len(text) <= size:
+            return {text}
+        return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+    def signature(self, text):
+        bins = self.num_perm
+        signature = [_EMPTY_BIN] * bins
+        for value in map(hash, self.shingles(text)):
+            value &= _HASH_MASK
+            bin_index = value % bins
+            if value < signature[bin_index]:
+                signature[bin_index] = value
+        if _EMPTY_BIN in signature:
+            filled = signature[:]
+            nearest = None
+            for i in range(2 * bins - 1, -1, -1):
+                if filled[i % bins] != _EMPTY_BIN:
+                    nearest = i
+                elif i < bins:
+                    signature[i] = filled[nearest % bins] + (nearest - i) * _EMPTY_BIN
+        return tuple(signature)
+
+
+def jaccard(first, second):
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+def lsh_parameters(threshold, num_perm):
+    """Pick (bands, rows) so that the LSH S-curve crosses 1/2 closest to `threshold`."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        crossing = (1.0 / bands) ** (1.0 / rows)
+        score = abs(crossing - threshold)
+        if best is None or score < best[0]:
+            best = (score, bands, rows)
+    return best[1], best[2]
+
+
+def similar_keys(lines, threshold=0.8, num_perm=64, shingle_size=3):
+    """Group lines whose character-shingle Jaccard similarity reaches `threshold`.
+
+    Signatures are bucketed band by band, and only lines sharing a bucket are
+    compared, which keeps the work close to linear in the number of lines.
+    Candidates are confirmed on their exact shingle sets, so `threshold` is a
+    real Jaccard cutoff rather than a signature estimate.
+    """
+    lines = lines if isinstance(lines, list) else list(lines)
+    distinct = _distinct_texts(lines)
+    texts = list(distinct)
+    hasher = MinHasher(num_perm, shingle_size)
+    bands, rows = lsh_parameters(threshold, num_perm)
+    buckets = [{} for _ in range(bands)]
+    union_find = _UnionFind(len(texts))
+
+    for item, text in enumerate(texts):
+        signature = hasher.signature(text)
+        shingles = None
+        for band, table in enumerate(buckets):
+            band_key = signature[band * rows:(band + 1) * rows]
+            candidates = table.get(band_key)
+            if candidates is None:
+                table[band_key] = [item]
+                continue
+            for candidate in candidates:
+                if union_find.find(candidate) == union_find.find(item):
+                    break
+                if shingles is None:
+                    shingles = hasher.shingles(text)
+                if jaccard(hasher.shingles(texts[candidate]), shingles) >= threshold:
+                    union_find.union(candidate, item)
+                    break
+            else:
+                if len(candidates) < BUCKET_CANDIDATES:
+                    candidates.append(item)
+
+    return _group_keys(lines, distinct, union_find)
+
+
+def levenshtein(first, second, max_distance=None):
+    """Edit distance, or `max_distance + 1` as soon as it is known to exceed `max_distance`."""
+    if len(first) < len(second):
+        first, second = second, first
+    if max_distance is None:
+        max_distance = len(first)
+    if len(first) - len(second) > max_distance:
+        return max_distance + 1
+    too_far = max_distance + 1
+    previous = list(range(len(second) + 1))
+    for i, char in enumerate(first, 1):
+        # Only cells within max_distance of the diagonal can stay under the limit
+        low = max(1, i - max_distance)
+        high = min(len(second), i + max_distance)
+        current = [too_far] * (len(second) + 1)
+        current[0] = i if i <= max_distance else too_far
+        row_min = current[0]
+        for j in range(low, high + 1):
+            cost = previous[j - 1] + (char != second[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min > max_distance:
+            return too_far
+        previous = current
+    return min(previous[len(second)], too_far)
+
+
+def _segments(length, max_distance):
+    """(start, length) of the `max_distance + 1` segments a line of `length` is cut into."""
+    parts = max_distance + 1
+    base, longer = divmod(length, parts)
+    segments = []
+    start = 0
+    for part in range(parts):
+        size = base + (part >= parts - longer)
+        segments.append((start, size))
+        start += size
+    return segments
+
+
+def _char_signature(text, masks):
+    """128-bit set of hashed (character, occurrence number) pairs of `text`.
+
+    One edit adds or removes at most one pair from each side, so lines within
+    k edits have signatures differing in at most 2k bits. `masks` caches the
+    bits of each (character, count) across calls.
+    """
+    bits = 0
+    for pair in Counter(text).items():
+        mask = masks.get(pair)
+        if mask is None:
+            char, count = pair
+            mask = 0
+            for occurrence in range(count):
+                mask |= 1 << (hash((char, occurrence)) & 127)
+            masks[pair] = mask
+        bits |= mask
+    return bits
+
+
+def close_keys(lines, max_distance=1):
+    """Group lines within Levenshtein distance `max_distance` of each other.
+
+    Uses a pigeonhole partition index: every line is cut into
+    `max_distance + 1` segments, and k edits leave at least one of them
+    intact, shifted by at most k characters in any line within distance k.
+    Lines are visited by length, so each one only looks up the segments of
+    the shorter or equal lines still within reach, at shifted positions of
+    its own text; that is (k + 1)^2 * (2k + 1) lookups per line instead of
+    a deletion neighbourhood growing with len^k. A shared segment is weak
+    evidence on structured text such as `key.name = value`, so candidates
+    whose character signatures differ in more than 2k bits are dropped before
+    the bounded edit distance confirms the rest. Blank lines are excluded
+    (key None).
+    """
+    lines = lines if isinstance(lines, list) else list(lines)
+    distinct = _distinct_texts(lines)
+    texts = list(distinct)
+    union_find = _UnionFind(len(texts))
+    find = union_find.find
+    # length -> {(segment number, segment text): items}
+    segment_index = {}
+    segment_layouts = {}
+    masks = {}
+    signatures = [_char_signature(text, masks) for text in texts]
+    signature_bound = 2 * max_distance
+
+    for item in sorted(range(len(texts)), key=lambda i: len(texts[i])):
+        text = texts[item]
+        if not text.strip():
+            continue
+        length = len(text)
+        for stale_length in [l for l in segment_index if l < length - max_distance]:
+            del segment_index[stale_length]
+
+        candidates = set()
+        for other_length, index in segment_index.items():
+            for number, (start, size) in enumerate(segment_layouts[other_length]):
+                for shifted in range(max(0, start - max_distance), min(length - size, start + max_distance) + 1):
+                    candidates.update(index.get((number, text[shifted:shifted + size]), ()))
+        signature = signatures[item]
+        for candidate in candidates:
+            if ((signatures[candidate] ^ signature).bit_count() <= signature_bound and find(candidate) != find(item)
+                    and levenshtein(texts[candidate], text, max_distance) <= max_distance):
+                union_find.union(candidate, item)
+
+        layout = segment_layouts.get(length)
+        if layout is None:
+            layout = segment_layouts[length] = _segments(length, max_distance)
+        index = segment_index.setdefault(length, {})
+        for number, (start, size) in enumerate(layout):
+            index.setdefault((number, text[start:start + size]), []).append(item)
+
+    keys = _group_keys(lines, distinct, union_find)
+    return [None if not line.strip() else line_key for line, line_key in zip(lines, keys)]
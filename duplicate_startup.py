@@ -0,0 +1,182 @@
+"""Startup phase timing and an offscreen startup benchmark.
+
+main.py records its startup phases on every launch, which costs a handful of
+perf_counter calls. The report is only written when DUPLICATE_REMOVER_PROFILE
+names a JSON file ('-' for stderr). The benchmark launches the GUI offscreen
+with an empty profile and settings directory, quits right after the first
+paint, and reports the median of every phase:
+
+    python duplicate_startup.py --runs 20 --output startup.json
+    python duplicate_startup.py --runs 20 --baseline startup.json --tolerance 0.25
+    python duplicate_startup.py --runs 20 --restore big.txt notes.txt
+
+With --restore the saved session reopens those files, which the
+session_restore phase times. With --baseline the exit status is 1 when any
+phase got slower than allowed.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+PROFILE_ENV = 'DUPLICATE_REMOVER_PROFILE'
+EXIT_AFTER_PAINT_ENV = 'DUPLICATE_REMOVER_EXIT_AFTER_PAINT'
+# Phases faster than this are below timer noise and never count as regressions
+MIN_REGRESSION_MS = 2.0
+# Where QSettings("MyCompany", "MyApp") lives under XDG_CONFIG_HOME
+SETTINGS_FILE = os.path.join('MyCompany', 'MyApp.conf')
+
+
+class StartupProfile:
+    """Durations of named startup phases plus milestones since process start, in milliseconds."""
+
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.phases = {}
+        self.milestones = {}
+
+    @property
+    def enabled(self):
+        return bool(os.environ.get(PROFILE_ENV))
+
+    def record(self, name, since):
+        self.phases[name] = (time.perf_counter() - since) * 1000
+
+    @contextmanager
+    def phase(self, name):
+        since = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, since)
+
+    def mark(self, name):
+        self.milestones[name] = (time.perf_counter() - self.started) * 1000
+
+    def report(self):
+        return {'phases': self.phases, 'milestones': self.milestones}
+
+    def write(self, target=None):
+        target = target or os.environ.get(PROFILE_ENV)
+        if not target:
+            return
+        text = json.dumps(self.report(), indent=2)
+        if target == '-':
+            print(text, file=sys.stderr)
+            return
+        with open(target, 'w', encoding='utf-8') as file:
+            file.write(text)
+
+
+def _ini_string(text):
+    # QSettings' INI escaping: quoted, with \xNNNN per UTF-16 unit outside ASCII. An escape
+    # swallows every hex digit after it, so '""' closes it when a digit follows.
+    parts = ['"']
+    escaped = False
+    for char in text:
+        if ord(char) < 128:
+            if escaped and char in string.hexdigits:
+                parts.append('""')
+            parts.append('\\' + char if char in '\\"' else char)
+            escaped = False
+        else:
+            units = char.encode('utf-16-be')
+            parts.extend(f'\\x{units[i] << 8 | units[i + 1]:04x}' for i in range(0, len(units), 2))
+            escaped = True
+    parts.append('"')
+    return ''.join(parts)
+
+
+def write_session(work_dir, file_paths):
+    """Saved settings under `work_dir` that make the GUI reopen `file_paths` on launch."""
+    path = os.path.join(work_dir, SETTINGS_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='ascii') as file:
+        file.write("[General]\n")
+        if file_paths:
+            file.write(f"last_opened_files={', '.join(_ini_string(os.path.abspath(p)) for p in file_paths)}\n")
+
+
+def run_once(main_script, work_dir, timeout=60):
+    report_path = os.path.join(work_dir, 'profile.json')
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen', XDG_CONFIG_HOME=work_dir, HOME=work_dir)
+    env[PROFILE_ENV] = report_path
+    env[EXIT_AFTER_PAINT_ENV] = '1'
+    launched = time.perf_counter()
+    subprocess.run([sys.executable, main_script], cwd=work_dir, env=env, timeout=timeout, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wall = (time.perf_counter() - launched) * 1000
+    with open(report_path, encoding='utf-8') as file:
+        report = json.load(file)
+    os.remove(report_path)
+    report['milestones']['process_exit'] = wall
+    return report
+
+
+def benchmark(main_script, runs=10, warmup=1, restore=()):
+    """Median of every phase and milestone over `runs` offscreen launches that reopen `restore`."""
+    samples = {}
+    with tempfile.TemporaryDirectory(prefix='startup-bench-') as work_dir:
+        for run in range(warmup + runs):
+            # Rewritten every run, so nothing the GUI saves on exit carries over
+            write_session(work_dir, restore)
+            report = run_once(main_script, work_dir)
+            if run < warmup:
+                continue
+            for section in ('phases', 'milestones'):
+                for name, value in report[section].items():
+                    samples.setdefault(f"{section}.{name}", []).append(value)
+    return {name: round(statistics.median(values), 3) for name, values in samples.items()}
+
+
+def regressions(results, baseline, tolerance):
+    """(name, baseline, current) for every timing more than `tolerance` slower than the baseline."""
+    slower = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None or current < MIN_REGRESSION_MS:
+            continue
+        if current > previous * (1 + tolerance):
+            slower.append((name, previous, current))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark GUI startup offscreen.")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--main', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py'))
+    parser.add_argument('--output', help="Write the medians to this JSON file")
+    parser.add_argument('--baseline', help="JSON file from an earlier --output run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown as a fraction (default 0.2)")
+    parser.add_argument('--restore', nargs='+', default=[], metavar='FILE',
+                        help="Reopen these files from the saved session on every launch")
+    args = parser.parse_args(argv)
+    missing = [path for path in args.restore if not os.path.isfile(path)]
+    if missing:
+        parser.error(f"not a file: {', '.join(missing)}")
+
+    results = benchmark(args.main, args.runs, args.warmup, args.restore)
+    for name, value in sorted(results.items()):
+        print(f"{name:32} {value:10.1f} ms")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            slower = regressions(results, json.load(file), args.tolerance)
+        for name, previous, current in slower:
+            print(f"Regression: {name} {previous:.1f} ms -> {current:.1f} ms", file=sys.stderr)
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
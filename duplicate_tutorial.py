@@ -0,0 +1,547 @@
+"""Interactive tutorial dialog.
+
+Kept out of main.py so that QtWebEngine (and its Chromium process) is only
+loaded when Help -> Tutorial is first opened.
+"""
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QDialog, QHBoxLayout, QProgressBar, QPushButton, QVBoxLayout
+from PyQt5.QtWebEngineWidgets import QWebEngineView
+
+class DuplicateRemoverTutorialWindow(QDialog):
+    def __init__(self, parent=None):
+        super(DuplicateRemoverTutorialWindow, self).__init__(parent)
+        self.setWindowTitle("Interactive Tutorial")
+        self.setGeometry(100, 100, 800, 600)
+        self.setWindowModality(Qt.ApplicationModal)
+
+        self.layout = QVBoxLayout()
+
+        self.webView = QWebEngineView()
+        self.layout.addWidget(self.webView)
+
+        self.navigation_layout = QHBoxLayout()
+        self.back_button = QPushButton("Previous")
+        self.back_button.clicked.connect(self.go_to_previous_page)
+        self.navigation_layout.addWidget(self.back_button)
+
+        self.forward_button = QPushButton("Next")
+        self.forward_button.clicked.connect(self.go_to_next_page)
+        self.navigation_layout.addWidget(self.forward_button)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.navigation_layout.addWidget(self.progress_bar)
+
+        self.start_button = QPushButton("Start Editing")
+        self.start_button.clicked.connect(self.close)
+        self.navigation_layout.addWidget(self.start_button)
+
+        self.layout.addLayout(self.navigation_layout)
+        self.setLayout(self.layout)
+
+        self.current_page_index = 0
+        self.tutorial_pages = [
+            self.create_welcome_page(),
+            self.create_opening_files_page(),
+            self.create_editing_files_page(),
+            self.create_saving_files_page(),
+            self.create_removing_duplicates_page(),
+            self.create_sorting_and_merging_page(),
+            self.create_batch_operations_page(),
+            self.create_additional_features_page(),
+        ]
+
+        self.load_tutorial_page(self.current_page_index)
+
+    def create_welcome_page(self):
+        return """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {
+                    font-family: 'Arial', sans-serif;
+                    margin: 20px;
+                    padding: 20px;
+                    line-height: 1.6;
+                    background-color: #f4f4f4;
+                    color: #333;
+                }
+                h1 {
+                    color: #026be4;
+                    text-align: center;
+                }
+                p {
+                    margin: 10px 0;
+                }
+                .button {
+                    background-color: #4CAF50;
+                    border: none;
+                    color: white;
+                    padding: 15px 32px;
+                    text-align: center;
+                    text-decoration: none;
+                    display: inline-block;
+                    font-size: 16px;
+                    margin: 4px 2px;
+                    cursor: pointer;
+                    border-radius: 5px;
+                }
+            </style>
+        </head>
+        <body>
+            <h1>Welcome to the TSTP:Duplicate Deleter Tutorial</h1>
+            <p>In this interactive tutorial, you will learn how to use the key features of the TSTP:Duplicate Deleter application.</p>
+            <p>Let's get started!</p>
+        </body>
+        </html>
+        """
+
+    def create_opening_files_page(self):
+        return """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {
+                    font-family: 'Arial', sans-serif;
+                    margin: 20px;
+                    padding: 20px;
+                    line-height: 1.6;
+                    background-color: #f4f4f4;
+                    color: #333;
+                }
+                h2 {
+                    color: #0294a5;
+                }
+                p {
+                    margin: 10px 0;
+                }
+                ol {
+                    padding: 20px;
+                }
+                li {
+                    margin: 10px 0;
+                    font-size: 16px;
+                }
+                code {
+                    font-family: 'Courier New', monospace;
+                    background-color: #eaeaea;
+                    padding: 2px 5px;
+                    border-radius: 3px;
+                }
+                .button {
+                    background-color: #4CAF50;
+                    border: none;
+                    color: white;
+                    padding: 15px 32px;
+                    text-align: center;
+                    text-decoration: none;
+                    display: inline-block;
+                    font-size: 16px;
+                    margin: 4px 2px;
+                    cursor: pointer;
+                    border-radius: 5px;
+                }
+            </style>
+        </head>
+        <body>
+            <h2>Opening Files</h2>
+            <p>To open a file, follow these steps:</p>
+            <ol>
+                <li>Click on the <code>File</code> menu in the top-left corner.</li>
+                <li>Select the <code>Open</code> option.</li>
+                <li>In the file dialog, navigate to the file you want to open and click <code>Open</code>.</li>
+            </ol>
+            <p>Each file you open will be displayed in a new tab.</p>
+        </body>
+        </html>
+        """
+
+    def create_editing_files_page(self):
+        return """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {
+                    font-family: 'Arial', sans-serif;
+                    margin: 20px;
+                    padding: 20px;
+                    line-height: 1.6;
+                    background-color: #f4f4f4;
+                    color: #333;
+                }
+                h2 {
+                    color: #0294a5;
+                }
+                p {
+                    margin: 10px 0;
+                }
+                .button {
+                    background-color: #4CAF50;
+                    border: none;
+                    color: white;
+                    padding: 15px 32px;
+                    text-align: center;
+                    text-decoration: none;
+                    display: inline-block;
+                    font-size: 16px;
+                    margin: 4px 2px;
+                    cursor: pointer;
+                    border-radius: 5px;
+                }
+            </style>
+        </head>
+        <body>
+            <h2>Editing Files</h2>
+            <p>To edit the contents of a file, simply make changes directly in the text editor provided in each tab.</p>
+            <p>You can use the standard keyboard shortcuts for common editing operations, such as:</p>
+            <ul>
+                <li><code>Ctrl+Z</code> to undo your changes</li>
+                <li><code>Ctrl+Y</code> to redo your changes</li>
+                <li><code>Ctrl+F</code> to search for text within the file</li>
+                <li><code>Ctrl+H</code> to replace text within the file</li>
+            </ul>
+        </body>
+        </html>
+        """
+
+    def create_saving_files_page(self):
+        return """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {
+                    font-family: 'Arial', sans-serif;
+                    margin: 20px;
+                    padding: 20px;
+                    line-height: 1.6;
+                    background-color: #f4f4f4;
+                    color: #333;
+                }
+                h2 {
+                    color: #0294a5;
+                }
+                p {
+                    margin: 10px 0;
+                }
+                ol {
+                    padding: 20px;
+                }
+                li {
+                    margin: 10px 0;
+                    font-size: 16px;
+                }
+                code {
+                    font-family: 'Courier New', monospace;
+                    background-color: #eaeaea;
+                    padding: 2px 5px;
+                    border-radius: 3px;
+                }
+                .button {
+                    background-color: #4CAF50;
+                    border: none;
+                    color: white;
+                    padding: 15px 32px;
+                    text-align: center;
+                    text-decoration: none;
+                    display: inline-block;
+                    font-size: 16px;
+                    margin: 4px 2px;
+                    cursor: pointer;
+                    border-radius: 5px;
+                }
+            </style>
+        </head>
+        <body>
+            <h2>Saving Files</h2>
+            <p>To save your changes, you can use the following options:</p>
+            <ol>
+                <li>Click on the <code>Save</code> button in the toolbar to save the current file.</li>
+                <li>Go to the <code>File</code> menu and select <code>Save</code> to save the current file.</li>
+                <li>To save a file with a new name or in a different location, go to the <code>File</code> menu and select <code>Save As</code>.</li>
+            </ol>
+        </body>
+        </html>
+        """
+
+    def create_removing_duplicates_page(self):
+        return """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {
+                    font-family: 'Arial', sans-serif;
+                    margin: 20px;
+                    padding: 20px;
+                    line-height: 1.6;
+                    background-color: #f4f4f4;
+                    color: #333;
+                }
+                h2 {
+                    color: #0294a5;
+                }
+                p {
+                    margin: 10px 0;
+                }
+                ol {
+                    padding: 20px;
+                }
+                li {
+                    margin: 10px 0;
+                    font-size: 16px;
+                }
+                code {
+                    font-family: 'Courier New', monospace;
+                    background-color: #eaeaea;
+                    padding: 2px 5px;
+                    border-radius: 3px;
+                }
+                .button {
+                    background-color: #4CAF50;
+                    border: none;
+                    color: white;
+                    padding: 15px 32px;
+                    text-align: center;
+                    text-decoration: none;
+                    display: inline-block;
+                    font-size: 16px;
+                    margin: 4px 2px;
+                    cursor: pointer;
+                    border-radius: 5px;
+                }
+            </style>
+        </head>
+        <body>
+            <h2>Removing Duplicates</h2>
+            <p>To remove duplicate lines from your file, follow these steps:</p>
+            <ol>
+                <li>Go to the <code>Edit</code> menu and select the <code>Remove Duplicates</code> option.</li>
+                <li>A dialog will appear, allowing you to choose which duplicate lines to remove. You can select the specific lines you want to remove or choose to remove all duplicates.</li>
+                <li>Once you've made your selection, click <code>OK</code> to apply the changes.</li>
+            </ol>
+        </body>
+        </html>
+        """
+
+    def create_sorting_and_merging_page(self):
+        return """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {
+                    font-family: 'Arial', sans-serif;
+                    margin: 20px;
+                    padding: 20px;
+                    line-height: 1.6;
+                    background-color: #f4f4f4;
+                    color: #333;
+                }
+                h2 {
+                    color: #0294a5;
+                }
+                p {
+                    margin: 10px 0;
+                }
+                ol {
+                    padding: 20px;
+                }
+                li {
+                    margin: 10px 0;
+                    font-size: 16px;
+                }
+                code {
+                    font-family: 'Courier New', monospace;
+                    background-color: #eaeaea;
+                    padding: 2px 5px;
+                    border-radius: 3px;
+                }
+                .button {
+                    background-color: #4CAF50;
+                    border: none;
+                    color: white;
+                    padding: 15px 32px;
+                    text-align: center;
+                    text-decoration: none;
+                    display: inline-block;
+                    font-size: 16px;
+                    margin: 4px 2px;
+                    cursor: pointer;
+                    border-radius: 5px;
+                }
+            </style>
+        </head>
+        <body>
+            <h2>Sorting and Merging</h2>
+            <p>The TSTP:Duplicate Deleter application also provides the following features:</p>
+            <ol>
+                <li>Sorting: You can sort the lines in your file in ascending or descending order. Go to the <code>Edit</code> menu and select either <code>Sort Ascending</code> or <code>Sort Descending</code>.</li>
+                <li>Merging: If you have duplicate lines that you want to keep, you can merge them into a single line. Go to the <code>Edit</code> menu and select <code>Merge Duplicates</code>.</li>
+            </ol>
+        </body>
+        </html>
+        """
+    def create_batch_operations_page(self):
+        return """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {
+                    font-family: 'Arial', sans-serif;
+                    margin: 20px;
+                    padding: 20px;
+                    line-height: 1.6;
+                    background-color: #f4f4f4;
+                    color: #333;
+                }
+                h2 {
+                    color: #0294a5;
+                }
+                p {
+                    margin: 10px 0;
+                }
+                ol {
+                    padding: 20px;
+                }
+                li {
+                    margin: 10px 0;
+                    font-size: 16px;
+                }
+                code {
+                    font-family: 'Courier New', monospace;
+                    background-color: #eaeaea;
+                    padding: 2px 5px;
+                    border-radius: 3px;
+                }
+                .button {
+                    background-color: #4CAF50;
+                    border: none;
+                    color: white;
+                    padding: 15px 32px;
+                    text-align: center;
+                    text-decoration: none;
+                    display: inline-block;
+                    font-size: 16px;
+                    margin: 4px 2px;
+                    cursor: pointer;
+                    border-radius: 5px;
+                }
+            </style>
+        </head>
+        <body>
+            <h2>Batch Operations</h2>
+            <p>The TSTP:Duplicate Deleter application also supports batch operations, allowing you to process multiple files at once.</p>
+            <ol>
+                <li>
+                    <strong>Batch Duplicate Removal:</strong>
+                    <ul>
+                        <li>Go to the <code>Batch</code> menu and select <code>Batch Duplicate Removal</code>.</li>
+                        <li>In the Batch Duplicate Removal window, click the <code>Add Files</code> button to select the files you want to process.</li>
+                        <li>Once you've added the files, click the <code>Start Batch Removal</code> button to remove duplicates from all the files.</li>
+                    </ul>
+                </li>
+                <li>
+                    <strong>Batch File Merging:</strong>
+                    <ul>
+                        <li>Go to the <code>Batch</code> menu and select <code>Batch Merge Files</code>.</li>
+                        <li>In the file dialog, select the files you want to merge.</li>
+                        <li>The application will combine the contents of all the selected files into a single file, which you can then save.</li>
+                    </ul>
+                </li>
+            </ol>
+        </body>
+        </html>
+        """
+
+    def create_additional_features_page(self):
+        return """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {
+                    font-family: 'Arial', sans-serif;
+                    margin: 20px;
+                    padding: 20px;
+                    line-height: 1.6;
+                    background-color: #f4f4f4;
+                    color: #333;
+                }
+                h2 {
+                    color: #0294a5;
+                }
+                p {
+                    margin: 10px 0;
+                }
+                ul {
+                    padding: 20px;
+                }
+                li {
+                    margin: 10px 0;
+                    font-size: 16px;
+                }
+                code {
+                    font-family: 'Courier New', monospace;
+                    background-color: #eaeaea;
+                    padding: 2px 5px;
+                    border-radius: 3px;
+                }
+                .button {
+                    background-color: #4CAF50;
+                    border: none;
+                    color: white;
+                    padding: 15px 32px;
+                    text-align: center;
+                    text-decoration: none;
+                    display: inline-block;
+                    font-size: 16px;
+                    margin: 4px 2px;
+                    cursor: pointer;
+                    border-radius: 5px;
+                }
+            </style>
+        </head>
+        <body>
+            <h2>Additional Features</h2>
+            <p>The TSTP:Duplicate Deleter application also includes the following additional features:</p>
+            <ul>
+                <li>
+                    <strong>File Comparison:</strong>
+                    <ul>
+                        <li>You can compare the contents of two files side-by-side.</li>
+                        <li>Go to the <code>File</code> menu and select <code>Compare Files</code>.</li>
+                    </ul>
+                </li>
+                <li>
+                    <strong>Dark Mode:</strong>
+                    <ul>
+                        <li>The application supports a dark mode theme to reduce eye strain.</li>
+                        <li>Toggle dark mode by going to the <code>File</code> menu and selecting <code>Toggle Dark Mode</code>.</li>
+                    </ul>
+                </li>
+            </ul>
+            <button class="button previous-button">Previous</button>
+            <button class="button start-button">Start Editing</button>
+        </body>
+        </html>
+        """
+
+    def load_tutorial_page(self, index):
+        self.webView.setHtml(self.tutorial_pages[index])
+        self.progress_bar.setValue(int((index + 1) / len(self.tutorial_pages) * 100))
+
+    def go_to_previous_page(self):
+        if self.current_page_index > 0:
+            self.current_page_index -= 1
+            self.load_tutorial_page(self.current_page_index)
+
+    def go_to_next_page(self):
+        if self.current_page_index < len(self.tutorial_pages) - 1:
+            self.current_page_index += 1
+            self.load_tutorial_page(self.current_page_index)
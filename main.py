@@ -1,14 +1,33 @@
+import time
+STARTUP_STARTED = time.perf_counter()
+
+import os
 import sys
 import re
 import logging
-from PyQt5.QtCore import QRect, QRegularExpression, QUrl, Qt, QSettings, QSize
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import chain, compress
+from PyQt5.QtCore import QAbstractTableModel, QEvent, QModelIndex, QObject, QRect, QRegularExpression, Qt, QSettings, QSize, QStandardPaths, QTimer, pyqtSignal
 from PyQt5.QtWidgets import (QApplication, QColorDialog, QDialogButtonBox, QInputDialog, QListWidget, QMainWindow, QPlainTextEdit, QVBoxLayout, QPushButton, QWidget,
-                             QTabWidget, QMenuBar, QAction, QFileDialog, QMessageBox, QDialog, QTableWidget,
-                             QTableWidgetItem, QHBoxLayout, QCheckBox, QHeaderView, QComboBox, QLabel,
+                             QTabWidget, QMenuBar, QAction, QFileDialog, QMessageBox, QDialog,
+                             QTableView, QHBoxLayout, QCheckBox, QHeaderView, QComboBox, QLabel,
                              QLineEdit, QProgressBar, QGroupBox, QFormLayout, QGridLayout, QTextEdit, QSplitter,
-                             QToolTip, QSpacerItem, QSizePolicy)
+                             QToolTip, QSpacerItem, QSizePolicy, QSpinBox, QDoubleSpinBox)
 from PyQt5.QtGui import QIcon, QFont, QColor, QPainter, QPalette, QSyntaxHighlighter, QTextCharFormat, QTextCursor, QKeySequence, QTextFormat
-from PyQt5.QtWebEngineWidgets import QWebEngineView
+
+import duplicate_engine
+import duplicate_files
+import duplicate_manifest
+import duplicate_report
+import duplicate_similarity
+import duplicate_startup
+
+startup_profile = duplicate_startup.StartupProfile(STARTUP_STARTED)
+startup_profile.record('imports', STARTUP_STARTED)
 
 class DuplicateRemoverUserSettings:
     def __init__(self):
@@ -16,18 +35,22 @@ class DuplicateRemoverUserSettings:
         self.window_size = QSize(800, 600)
         self.window_position = None
         self.duplicate_highlight_color = QColor("yellow")
+        self.memory_limit_mb = duplicate_files.DEFAULT_MEMORY_LIMIT // (1024 * 1024)
 
     def load_settings(self, settings):
-        self.last_opened_files = settings.value("last_opened_files", [])
+        # A single saved path reads back as a plain string unless a list is asked for
+        self.last_opened_files = settings.value("last_opened_files", [], type="QStringList")
         self.window_size = settings.value("window_size", QSize(800, 600))
         self.window_position = settings.value("window_position")
         self.duplicate_highlight_color = settings.value("duplicate_highlight_color", QColor("yellow"))
+        self.memory_limit_mb = settings.value("memory_limit_mb", self.memory_limit_mb, type=int)
 
     def save_settings(self, settings):
         settings.setValue("last_opened_files", self.last_opened_files)
         settings.setValue("window_size", self.window_size)
         settings.setValue("window_position", self.window_position)
         settings.setValue("duplicate_highlight_color", self.duplicate_highlight_color)
+        settings.setValue("memory_limit_mb", self.memory_limit_mb)
 
 class DuplicateRemoverLogger:
     def __init__(self, log_file):
@@ -45,15 +68,102 @@ class DuplicateRemoverLogger:
     def log(self, level, message):
         self.logger.log(level, message)  
 
+class DuplicateRemoverDuplicateGroupModel(QAbstractTableModel):
+    HEADERS = ["Select", "Count", "Duplicate Line"]
+    # Check flags of the eight rows packed into each byte value, lowest bit first
+    BYTE_FLAGS = [tuple((value >> bit) & 1 for bit in range(8)) for value in range(256)]
+
+    def __init__(self, index, parent=None):
+        super().__init__(parent)
+        self.set_index(index)
+
+    def set_index(self, index):
+        self.beginResetModel()
+        self.index_data = index
+        self.keys = index.group_keys()
+        # One bit per distinct duplicated line instead of a widget item per occurrence
+        self.checked = bytearray(b'\xff') * ((len(self.keys) + 7) // 8)
+        self.endResetModel()
+
+    def is_checked(self, row):
+        return self.checked[row >> 3] >> (row & 7) & 1
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.keys)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if column == 0:
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if self.is_checked(row) else Qt.Unchecked
+            return None
+        if role != Qt.DisplayRole:
+            return None
+        positions = self.index_data.positions(self.keys[row])
+        if column == 1:
+            return len(positions)
+        return self.index_data.lines[positions[0]]
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or index.column() != 0:
+            return False
+        row = index.row()
+        if value == Qt.Checked:
+            self.checked[row >> 3] |= 1 << (row & 7)
+        else:
+            self.checked[row >> 3] &= ~(1 << (row & 7)) & 0xff
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def flags(self, index):
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == 0:
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def set_all_checked(self, checked):
+        self.checked = bytearray(b'\xff' if checked else b'\x00') * ((len(self.keys) + 7) // 8)
+        if self.keys:
+            self.dataChanged.emit(self.createIndex(0, 0), self.createIndex(len(self.keys) - 1, 0), [Qt.CheckStateRole])
+
+    def selected_keys(self):
+        # Bits past the last row are ignored, compress stops with the keys
+        return set(compress(self.keys, chain.from_iterable(map(self.BYTE_FLAGS.__getitem__, self.checked))))
+
 class DuplicateRemoverDuplicateConfirmDialog(QDialog):
-    def __init__(self, duplicates, parent=None):
+    MERGE_MODES = {"Keep First": "first", "Keep Last": "last", "Count Occurrences": "count"}
+
+    def __init__(self, index, parent=None):
         super().__init__(parent)
-        self.duplicates = duplicates
+        self.exact_index = index
+        self.index = index
         self.selected_lines = []
-        self.criteria = "exact"
+        self.selected_keys = set()
+        self.criteria = "exact_match"
+        self.similarity_threshold = 0.8
         self.case_sensitive = True
         self.ignore_whitespace = False
+        self.unicode_form = None
         self.merge_duplicates = False
+        self.keep = "first"
+        self.merge_mode = "first"
+
+        # Recomputing can be expensive, so option changes are batched
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(300)
+        self.refresh_timer.timeout.connect(self.refresh_duplicates)
+
         self.initUI()
 
     def initUI(self):
@@ -69,6 +179,15 @@ class DuplicateRemoverDuplicateConfirmDialog(QDialog):
         self.criteria_combo.currentTextChanged.connect(self.update_criteria)
         criteria_layout.addWidget(self.criteria_combo)
 
+        self.threshold_spin = QDoubleSpinBox()
+        self.threshold_spin.setPrefix("Similarity: ")
+        self.threshold_spin.setRange(0.1, 1.0)
+        self.threshold_spin.setSingleStep(0.05)
+        self.threshold_spin.setValue(self.similarity_threshold)
+        self.threshold_spin.setVisible(False)
+        self.threshold_spin.valueChanged.connect(self.update_similarity_threshold)
+        criteria_layout.addWidget(self.threshold_spin)
+
         self.case_check = QCheckBox("Case Sensitive")
         self.case_check.setChecked(self.case_sensitive)
         self.case_check.stateChanged.connect(self.update_case_sensitive)
@@ -79,21 +198,26 @@ class DuplicateRemoverDuplicateConfirmDialog(QDialog):
         self.whitespace_check.stateChanged.connect(self.update_ignore_whitespace)
         criteria_layout.addWidget(self.whitespace_check)
 
+        self.unicode_combo = QComboBox()
+        self.unicode_combo.addItems(["No Unicode Normalization"] + list(duplicate_engine.UNICODE_FORMS))
+        self.unicode_combo.currentTextChanged.connect(self.update_unicode_form)
+        criteria_layout.addWidget(self.unicode_combo)
+
         layout.addLayout(criteria_layout)
 
         self.regex_input = QLineEdit()
         self.regex_input.setPlaceholderText("Enter regular expression")
         self.regex_input.setVisible(False)
+        self.regex_input.textChanged.connect(self.schedule_refresh)
         layout.addWidget(self.regex_input)
 
-        self.tableWidget = QTableWidget()
-        self.tableWidget.setColumnCount(2)
-        self.tableWidget.setHorizontalHeaderLabels(['Select', 'Duplicate Line'])
-        self.tableWidget.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
-
-        self.loadTableData()
-
-        layout.addWidget(self.tableWidget)
+        self.model = DuplicateRemoverDuplicateGroupModel(self.index, self)
+        self.tableView = QTableView()
+        self.tableView.setModel(self.model)
+        # Fixed row heights keep the view from measuring every row
+        self.tableView.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.tableView.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        layout.addWidget(self.tableView)
 
         button_layout = QHBoxLayout()
 
@@ -105,11 +229,22 @@ class DuplicateRemoverDuplicateConfirmDialog(QDialog):
         self.deselectAllButton.clicked.connect(self.deselectAll)
         button_layout.addWidget(self.deselectAllButton)
 
+        self.keep_combo = QComboBox()
+        self.keep_combo.addItems(["Keep First", "Keep Last", "Keep None"])
+        self.keep_combo.currentTextChanged.connect(self.update_keep)
+        button_layout.addWidget(self.keep_combo)
+
         self.merge_check = QCheckBox("Merge Duplicates")
         self.merge_check.setChecked(self.merge_duplicates)
         self.merge_check.stateChanged.connect(self.update_merge_duplicates)
         button_layout.addWidget(self.merge_check)
 
+        self.merge_mode_combo = QComboBox()
+        self.merge_mode_combo.addItems(list(self.MERGE_MODES))
+        self.merge_mode_combo.currentTextChanged.connect(self.update_merge_mode)
+        self.merge_mode_combo.setVisible(self.merge_duplicates)
+        button_layout.addWidget(self.merge_mode_combo)
+
         self.okButton = QPushButton("OK")
         self.okButton.clicked.connect(self.accept)
         button_layout.addWidget(self.okButton)
@@ -120,72 +255,187 @@ class DuplicateRemoverDuplicateConfirmDialog(QDialog):
 
         layout.addLayout(button_layout)
 
-    def loadTableData(self):
-        self.tableWidget.setRowCount(len(self.duplicates))
-        for i, (line, _) in enumerate(self.duplicates):
-            checkbox = QTableWidgetItem()
-            checkbox.setCheckState(Qt.Checked)
-            self.tableWidget.setItem(i, 0, checkbox)
-            self.tableWidget.setItem(i, 1, QTableWidgetItem(line))
+    def key_function(self):
+        return duplicate_engine.make_key_function(self.case_sensitive, self.ignore_whitespace, self.unicode_form)
+
+    def build_index(self):
+        lines = self.exact_index.lines
+        key = self.key_function()
+        if self.criteria == "regular_expression" and self.regex_input.text():
+            flags = 0 if self.case_sensitive else re.IGNORECASE
+            try:
+                regex_key = duplicate_engine.regex_key_function(self.regex_input.text(), flags, key)
+            except re.error as e:
+                self.regex_input.setStyleSheet("border: 1px solid red")
+                self.regex_input.setToolTip(f"Invalid regular expression: {e}")
+                return None
+            self.regex_input.setStyleSheet("")
+            self.regex_input.setToolTip("")
+            return duplicate_engine.DuplicateIndex(lines, keys=duplicate_engine.extract_keys(lines, regex_key))
+        if self.criteria == "similar_text":
+            normalized = lines if key is None else [key(line) for line in lines]
+            return duplicate_engine.DuplicateIndex(lines, keys=duplicate_similarity.similar_keys(normalized, self.similarity_threshold))
+        if key is None:
+            return self.exact_index
+        return duplicate_engine.DuplicateIndex(lines, key=key)
+
+    def schedule_refresh(self):
+        self.refresh_timer.start()
+
+    def refresh_duplicates(self):
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            index = self.build_index()
+            # An invalid pattern keeps the previous groups but cannot be confirmed
+            self.okButton.setEnabled(index is not None)
+            if index is not None:
+                self.index = index
+                self.model.set_index(self.index)
+        finally:
+            QApplication.restoreOverrideCursor()
 
     def selectAll(self):
-        for i in range(self.tableWidget.rowCount()):
-            self.tableWidget.item(i, 0).setCheckState(Qt.Checked)
+        self.model.set_all_checked(True)
 
     def deselectAll(self):
-        for i in range(self.tableWidget.rowCount()):
-            self.tableWidget.item(i, 0).setCheckState(Qt.Unchecked)
+        self.model.set_all_checked(False)
 
     def update_criteria(self, text):
         self.criteria = text.lower().replace(" ", "_")
         self.regex_input.setVisible(self.criteria == "regular_expression")
+        self.threshold_spin.setVisible(self.criteria == "similar_text")
+        self.schedule_refresh()
+
+    def update_similarity_threshold(self, value):
+        self.similarity_threshold = value
+        self.schedule_refresh()
 
     def update_case_sensitive(self, state):
         self.case_sensitive = state == Qt.Checked
+        self.schedule_refresh()
 
     def update_ignore_whitespace(self, state):
         self.ignore_whitespace = state == Qt.Checked
+        self.schedule_refresh()
+
+    def update_unicode_form(self, text):
+        self.unicode_form = text if text in duplicate_engine.UNICODE_FORMS else None
+        self.schedule_refresh()
+
+    def update_keep(self, text):
+        self.keep = text.split()[-1].lower()
 
     def update_merge_duplicates(self, state):
         self.merge_duplicates = state == Qt.Checked
+        self.keep_combo.setVisible(not self.merge_duplicates)
+        self.merge_mode_combo.setVisible(self.merge_duplicates)
+
+    def update_merge_mode(self, text):
+        self.merge_mode = self.MERGE_MODES[text]
 
     def accept(self):
-        self.selected_lines = [self.tableWidget.item(i, 1).text() for i in range(self.tableWidget.rowCount()) if self.tableWidget.item(i, 0).checkState() == Qt.Checked]
+        if self.refresh_timer.isActive():
+            self.refresh_timer.stop()
+            self.refresh_duplicates()
+        if not self.okButton.isEnabled():
+            return
+        self.selected_keys = self.model.selected_keys()
+        lines = self.index.lines
+        self.selected_lines = [lines[self.index.positions(line_key)[0]] for line_key in self.selected_keys]
         super().accept()
 
+class DuplicateRemoverContextModel(QAbstractTableModel):
+    HEADERS = ["Duplicate Line", "Previous Context", "Next Context"]
+
+    def __init__(self, index, context_size=2, parent=None):
+        super().__init__(parent)
+        self.index_data = index
+        self.positions = index.duplicate_positions()
+        self.context_size = context_size
+
+    def set_context_size(self, context_size):
+        self.context_size = context_size
+        if self.positions:
+            self.dataChanged.emit(self.createIndex(0, 1), self.createIndex(len(self.positions) - 1, 2), [Qt.DisplayRole])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.positions)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        position = self.positions[index.row()]
+        if index.column() == 0:
+            return self.index_data.lines[position]
+        # Context is sliced only for the rows the view asks for
+        context = self.index_data.context(position, self.context_size)
+        return '\n'.join(context['previous'] if index.column() == 1 else context['next'])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return self.positions[section] + 1
+
 class DuplicateRemoverContextualDuplicateDialog(QDialog):
-    def __init__(self, duplicates, parent=None):
+    def __init__(self, index, parent=None, context_size=2):
         super().__init__(parent)
-        self.duplicates = duplicates
+        self.index = index
+        self.context_size = context_size
         self.initUI()
 
     def initUI(self):
         self.setWindowTitle("Contextual Duplicate Analysis")
         layout = QVBoxLayout(self)
 
-        self.tableWidget = QTableWidget()
-        self.tableWidget.setColumnCount(3)
-        self.tableWidget.setHorizontalHeaderLabels(['Duplicate Line', 'Previous Context', 'Next Context'])
-        self.tableWidget.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-
-        self.loadTableData()
-
-        layout.addWidget(self.tableWidget)
+        context_layout = QHBoxLayout()
+        context_layout.addWidget(QLabel("Context Lines:"))
+        self.context_spin = QSpinBox()
+        self.context_spin.setRange(0, 20)
+        self.context_spin.setValue(self.context_size)
+        self.context_spin.valueChanged.connect(self.update_context_size)
+        context_layout.addWidget(self.context_spin)
+        context_layout.addStretch()
+        layout.addLayout(context_layout)
+
+        self.model = DuplicateRemoverContextModel(self.index, self.context_size, self)
+        self.tableView = QTableView()
+        self.tableView.setModel(self.model)
+        self.tableView.setWordWrap(False)
+        self.tableView.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # Fixed row heights keep the view from measuring every row
+        self.tableView.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.update_row_height()
+        layout.addWidget(self.tableView)
 
         self.closeButton = QPushButton("Close")
         self.closeButton.clicked.connect(self.accept)
         layout.addWidget(self.closeButton)
 
-    def loadTableData(self):
-        self.tableWidget.setRowCount(len(self.duplicates))
-        for i, (line, context) in enumerate(self.duplicates):
-            self.tableWidget.setItem(i, 0, QTableWidgetItem(line))
-            self.tableWidget.setItem(i, 1, QTableWidgetItem('\n'.join(context['previous'])))
-            self.tableWidget.setItem(i, 2, QTableWidgetItem('\n'.join(context['next'])))
+    def update_row_height(self):
+        line_height = self.tableView.fontMetrics().lineSpacing()
+        self.tableView.verticalHeader().setDefaultSectionSize(line_height * max(1, self.context_size) + 6)
+
+    def update_context_size(self, value):
+        self.context_size = value
+        self.model.set_context_size(value)
+        self.update_row_height()
 
 class DuplicateRemoverBatchRemovalWindow(QWidget):
-    def __init__(self, parent=None):
+    file_finished = pyqtSignal(str, object)
+    report_written = pyqtSignal()
+
+    def __init__(self, parent=None, memory_limit=duplicate_files.DEFAULT_MEMORY_LIMIT):
         super(DuplicateRemoverBatchRemovalWindow, self).__init__(parent)
+        self.memory_limit = memory_limit
+        self.executor = None
+        self.report_writer = None
+        self.file_finished.connect(self.handle_file_finished)
+        self.report_written.connect(self.show_batch_report)
         self.setWindowTitle("Batch Duplicate Removal")
         self.setGeometry(100, 100, 600, 400)
         self.initUI()
@@ -212,9 +462,25 @@ class DuplicateRemoverBatchRemovalWindow(QWidget):
         self.progressBar.setRange(0, 100)
         layout.addWidget(self.progressBar)
 
+        self.statusLabel = QLabel()
+        layout.addWidget(self.statusLabel)
+
+        self.skipUnchangedCheckBox = QCheckBox("Skip files unchanged since the last batch run")
+        self.skipUnchangedCheckBox.setChecked(True)
+        layout.addWidget(self.skipUnchangedCheckBox)
+
+        run_layout = QHBoxLayout()
+
         self.startButton = QPushButton("Start Batch Removal")
         self.startButton.clicked.connect(self.start_batch_removal)
-        layout.addWidget(self.startButton)
+        run_layout.addWidget(self.startButton)
+
+        self.cancelButton = QPushButton("Cancel")
+        self.cancelButton.setEnabled(False)
+        self.cancelButton.clicked.connect(self.cancel_batch_removal)
+        run_layout.addWidget(self.cancelButton)
+
+        layout.addLayout(run_layout)
 
         self.setLayout(layout)
 
@@ -229,53 +495,194 @@ class DuplicateRemoverBatchRemovalWindow(QWidget):
 
     def start_batch_removal(self):
         file_paths = [self.fileListWidget.item(i).text() for i in range(self.fileListWidget.count())]
-        total_files = len(file_paths)
-    
-        duplicates_report = []
-    
-        for i, file_path in enumerate(file_paths):
-            progress = (i + 1) / total_files * 100
-            self.progressBar.setValue(progress)
-        
-            try:
-                with open(file_path, 'r') as file:
-                    lines = file.read().splitlines()
-            
-                duplicates = self.find_duplicates(lines)
-                unique_lines = list(set(lines))
-            
-                if duplicates:
-                    with open(file_path, 'w') as file:
-                        file.write('\n'.join(unique_lines))
-                
-                    duplicates_report.extend([(duplicate, file_path, "Removed") for duplicate in duplicates])
+        if not file_paths or self.executor is not None or self.report_writer is not None:
+            return
+
+        self.manifest = None
+        if self.skipUnchangedCheckBox.isChecked():
+            manifest_dir = QStandardPaths.writableLocation(QStandardPaths.AppDataLocation)
+            self.manifest = duplicate_manifest.BatchManifest(os.path.join(manifest_dir, "DuplicateRemover", "batch_manifest.json"))
+        self.report = duplicate_report.BatchReport()
+        # Rows are appended in order on one thread, so reading removed-lines files never blocks the GUI
+        self.report_writer = ThreadPoolExecutor(max_workers=1)
+        # Workers stream the removed lines of every file here instead of returning them
+        self.removed_dir = tempfile.mkdtemp(prefix='duplicate-batch-')
+        self.total_files = len(file_paths)
+        self.finished_files = 0
+        self.skipped_files = 0
+        self.failed_files = 0
+        self.cancelled = False
+        self.started_at = time.perf_counter()
+
+        # Unchanged size and mtime skip a file without reading it; otherwise a worker compares hashes
+        jobs = []
+        for file_path in file_paths:
+            if self.manifest is not None and self.manifest.unchanged(file_path) is not None:
+                self.skipped_files += 1
+                self.add_report_row(file_path, "", 0, "Unchanged, skipped")
+            else:
+                jobs.append((file_path, self.manifest.known_hash(file_path) if self.manifest is not None else None))
+        self.finished_files = self.skipped_files
+        self.queued_files = len(jobs)
+
+        self.progressBar.setValue(0)
+        self.statusLabel.setText(f"{self.finished_files}/{self.total_files} files")
+        self.startButton.setEnabled(False)
+        self.cancelButton.setEnabled(True)
+
+        workers = max(1, min(len(jobs), os.cpu_count() or 1))
+        # Workers are spawned rather than forked, forking a process that runs Qt threads is unsafe
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        # Every worker may hold its own dedup buffers, so they share the ceiling
+        memory_limit = max(1024 * 1024, self.memory_limit // workers)
+        for file_path, known_hash in jobs:
+            future = self.executor.submit(duplicate_files.dedup_file_job, file_path, memory_limit, known_hash=known_hash,
+                                          removed_dir=self.removed_dir, hash_content=self.manifest is not None)
+            future.add_done_callback(partial(self.emit_file_finished, file_path))
+        if not jobs:
+            self.finish_batch_removal()
+
+    def emit_file_finished(self, file_path, future):
+        # Called on an executor thread; the queued signal hands the result to the GUI thread
+        self.file_finished.emit(file_path, future)
+
+    def add_report_row(self, file_path, line, count, action):
+        self.report_writer.submit(self.report.add, file_path, line, count, action)
+
+    def append_removed_rows(self, file_path, removed_path):
+        # Runs on the report writer thread
+        try:
+            self.report.add_removed(file_path, removed_path)
+        finally:
+            os.remove(removed_path)
+
+    def handle_file_finished(self, file_path, future):
+        self.finished_files += 1
+        if not future.cancelled():
+            error = future.exception()
+            if error is not None:
+                self.failed_files += 1
+                self.add_report_row(file_path, str(error), 0, "Error")
+            else:
+                result = future.result()
+                if result.skipped:
+                    self.skipped_files += 1
+                    self.add_report_row(file_path, "", 0, "Unchanged, skipped")
+                    if self.manifest is not None:
+                        self.manifest.touch(file_path, result.size, result.mtime_ns)
                 else:
-                    duplicates_report.extend([(line, file_path, "No duplicates found") for line in unique_lines])
-        
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"An error occurred while processing {file_path}: {str(e)}")
-                return
-    
+                    if self.manifest is not None:
+                        self.manifest.record(file_path, result.total_lines, result.unique_lines, result.content_hash,
+                                             result.size, result.mtime_ns)
+                    if result.removed_path is not None:
+                        self.report_writer.submit(self.append_removed_rows, file_path, result.removed_path)
+                    else:
+                        self.add_report_row(file_path, "", 0, f"No duplicates found in {result.total_lines} lines")
+
+        self.progressBar.setValue(int(self.finished_files / self.total_files * 100))
+        elapsed = time.perf_counter() - self.started_at
+        processed = self.finished_files - (self.total_files - self.queued_files)
+        remaining = elapsed / processed * (self.total_files - self.finished_files)
+        self.statusLabel.setText(f"{self.finished_files}/{self.total_files} files, "
+                                 f"ETA {int(remaining // 60)}:{int(remaining % 60):02d}")
+        if self.finished_files == self.total_files:
+            self.finish_batch_removal()
+
+    def cancel_batch_removal(self):
+        if self.executor is None:
+            return
+        self.cancelled = True
+        self.cancelButton.setEnabled(False)
+        self.statusLabel.setText("Cancelling, waiting for running files to finish...")
+        # Queued files are dropped; files already being processed finish and are replaced atomically
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def finish_batch_removal(self):
+        self.executor.shutdown(wait=False)
+        self.executor = None
+        self.cancelButton.setEnabled(False)
+        elapsed = time.perf_counter() - self.started_at
+        self.statusLabel.setText(f"{self.finished_files} files in {elapsed:.1f} s, {self.skipped_files} unchanged and skipped")
+        if self.manifest is not None:
+            try:
+                self.manifest.save()
+            except OSError as e:
+                QMessageBox.warning(self, "Error", f"Could not save the batch manifest: {str(e)}")
+        # The report is shown once the writer has appended every row queued before this
+        self.report_writer.submit(self.report_written.emit)
+        self.report_writer.shutdown(wait=False)
+
+    def show_batch_report(self):
+        self.report_writer = None
+        shutil.rmtree(self.removed_dir, ignore_errors=True)
+        self.startButton.setEnabled(True)
+
         # Display the duplicate report
-        report_window = DuplicateRemoverDuplicateReportWindow(duplicates_report, self)
+        report_window = DuplicateRemoverDuplicateReportWindow(self.report, self)
         report_window.show()
-    
-        QMessageBox.information(self, "Batch Removal Complete", "Batch duplicate removal completed successfully.")
+
+        if self.cancelled:
+            QMessageBox.information(self, "Batch Removal Cancelled", "Batch duplicate removal was cancelled.")
+        elif self.failed_files:
+            QMessageBox.warning(self, "Batch Removal Complete", f"Batch duplicate removal completed with {self.failed_files} errors; see the report for details.")
+        else:
+            QMessageBox.information(self, "Batch Removal Complete", "Batch duplicate removal completed successfully.")
+
+    def closeEvent(self, event):
+        self.cancel_batch_removal()
+        event.accept()
+
+class DuplicateRemoverReportTableModel(QAbstractTableModel):
+    HEADERS = ["File", "Line", "Count", "Action"]
+    FETCH_SIZE = 1000
+
+    def __init__(self, report, parent=None):
+        super().__init__(parent)
+        self.report = report
+        self.loaded_rows = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded_rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded_rows < len(self.report)
+
+    def fetchMore(self, parent=QModelIndex()):
+        rows = min(self.FETCH_SIZE, len(self.report) - self.loaded_rows)
+        self.beginInsertRows(QModelIndex(), self.loaded_rows, self.loaded_rows + rows - 1)
+        self.loaded_rows += rows
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return str(self.report.row(index.row())[index.column()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
 
 class DuplicateRemoverDuplicateReportWindow(QWidget):
-    def __init__(self, duplicates, parent=None):
+    def __init__(self, report, parent=None):
         super(DuplicateRemoverDuplicateReportWindow, self).__init__(parent)
         self.setWindowTitle("Duplicate Report")
         self.setGeometry(100, 100, 800, 600)
-        self.duplicates = duplicates
+        self.report = report
         self.initUI()
 
     def initUI(self):
         layout = QVBoxLayout()
 
-        self.reportTextEdit = QTextEdit()
-        self.reportTextEdit.setReadOnly(True)
-        layout.addWidget(self.reportTextEdit)
+        self.reportTable = QTableView()
+        self.reportTable.setModel(DuplicateRemoverReportTableModel(self.report, self))
+        # Fixed row heights keep the view from measuring every row
+        self.reportTable.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.reportTable.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.reportTable)
 
         button_layout = QHBoxLayout()
 
@@ -291,38 +698,42 @@ class DuplicateRemoverDuplicateReportWindow(QWidget):
 
         self.setLayout(layout)
 
-        self.generate_report()
-
-    def generate_report(self):
-        report = "Duplicate Report\n\n"
-        for i, (line, location, action) in enumerate(self.duplicates, start=1):
-            report += f"Duplicate {i}:\n"
-            report += f"Line: {line}\n"
-            report += f"Location: {location}\n"
-            report += f"Action: {action}\n\n"
-
-        self.reportTextEdit.setPlainText(report)
-
     def export_report(self):
-        file_path, _ = QFileDialog.getSaveFileName(self, "Export Report", "", "Text Files (*.txt)")
+        file_path, selected_filter = QFileDialog.getSaveFileName(self, "Export Report", "", "CSV Files (*.csv);;JSON Lines (*.jsonl)")
         if file_path:
             try:
-                with open(file_path, 'w') as file:
-                    file.write(self.reportTextEdit.toPlainText())
+                if file_path.endswith('.jsonl') or selected_filter.startswith("JSON"):
+                    self.report.export_jsonl(file_path)
+                else:
+                    self.report.export_csv(file_path)
                 QMessageBox.information(self, "Export Successful", "Duplicate report exported successfully.")
             except Exception as e:
                 QMessageBox.critical(self, "Export Error", f"An error occurred while exporting the report: {str(e)}")
 
+    def closeEvent(self, event):
+        self.report.close()
+        event.accept()
+
 class DuplicateRemoverTabPage(QWidget):
     def __init__(self, logger, parent=None):
         super(DuplicateRemoverTabPage, self).__init__(parent)
         self.logger = logger        
         self.layout = QVBoxLayout(self)
 
+        self.duplicate_index = None
+        self.live_lines = duplicate_engine.LineMultiset()
+        self.word_count = 0
+
+        # Status bar statistics are refreshed once typing pauses, not on every keystroke
+        self.status_timer = QTimer(self)
+        self.status_timer.setSingleShot(True)
+        self.status_timer.setInterval(150)
+        self.status_timer.timeout.connect(self.update_status)
+
         self.textEdit = CustomPlainTextEdit()
-        self.textEdit.textChanged.connect(self.prevent_duplicates)
-        self.textEdit.textChanged.connect(self.update_word_count)
-        self.textEdit.textChanged.connect(self.update_line_count)
+        self.textEdit.document().contentsChange.connect(self.track_contents_change)
+        self.textEdit.textChanged.connect(self.invalidate_duplicate_index)
+        self.textEdit.textChanged.connect(self.status_timer.start)
         self.layout.addWidget(self.textEdit)
 
         button_layout = QHBoxLayout()
@@ -370,16 +781,51 @@ class DuplicateRemoverTabPage(QWidget):
         self.highlighter = PythonHighlighter(self.textEdit.document())
         self.highlighter.setDocument(None)
 
-    def remove_duplicates(self):
-        lines = self.get_text_lines()
-        duplicates = self.find_duplicates(lines)
-        if duplicates:
-            dialog = DuplicateRemoverDuplicateConfirmDialog([(duplicate, None) for duplicate in duplicates], self)
+    def track_contents_change(self, position, chars_removed, chars_added):
+        # Only the blocks touched by the edit are re-read; the rest of the mirror just shifts
+        document = self.textEdit.document()
+        first = document.findBlock(position)
+        last = document.findBlock(position + chars_added)
+        if not last.isValid():
+            last = document.lastBlock()
+        lines = []
+        block = first
+        while True:
+            lines.append(block.text())
+            if block.blockNumber() >= last.blockNumber():
+                break
+            block = block.next()
+        start = first.blockNumber()
+        stop = start + len(lines) + len(self.live_lines) - document.blockCount()
+        # The replaced mirror lines still hold the old text of blocks Qt has already merged away
+        self.word_count += sum(len(line.split()) for line in lines) - sum(len(line.split()) for line in self.live_lines.lines[start:stop])
+        self.live_lines.replace(start, stop, lines)
+
+    def invalidate_duplicate_index(self):
+        self.duplicate_index = None
+
+    def get_duplicate_index(self):
+        # Built once per document state and shared by every duplicate feature
+        if self.duplicate_index is None:
+            self.duplicate_index = duplicate_engine.DuplicateIndex(self.get_text_lines())
+        return self.duplicate_index
+
+    def remove_duplicates(self, merge=False):
+        index = self.get_duplicate_index()
+        if index.has_duplicates():
+            dialog = DuplicateRemoverDuplicateConfirmDialog(index, self)
+            dialog.merge_check.setChecked(merge)
             if dialog.exec_() == QDialog.Accepted:
-                selected_duplicates = dialog.selected_lines
-                unique_lines = [line for line in lines if line not in selected_duplicates]
-                self.set_text_lines(unique_lines)
-                self.logger.log(logging.INFO, f"Removed duplicates: {selected_duplicates}")
+                if dialog.index.lines is not index.lines:
+                    self.logger.log(logging.ERROR, "Duplicate index does not match the document, nothing was changed")
+                    return
+                selected_duplicates = dialog.selected_keys
+                if dialog.merge_duplicates:
+                    self.set_text_lines(dialog.index.merge(selected_duplicates, dialog.merge_mode))
+                    self.logger.log(logging.INFO, f"Merged duplicates of {len(selected_duplicates)} lines (mode {dialog.merge_mode})")
+                else:
+                    self.set_text_lines(dialog.index.remove(selected_duplicates, dialog.keep))
+                    self.logger.log(logging.INFO, f"Removed duplicates of {len(selected_duplicates)} lines (keep {dialog.keep})")
         else:
             QMessageBox.information(self, "No Duplicates", "No duplicate lines found.")
 
@@ -397,18 +843,12 @@ class DuplicateRemoverTabPage(QWidget):
         else:
             self.highlighter.setDocument(None)
 
-    def update_word_count(self):
-        text = self.textEdit.toPlainText()
-        word_count = len(text.split())
-        main_window = self.get_main_window()
-        if main_window:
-            main_window.statusBar().showMessage(f"Word Count: {word_count}")
-
-    def update_line_count(self):
-        line_count = self.textEdit.blockCount()
+    def update_status(self):
         main_window = self.get_main_window()
         if main_window:
-            main_window.statusBar().showMessage(f"Line Count: {line_count}")
+            live_lines = self.live_lines
+            main_window.statusBar().showMessage(f"Lines: {len(live_lines)}  Words: {self.word_count}  "
+                                                f"Duplicates: {live_lines.duplicate_count}  Unique: {live_lines.unique_count}")
 
     def get_main_window(self):
         parent = self.parentWidget()
@@ -469,81 +909,60 @@ class DuplicateRemoverTabPage(QWidget):
         self.textEdit.setExtraSelections(extraSelections)
 
     def get_text_lines(self):
-        return self.textEdit.toPlainText().split('\n')
+        # A copy of the live mirror, so the document is not flattened into one string
+        return list(self.live_lines.lines)
 
     def set_text_lines(self, lines):
         self.textEdit.setPlainText('\n'.join(lines))
 
-    def prevent_duplicates(self):
-        lines = self.get_text_lines()
-        duplicates = self.find_duplicates(lines)
-        if duplicates:
-            pass
+    def highlight_lines(self, positions, format):
+        document = self.textEdit.document()
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        for position in positions:
+            block = document.findBlockByNumber(position)
+            cursor.setPosition(block.position())
+            cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+            cursor.setCharFormat(format)
+        cursor.endEditBlock()
 
     def bookmark_duplicates(self):
-        lines = self.get_text_lines()
-        duplicates = self.find_duplicates(lines)
-        if not duplicates:
-            return
+        index = self.get_duplicate_index()
 
         options, ok = QInputDialog.getItem(self, "Bookmark Options", "Choose the type of duplicates to bookmark:", ["Exact Duplicates", "Close Duplicates", "Lines that start the same"], 0, False)
         if not ok:
             return
 
-        cursor = self.textEdit.textCursor()
         format = QTextCharFormat()
         format.setBackground(QColor("yellow"))
 
         if options == "Exact Duplicates":
-            for line in duplicates:
-                line_positions = [i for i, l in enumerate(lines) if l == line]
-                for position in line_positions:
-                    cursor.movePosition(QTextCursor.Start)
-                    cursor.movePosition(QTextCursor.Down, QTextCursor.MoveAnchor, position)
-                    cursor.movePosition(QTextCursor.EndOfLine, QTextCursor.KeepAnchor)
-                    cursor.setCharFormat(format)
+            self.highlight_lines([position for _, positions in index.groups() for position in positions], format)
 
         elif options == "Close Duplicates":
-            # Implement close duplicates logic here
-            pass
+            max_distance, ok = QInputDialog.getInt(self, "Close Duplicates", "Maximum number of edits between lines:", 1, 1, 2)
+            if not ok:
+                return
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            try:
+                close_index = duplicate_engine.DuplicateIndex(index.lines, keys=duplicate_similarity.close_keys(index.lines, max_distance))
+                self.highlight_lines([position for _, positions in close_index.groups() for position in positions], format)
+            finally:
+                QApplication.restoreOverrideCursor()
 
         elif options == "Lines that start the same":
-            starts = [line.split()[0] for line in lines if line.split()]
-            for start in set(starts):
-                start_positions = [i for i, l in enumerate(lines) if l.startswith(start)]
-                for position in start_positions:
-                    cursor.movePosition(QTextCursor.Start)
-                    cursor.movePosition(QTextCursor.Down, QTextCursor.MoveAnchor, position)
-                    cursor.movePosition(QTextCursor.EndOfLine, QTextCursor.KeepAnchor)
-                    cursor.setCharFormat(format)
+            start_index = duplicate_engine.DuplicateIndex(index.lines, key=duplicate_engine.first_word)
+            self.highlight_lines([position for _, positions in start_index.groups() for position in positions], format)
 
     def show_duplicate_context(self):
-        lines = self.get_text_lines()
-        duplicates_with_context = self.find_duplicates_with_context(lines)
-        dialog = DuplicateRemoverContextualDuplicateDialog(duplicates_with_context, self)
+        dialog = DuplicateRemoverContextualDuplicateDialog(self.get_duplicate_index(), self)
         dialog.exec_()
 
     def find_duplicates(self, lines):
-        duplicates = []
-        seen = set()
-        for line in lines:
-            if line in seen:
-                duplicates.append(line)
-            else:
-                seen.add(line)
-        return duplicates
+        return duplicate_engine.find_duplicates(lines)
 
     def find_duplicates_with_context(self, lines, context_size=2):
-        duplicates_with_context = []
-        seen = set()
-        for i, line in enumerate(lines):
-            if line in seen:
-                previous_context = lines[max(0, i - context_size):i]
-                next_context = lines[i + 1:i + context_size + 1]
-                duplicates_with_context.append((line, {'previous': previous_context, 'next': next_context}))
-            else:
-                seen.add(line)
-        return duplicates_with_context
+        return duplicate_engine.find_duplicates_with_context(lines, context_size)
 
     def search_text(self):
         search_dialog = DuplicateRemoverSearchDialog(self)
@@ -561,13 +980,7 @@ class DuplicateRemoverTabPage(QWidget):
 
     def sortLines(self, sort_type):
         lines = self.get_text_lines()
-        if sort_type == 'line_size_asc':
-            sorted_lines = sorted(lines, key=len)
-        elif sort_type == 'line_size_desc':
-            sorted_lines = sorted(lines, key=len, reverse=True)
-        elif sort_type == 'alphabetical':
-            sorted_lines = sorted(lines)
-        self.set_text_lines(sorted_lines)
+        self.set_text_lines(duplicate_engine.sort_lines(lines, sort_type))
         
 class PythonHighlighter(QSyntaxHighlighter):
     def __init__(self, parent=None):
@@ -740,17 +1153,20 @@ class DuplicateRemoverMainWindow(QMainWindow):
         self.setGeometry(100, 100, 800, 600)
 
         self.tabWidget = QTabWidget()
+        self.tabWidget.currentChanged.connect(self.update_tab_status)
         self.setCentralWidget(self.tabWidget)
 
         self.user_settings = DuplicateRemoverUserSettings()
         self.logger = DuplicateRemoverLogger("app.log")
 
-        self.load_settings()
+        with startup_profile.phase('load_settings'):
+            self.load_settings()
         self.initUI()
 
     def initUI(self):
         self.menuBar().setNativeMenuBar(False)
-        self.setupMenuBar()
+        with startup_profile.phase('setupMenuBar'):
+            self.setupMenuBar()
 
         # Set up the status bar
         self.statusBar().showMessage("Ready")
@@ -776,9 +1192,8 @@ class DuplicateRemoverMainWindow(QMainWindow):
         self.setToolTip("Multiple File Editor")
         self.tabWidget.setToolTip("Edit multiple files in separate tabs")
 
-        # Set up the tutorial
-        self.tutorialWindow = DuplicateRemoverTutorialWindow(self)
-        #self.tutorialWindow.show()
+        # The tutorial pulls in QtWebEngine, so it is built on first use
+        self.tutorialWindow = None
 
         # Restore the window size and position
         if self.user_settings.window_size:
@@ -786,9 +1201,13 @@ class DuplicateRemoverMainWindow(QMainWindow):
         if self.user_settings.window_position:
             self.move(self.user_settings.window_position)
 
-        # Open the last opened files
-        for file_path in self.user_settings.last_opened_files:
-            self.open_file(file_path)
+        # Open the last opened files; one that was moved or deleted since is left out quietly
+        with startup_profile.phase('session_restore'):
+            for file_path in self.user_settings.last_opened_files:
+                try:
+                    self.open_file(file_path)
+                except (OSError, UnicodeDecodeError) as e:
+                    self.logger.log(logging.WARNING, f"Could not restore file: {file_path} - {str(e)}")
 
     def setupMenuBar(self):
         menuBar = self.menuBar()
@@ -943,6 +1362,11 @@ class DuplicateRemoverMainWindow(QMainWindow):
         if current_tab:
             current_tab.toggle_syntax_highlighting(self.syntax_highlighting_action.isChecked())
 
+    def update_tab_status(self, index):
+        tab = self.tabWidget.widget(index)
+        if tab is not None:
+            tab.update_status()
+
     def newTab(self, file_name="Untitled"):
         tab = DuplicateRemoverTabPage(self.logger)
         self.tabWidget.addTab(tab, file_name)
@@ -957,45 +1381,38 @@ class DuplicateRemoverMainWindow(QMainWindow):
             if file_dialog.exec_():
                 selected_file = file_dialog.selectedFiles()[0]
                 encoding = file_dialog.selectedNameFilter().split(" ")[0]
-
-                with open(selected_file, 'r', encoding=encoding) as file:
-                    content = file.read()
-
-                current_tab = self.tabWidget.currentWidget()
-                current_tab_index = self.tabWidget.currentIndex()
-                file_name = selected_file.split('/')[-1]
-
-                # If no tabs are open, open a new tab and load the file
-                if self.tabWidget.count() == 0:
-                    self.newTab(file_name)
-                    current_tab = self.tabWidget.currentWidget()
-                    current_tab_index = self.tabWidget.currentIndex()
-                    current_tab.textEdit.setPlainText(content)
-                    current_tab.file_path = selected_file
-                # If the current tab is empty and named "Untitled", load the file in the current tab
-                elif current_tab.textEdit.toPlainText() == "" and self.tabWidget.tabText(current_tab_index) == "Untitled":
-                    current_tab.textEdit.setPlainText(content)
-                    self.tabWidget.setTabText(current_tab_index, file_name)
-                    current_tab.file_path = selected_file
-                else:
-                    # Open the file in a new tab
-                    self.newTab(file_name)
-                    new_tab = self.tabWidget.currentWidget()
-                    new_tab.textEdit.setPlainText(content)
-                    new_tab.file_path = selected_file
-
-                # Ensure the new tab has the cursor at the start
-                current_tab.textEdit.moveCursor(QTextCursor.Start)
-                cursor = current_tab.textEdit.textCursor()
-                cursor.movePosition(QTextCursor.Start)
-                cursor.clearSelection()
-                cursor.setCharFormat(QTextCharFormat())  # Clear any unwanted formatting
-                self.logger.log(logging.INFO, f"Opened file: {selected_file} with encoding: {encoding}")
+                self.open_file(selected_file, encoding)
 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"An error occurred while opening the file: {str(e)}")
             self.logger.log(logging.ERROR, f"Error opening file: {selected_file} - {str(e)}")
 
+    def open_file(self, file_path, encoding="UTF-8"):
+        with open(file_path, 'r', encoding=encoding) as file:
+            content = file.read()
+
+        current_tab = self.tabWidget.currentWidget()
+        current_tab_index = self.tabWidget.currentIndex()
+        file_name = file_path.split('/')[-1]
+
+        # If the current tab is empty and named "Untitled", load the file in the current tab
+        if current_tab is not None and current_tab.textEdit.toPlainText() == "" and self.tabWidget.tabText(current_tab_index) == "Untitled":
+            self.tabWidget.setTabText(current_tab_index, file_name)
+        else:
+            # Otherwise open the file in a new tab
+            self.newTab(file_name)
+            current_tab = self.tabWidget.currentWidget()
+        current_tab.textEdit.setPlainText(content)
+        current_tab.file_path = file_path
+
+        # Ensure the tab has the cursor at the start
+        current_tab.textEdit.moveCursor(QTextCursor.Start)
+        cursor = current_tab.textEdit.textCursor()
+        cursor.movePosition(QTextCursor.Start)
+        cursor.clearSelection()
+        cursor.setCharFormat(QTextCharFormat())  # Clear any unwanted formatting
+        self.logger.log(logging.INFO, f"Opened file: {file_path} with encoding: {encoding}")
+
     def saveFile(self):
         current_tab = self.tabWidget.currentWidget()
         if current_tab and current_tab.file_path:
@@ -1029,43 +1446,15 @@ class DuplicateRemoverMainWindow(QMainWindow):
     def removeDuplicates(self):
         current_tab = self.tabWidget.currentWidget()
         if current_tab:
-            lines = current_tab.get_text_lines()
-            duplicates = current_tab.find_duplicates(lines)
-            if duplicates:
-                dialog = DuplicateRemoverDuplicateConfirmDialog([(duplicate, None) for duplicate in duplicates], self)
-                if dialog.exec_() == QDialog.Accepted:
-                    selected_duplicates = dialog.selected_lines
-                    unique_lines = [line for line in lines if line not in selected_duplicates]
-                    current_tab.set_text_lines(unique_lines)
-                    self.logger.log(logging.INFO, f"Removed duplicates: {selected_duplicates}")
-            else:
-                QMessageBox.information(self, "No Duplicates", "No duplicate lines found.")
+            current_tab.remove_duplicates()
                 
     def mergeDuplicates(self):
         current_tab = self.tabWidget.currentWidget()
         if current_tab:
-            lines = current_tab.get_text_lines()
-            duplicates = current_tab.find_duplicates(lines)
-            if duplicates:
-                dialog = DuplicateRemoverDuplicateConfirmDialog([(duplicate, None) for duplicate in duplicates], self)
-                dialog.merge_check.setChecked(True)
-                if dialog.exec_() == QDialog.Accepted:
-                    selected_duplicates = dialog.selected_lines
-                    merged_lines = self.merge_lines(lines, selected_duplicates)
-                    current_tab.set_text_lines(merged_lines)
-                    self.logger.log(logging.INFO, f"Merged duplicates: {selected_duplicates}")
-            else:
-                QMessageBox.information(self, "No Duplicates", "No duplicate lines found.")
-
-    def merge_lines(self, lines, duplicates):
-        merged_lines = []
-        for line in lines:
-            if line in duplicates:
-                if line not in merged_lines:
-                    merged_lines.append(line)
-            else:
-                merged_lines.append(line)
-        return merged_lines
+            current_tab.remove_duplicates(merge=True)
+
+    def merge_lines(self, lines, duplicates, mode='first'):
+        return duplicate_engine.merge_lines(lines, duplicates, mode)
         
     def sortLines(self, sort_type):
         current_tab = self.tabWidget.currentWidget()
@@ -1111,34 +1500,24 @@ class DuplicateRemoverMainWindow(QMainWindow):
             current_tab.textEdit.setFont(font)
             
     def batchRemoveDuplicates(self):
-        batch_window = DuplicateRemoverBatchRemovalWindow(self)
+        batch_window = DuplicateRemoverBatchRemovalWindow(self, self.user_settings.memory_limit_mb * 1024 * 1024)
         batch_window.show()
 
     def batchMergeFiles(self):
         file_paths, _ = QFileDialog.getOpenFileNames(self, "Select Files to Merge", "", "Text Files (*.txt);;Python Files (*.py);;C++ Files (*.cpp *.h);;Java Files (*.java)")
         if file_paths:
-            merged_lines = []
-            for file_path in file_paths:
-                try:
-                    with open(file_path, 'r') as file:
-                        lines = file.read().splitlines()
-                    merged_lines.extend(lines)
-                except Exception as e:
-                    QMessageBox.critical(self, "Error", f"An error occurred while reading file {file_path}: {str(e)}")
-                    self.logger.log(logging.ERROR, f"Error reading file for merging: {file_path} - {str(e)}")
-                    return
-
-            merged_lines = list(set(merged_lines))  # Remove duplicates
             merged_file_path, _ = QFileDialog.getSaveFileName(self, "Save Merged File", "", "Text Files (*.txt);;Python Files (*.py);;C++ Files (*.cpp *.h);;Java Files (*.java)")
             if merged_file_path:
                 try:
-                    with open(merged_file_path, 'w') as file:
-                        file.write('\n'.join(merged_lines))
+                    # Stream the inputs through the external deduplicator instead of loading them all
+                    size_hint = sum(os.path.getsize(file_path) for file_path in file_paths)
+                    duplicate_files.dedup_to_file(duplicate_files.iter_files_lines(file_paths), merged_file_path,
+                                                  self.user_settings.memory_limit_mb * 1024 * 1024, size_hint)
                     self.logger.log(logging.INFO, f"Merged files: {file_paths} into {merged_file_path}")
                     QMessageBox.information(self, "Merge Complete", "Files merged successfully.")
                 except Exception as e:
-                    QMessageBox.critical(self, "Error", f"An error occurred while saving the merged file: {str(e)}")
-                    self.logger.log(logging.ERROR, f"Error saving merged file: {merged_file_path} - {str(e)}")
+                    QMessageBox.critical(self, "Error", f"An error occurred while merging the files: {str(e)}")
+                    self.logger.log(logging.ERROR, f"Error merging files: {file_paths} into {merged_file_path} - {str(e)}")
 
     def compare_files(self):
         file_paths, _ = QFileDialog.getOpenFileNames(self, "Select Files to Compare", "", "Text Files (*.txt);;Python Files (*.py);;C++ Files (*.cpp *.h);;Java Files (*.java)")
@@ -1163,6 +1542,15 @@ class DuplicateRemoverMainWindow(QMainWindow):
             self.logger.log(logging.INFO, "User settings updated")
 
     def showTutorial(self):
+        if self.tutorialWindow is None:
+            try:
+                import duplicate_tutorial
+            except ImportError as e:
+                QMessageBox.critical(self, "Error", f"The tutorial needs PyQt5 QtWebEngine: {str(e)}")
+                self.logger.log(logging.ERROR, f"Error loading tutorial: {str(e)}")
+                return
+            with startup_profile.phase('tutorial'):
+                self.tutorialWindow = duplicate_tutorial.DuplicateRemoverTutorialWindow(self)
         self.tutorialWindow.show()
 
     def closeEvent(self, event):
@@ -1249,6 +1637,12 @@ class DuplicateRemoverSettingsDialog(QDialog):
         self.highlight_color_button.clicked.connect(self.choose_highlight_color)
         form_layout.addRow("Duplicate Highlight Color:", self.highlight_color_button)
 
+        self.memory_limit_spin = QSpinBox()
+        self.memory_limit_spin.setRange(16, 1024 * 1024)
+        self.memory_limit_spin.setSuffix(" MB")
+        self.memory_limit_spin.setValue(self.user_settings.memory_limit_mb)
+        form_layout.addRow("Memory Limit:", self.memory_limit_spin)
+
         layout.addLayout(form_layout)
 
         # Create a button box with OK and Cancel buttons
@@ -1264,549 +1658,36 @@ class DuplicateRemoverSettingsDialog(QDialog):
             self.highlight_color_button.setStyleSheet(f"background-color: {color.name()}")
 
     def accept(self):
+        self.user_settings.memory_limit_mb = self.memory_limit_spin.value()
         super().accept()
         
-class DuplicateRemoverTutorialWindow(QDialog):
-    def __init__(self, parent=None):
-        super(DuplicateRemoverTutorialWindow, self).__init__(parent)
-        self.setWindowTitle("Interactive Tutorial")
-        self.setGeometry(100, 100, 800, 600)
-        self.setWindowModality(Qt.ApplicationModal)
-
-        self.layout = QVBoxLayout()
-
-        self.webView = QWebEngineView()
-        self.layout.addWidget(self.webView)
-
-        self.navigation_layout = QHBoxLayout()
-        self.back_button = QPushButton("Previous")
-        self.back_button.clicked.connect(self.go_to_previous_page)
-        self.navigation_layout.addWidget(self.back_button)
-
-        self.forward_button = QPushButton("Next")
-        self.forward_button.clicked.connect(self.go_to_next_page)
-        self.navigation_layout.addWidget(self.forward_button)
-
-        self.progress_bar = QProgressBar()
-        self.progress_bar.setRange(0, 100)
-        self.navigation_layout.addWidget(self.progress_bar)
-
-        self.start_button = QPushButton("Start Editing")
-        self.start_button.clicked.connect(self.close)
-        self.navigation_layout.addWidget(self.start_button)
-
-        self.layout.addLayout(self.navigation_layout)
-        self.setLayout(self.layout)
-
-        self.current_page_index = 0
-        self.tutorial_pages = [
-            self.create_welcome_page(),
-            self.create_opening_files_page(),
-            self.create_editing_files_page(),
-            self.create_saving_files_page(),
-            self.create_removing_duplicates_page(),
-            self.create_sorting_and_merging_page(),
-            self.create_batch_operations_page(),
-            self.create_additional_features_page(),
-        ]
-
-        self.load_tutorial_page(self.current_page_index)
-
-    def create_welcome_page(self):
-        return """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {
-                    font-family: 'Arial', sans-serif;
-                    margin: 20px;
-                    padding: 20px;
-                    line-height: 1.6;
-                    background-color: #f4f4f4;
-                    color: #333;
-                }
-                h1 {
-                    color: #026be4;
-                    text-align: center;
-                }
-                p {
-                    margin: 10px 0;
-                }
-                .button {
-                    background-color: #4CAF50;
-                    border: none;
-                    color: white;
-                    padding: 15px 32px;
-                    text-align: center;
-                    text-decoration: none;
-                    display: inline-block;
-                    font-size: 16px;
-                    margin: 4px 2px;
-                    cursor: pointer;
-                    border-radius: 5px;
-                }
-            </style>
-        </head>
-        <body>
-            <h1>Welcome to the TSTP:Duplicate Deleter Tutorial</h1>
-            <p>In this interactive tutorial, you will learn how to use the key features of the TSTP:Duplicate Deleter application.</p>
-            <p>Let's get started!</p>
-        </body>
-        </html>
-        """
-
-    def create_opening_files_page(self):
-        return """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {
-                    font-family: 'Arial', sans-serif;
-                    margin: 20px;
-                    padding: 20px;
-                    line-height: 1.6;
-                    background-color: #f4f4f4;
-                    color: #333;
-                }
-                h2 {
-                    color: #0294a5;
-                }
-                p {
-                    margin: 10px 0;
-                }
-                ol {
-                    padding: 20px;
-                }
-                li {
-                    margin: 10px 0;
-                    font-size: 16px;
-                }
-                code {
-                    font-family: 'Courier New', monospace;
-                    background-color: #eaeaea;
-                    padding: 2px 5px;
-                    border-radius: 3px;
-                }
-                .button {
-                    background-color: #4CAF50;
-                    border: none;
-                    color: white;
-                    padding: 15px 32px;
-                    text-align: center;
-                    text-decoration: none;
-                    display: inline-block;
-                    font-size: 16px;
-                    margin: 4px 2px;
-                    cursor: pointer;
-                    border-radius: 5px;
-                }
-            </style>
-        </head>
-        <body>
-            <h2>Opening Files</h2>
-            <p>To open a file, follow these steps:</p>
-            <ol>
-                <li>Click on the <code>File</code> menu in the top-left corner.</li>
-                <li>Select the <code>Open</code> option.</li>
-                <li>In the file dialog, navigate to the file you want to open and click <code>Open</code>.</li>
-            </ol>
-            <p>Each file you open will be displayed in a new tab.</p>
-        </body>
-        </html>
-        """
-
-    def create_editing_files_page(self):
-        return """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {
-                    font-family: 'Arial', sans-serif;
-                    margin: 20px;
-                    padding: 20px;
-                    line-height: 1.6;
-                    background-color: #f4f4f4;
-                    color: #333;
-                }
-                h2 {
-                    color: #0294a5;
-                }
-                p {
-                    margin: 10px 0;
-                }
-                .button {
-                    background-color: #4CAF50;
-                    border: none;
-                    color: white;
-                    padding: 15px 32px;
-                    text-align: center;
-                    text-decoration: none;
-                    display: inline-block;
-                    font-size: 16px;
-                    margin: 4px 2px;
-                    cursor: pointer;
-                    border-radius: 5px;
-                }
-            </style>
-        </head>
-        <body>
-            <h2>Editing Files</h2>
-            <p>To edit the contents of a file, simply make changes directly in the text editor provided in each tab.</p>
-            <p>You can use the standard keyboard shortcuts for common editing operations, such as:</p>
-            <ul>
-                <li><code>Ctrl+Z</code> to undo your changes</li>
-                <li><code>Ctrl+Y</code> to redo your changes</li>
-                <li><code>Ctrl+F</code> to search for text within the file</li>
-                <li><code>Ctrl+H</code> to replace text within the file</li>
-            </ul>
-        </body>
-        </html>
-        """
-
-    def create_saving_files_page(self):
-        return """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {
-                    font-family: 'Arial', sans-serif;
-                    margin: 20px;
-                    padding: 20px;
-                    line-height: 1.6;
-                    background-color: #f4f4f4;
-                    color: #333;
-                }
-                h2 {
-                    color: #0294a5;
-                }
-                p {
-                    margin: 10px 0;
-                }
-                ol {
-                    padding: 20px;
-                }
-                li {
-                    margin: 10px 0;
-                    font-size: 16px;
-                }
-                code {
-                    font-family: 'Courier New', monospace;
-                    background-color: #eaeaea;
-                    padding: 2px 5px;
-                    border-radius: 3px;
-                }
-                .button {
-                    background-color: #4CAF50;
-                    border: none;
-                    color: white;
-                    padding: 15px 32px;
-                    text-align: center;
-                    text-decoration: none;
-                    display: inline-block;
-                    font-size: 16px;
-                    margin: 4px 2px;
-                    cursor: pointer;
-                    border-radius: 5px;
-                }
-            </style>
-        </head>
-        <body>
-            <h2>Saving Files</h2>
-            <p>To save your changes, you can use the following options:</p>
-            <ol>
-                <li>Click on the <code>Save</code> button in the toolbar to save the current file.</li>
-                <li>Go to the <code>File</code> menu and select <code>Save</code> to save the current file.</li>
-                <li>To save a file with a new name or in a different location, go to the <code>File</code> menu and select <code>Save As</code>.</li>
-            </ol>
-        </body>
-        </html>
-        """
-
-    def create_removing_duplicates_page(self):
-        return """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {
-                    font-family: 'Arial', sans-serif;
-                    margin: 20px;
-                    padding: 20px;
-                    line-height: 1.6;
-                    background-color: #f4f4f4;
-                    color: #333;
-                }
-                h2 {
-                    color: #0294a5;
-                }
-                p {
-                    margin: 10px 0;
-                }
-                ol {
-                    padding: 20px;
-                }
-                li {
-                    margin: 10px 0;
-                    font-size: 16px;
-                }
-                code {
-                    font-family: 'Courier New', monospace;
-                    background-color: #eaeaea;
-                    padding: 2px 5px;
-                    border-radius: 3px;
-                }
-                .button {
-                    background-color: #4CAF50;
-                    border: none;
-                    color: white;
-                    padding: 15px 32px;
-                    text-align: center;
-                    text-decoration: none;
-                    display: inline-block;
-                    font-size: 16px;
-                    margin: 4px 2px;
-                    cursor: pointer;
-                    border-radius: 5px;
-                }
-            </style>
-        </head>
-        <body>
-            <h2>Removing Duplicates</h2>
-            <p>To remove duplicate lines from your file, follow these steps:</p>
-            <ol>
-                <li>Go to the <code>Edit</code> menu and select the <code>Remove Duplicates</code> option.</li>
-                <li>A dialog will appear, allowing you to choose which duplicate lines to remove. You can select the specific lines you want to remove or choose to remove all duplicates.</li>
-                <li>Once you've made your selection, click <code>OK</code> to apply the changes.</li>
-            </ol>
-        </body>
-        </html>
-        """
-
-    def create_sorting_and_merging_page(self):
-        return """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {
-                    font-family: 'Arial', sans-serif;
-                    margin: 20px;
-                    padding: 20px;
-                    line-height: 1.6;
-                    background-color: #f4f4f4;
-                    color: #333;
-                }
-                h2 {
-                    color: #0294a5;
-                }
-                p {
-                    margin: 10px 0;
-                }
-                ol {
-                    padding: 20px;
-                }
-                li {
-                    margin: 10px 0;
-                    font-size: 16px;
-                }
-                code {
-                    font-family: 'Courier New', monospace;
-                    background-color: #eaeaea;
-                    padding: 2px 5px;
-                    border-radius: 3px;
-                }
-                .button {
-                    background-color: #4CAF50;
-                    border: none;
-                    color: white;
-                    padding: 15px 32px;
-                    text-align: center;
-                    text-decoration: none;
-                    display: inline-block;
-                    font-size: 16px;
-                    margin: 4px 2px;
-                    cursor: pointer;
-                    border-radius: 5px;
-                }
-            </style>
-        </head>
-        <body>
-            <h2>Sorting and Merging</h2>
-            <p>The TSTP:Duplicate Deleter application also provides the following features:</p>
-            <ol>
-                <li>Sorting: You can sort the lines in your file in ascending or descending order. Go to the <code>Edit</code> menu and select either <code>Sort Ascending</code> or <code>Sort Descending</code>.</li>
-                <li>Merging: If you have duplicate lines that you want to keep, you can merge them into a single line. Go to the <code>Edit</code> menu and select <code>Merge Duplicates</code>.</li>
-            </ol>
-        </body>
-        </html>
-        """
-    def create_batch_operations_page(self):
-        return """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {
-                    font-family: 'Arial', sans-serif;
-                    margin: 20px;
-                    padding: 20px;
-                    line-height: 1.6;
-                    background-color: #f4f4f4;
-                    color: #333;
-                }
-                h2 {
-                    color: #0294a5;
-                }
-                p {
-                    margin: 10px 0;
-                }
-                ol {
-                    padding: 20px;
-                }
-                li {
-                    margin: 10px 0;
-                    font-size: 16px;
-                }
-                code {
-                    font-family: 'Courier New', monospace;
-                    background-color: #eaeaea;
-                    padding: 2px 5px;
-                    border-radius: 3px;
-                }
-                .button {
-                    background-color: #4CAF50;
-                    border: none;
-                    color: white;
-                    padding: 15px 32px;
-                    text-align: center;
-                    text-decoration: none;
-                    display: inline-block;
-                    font-size: 16px;
-                    margin: 4px 2px;
-                    cursor: pointer;
-                    border-radius: 5px;
-                }
-            </style>
-        </head>
-        <body>
-            <h2>Batch Operations</h2>
-            <p>The TSTP:Duplicate Deleter application also supports batch operations, allowing you to process multiple files at once.</p>
-            <ol>
-                <li>
-                    <strong>Batch Duplicate Removal:</strong>
-                    <ul>
-                        <li>Go to the <code>Batch</code> menu and select <code>Batch Duplicate Removal</code>.</li>
-                        <li>In the Batch Duplicate Removal window, click the <code>Add Files</code> button to select the files you want to process.</li>
-                        <li>Once you've added the files, click the <code>Start Batch Removal</code> button to remove duplicates from all the files.</li>
-                    </ul>
-                </li>
-                <li>
-                    <strong>Batch File Merging:</strong>
-                    <ul>
-                        <li>Go to the <code>Batch</code> menu and select <code>Batch Merge Files</code>.</li>
-                        <li>In the file dialog, select the files you want to merge.</li>
-                        <li>The application will combine the contents of all the selected files into a single file, which you can then save.</li>
-                    </ul>
-                </li>
-            </ol>
-        </body>
-        </html>
-        """
-
-    def create_additional_features_page(self):
-        return """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {
-                    font-family: 'Arial', sans-serif;
-                    margin: 20px;
-                    padding: 20px;
-                    line-height: 1.6;
-                    background-color: #f4f4f4;
-                    color: #333;
-                }
-                h2 {
-                    color: #0294a5;
-                }
-                p {
-                    margin: 10px 0;
-                }
-                ul {
-                    padding: 20px;
-                }
-                li {
-                    margin: 10px 0;
-                    font-size: 16px;
-                }
-                code {
-                    font-family: 'Courier New', monospace;
-                    background-color: #eaeaea;
-                    padding: 2px 5px;
-                    border-radius: 3px;
-                }
-                .button {
-                    background-color: #4CAF50;
-                    border: none;
-                    color: white;
-                    padding: 15px 32px;
-                    text-align: center;
-                    text-decoration: none;
-                    display: inline-block;
-                    font-size: 16px;
-                    margin: 4px 2px;
-                    cursor: pointer;
-                    border-radius: 5px;
-                }
-            </style>
-        </head>
-        <body>
-            <h2>Additional Features</h2>
-            <p>The TSTP:Duplicate Deleter application also includes the following additional features:</p>
-            <ul>
-                <li>
-                    <strong>File Comparison:</strong>
-                    <ul>
-                        <li>You can compare the contents of two files side-by-side.</li>
-                        <li>Go to the <code>File</code> menu and select <code>Compare Files</code>.</li>
-                    </ul>
-                </li>
-                <li>
-                    <strong>Dark Mode:</strong>
-                    <ul>
-                        <li>The application supports a dark mode theme to reduce eye strain.</li>
-                        <li>Toggle dark mode by going to the <code>File</code> menu and selecting <code>Toggle Dark Mode</code>.</li>
-                    </ul>
-                </li>
-            </ul>
-            <button class="button previous-button">Previous</button>
-            <button class="button start-button">Start Editing</button>
-        </body>
-        </html>
-        """
-
-    def load_tutorial_page(self, index):
-        self.webView.setHtml(self.tutorial_pages[index])
-        self.progress_bar.setValue(int((index + 1) / len(self.tutorial_pages) * 100))
-
-    def go_to_previous_page(self):
-        if self.current_page_index > 0:
-            self.current_page_index -= 1
-            self.load_tutorial_page(self.current_page_index)
-
-    def go_to_next_page(self):
-        if self.current_page_index < len(self.tutorial_pages) - 1:
-            self.current_page_index += 1
-            self.load_tutorial_page(self.current_page_index)      
+class DuplicateRemoverFirstPaintWatcher(QObject):
+    def __init__(self, window):
+        super().__init__(window)
+        window.installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint:
+            watched.removeEventFilter(self)
+            # Runs once the paint event itself has been handled
+            QTimer.singleShot(0, self.finish)
+        return False
+
+    def finish(self):
+        startup_profile.mark('first_paint')
+        startup_profile.write()
+        if os.environ.get(duplicate_startup.EXIT_AFTER_PAINT_ENV):
+            QApplication.quit()
 
 def main():
-    app = QApplication(sys.argv)
-    main_window = DuplicateRemoverMainWindow()
+    # Lets QtWebEngine be imported after the application exists, when the tutorial is opened
+    QApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+    with startup_profile.phase('qapplication'):
+        app = QApplication(sys.argv)
+    with startup_profile.phase('main_window'):
+        main_window = DuplicateRemoverMainWindow()
+    if startup_profile.enabled:
+        DuplicateRemoverFirstPaintWatcher(main_window)
     main_window.show()
     sys.exit(app.exec_())
 
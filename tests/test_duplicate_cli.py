@@ -0,0 +1,106 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import duplicate_cli
+import duplicate_engine
+import duplicate_files
+from tests.test_duplicate_files import sample_lines
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def write_input(self, lines, name='input.txt'):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        return path
+
+    def run_cli_raw(self, *argv, stdin=b''):
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+        stderr = io.StringIO()
+        with mock.patch.object(sys, 'stdout', stdout), mock.patch.object(sys, 'stderr', stderr), \
+                mock.patch.object(sys, 'stdin', io.TextIOWrapper(io.BytesIO(stdin), encoding='utf-8')):
+            status = duplicate_cli.main(['--encoding', 'utf-8'] + list(argv))
+            stdout.flush()
+        return status, stdout.buffer.getvalue(), stderr.getvalue()
+
+    def run_cli(self, *argv, stdin=b''):
+        status, output, errors = self.run_cli_raw(*argv, stdin=stdin)
+        return status, output.decode('utf-8').splitlines(), errors
+
+    def test_dedup_stdin_with_stats(self):
+        status, output, errors = self.run_cli('dedup', '--stats', stdin=b'b\na\nb\n')
+        self.assertEqual((status, output), (0, ['b', 'a']))
+        self.assertEqual(errors, "3 lines, 2 unique, 1 duplicates\n")
+
+    def test_mapped_and_text_dedup_agree_on_undecodable_bytes(self):
+        path = os.path.join(self.tmp_dir, 'input.txt')
+        with open(path, 'wb') as file:
+            file.write(b'caf\xe9\r\nok\ncaf\xe9\n\xff\xfe\nok\r\n\xff\xfe')
+        for mapped in (False, True):
+            with self.subTest(mapped=mapped), mock.patch.object(duplicate_files, '_fits_mapped', return_value=mapped), \
+                    mock.patch.object(duplicate_cli, 'run_mapped_dedup', wraps=duplicate_cli.run_mapped_dedup) as run_mapped:
+                status, output, errors = self.run_cli_raw('dedup', '--stats', path)
+                self.assertEqual(run_mapped.called, mapped)
+                self.assertEqual((status, output), (0, b'caf\xe9\nok\n\xff\xfe\n'))
+                self.assertEqual(errors, "6 lines, 3 unique, 3 duplicates\n")
+
+    def test_merge_modes_match_engine(self):
+        lines = sample_lines(40000, 3000)
+        path = self.write_input(lines)
+        # 40000 lines with their overhead exceed 1 MB, so the second run spills
+        for memory_limit in ('64', '1'):
+            for mode in duplicate_engine.MERGE_MODES:
+                with self.subTest(memory_limit=memory_limit, mode=mode):
+                    status, output, _ = self.run_cli('--memory-limit', memory_limit, 'merge', '--mode', mode, path)
+                    self.assertEqual(status, 0)
+                    self.assertEqual(output, duplicate_engine.merge_lines(lines, mode=mode))
+
+    def test_merge_with_key_across_files(self):
+        first = self.write_input(sample_lines(20000, 2000), 'first.txt')
+        second = self.write_input([line.upper() for line in sample_lines(20000, 2000, seed=1)], 'second.txt')
+        lines = sample_lines(20000, 2000) + [line.upper() for line in sample_lines(20000, 2000, seed=1)]
+        key = duplicate_engine.make_key_function(case_sensitive=False)
+        for mode in ('last', 'count'):
+            status, output, _ = self.run_cli('--memory-limit', '1', 'merge', '--mode', mode, '-i', first, second)
+            self.assertEqual(output, duplicate_engine.merge_lines(lines, mode=mode, key=key))
+
+    def test_fingerprint_dedup(self):
+        lines = sample_lines(5000, 700)
+        path = self.write_input(lines)
+        for bits in ('64', '128'):
+            status, output, errors = self.run_cli('dedup', '--stats', '--fingerprint', bits, path)
+            self.assertEqual(output, list(dict.fromkeys(lines)))
+            self.assertEqual(errors, f"5000 lines, {len(output)} unique, {5000 - len(output)} duplicates\n")
+
+    def test_approximate_dedup(self):
+        lines = sample_lines(5000, 700)
+        path = self.write_input(lines)
+        status, output, errors = self.run_cli('dedup', '--stats', '--approximate', '0.01', path)
+        self.assertEqual(status, 0)
+        # A false positive can only drop a line, never repeat one
+        self.assertEqual(len(output), len(set(output)))
+        self.assertTrue(set(output) <= set(lines))
+        self.assertIn("expected false positive rate", errors)
+
+    def test_rejected_options(self):
+        path = self.write_input(['a'])
+        status, _, errors = self.run_cli('dedup', '--workers', '2', '--fingerprint', '64', path)
+        self.assertEqual(status, 2)
+        self.assertIn("--workers", errors)
+        with self.assertRaises(SystemExit):
+            self.run_cli('dedup', '--approximate', '2', path)
+        with self.assertRaises(SystemExit):
+            self.run_cli('dedup', '--approximate', '0.1', '--fingerprint', '64', path)
+
+
+if __name__ == '__main__':
+    unittest.main()
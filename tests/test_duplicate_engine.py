@@ -0,0 +1,189 @@
+import collections
+import random
+import unittest
+from unittest import mock
+
+import duplicate_engine
+
+
+class MakeKeyFunctionTest(unittest.TestCase):
+    def test_no_options_keeps_raw_lines(self):
+        self.assertIsNone(duplicate_engine.make_key_function())
+
+    def test_options_compose(self):
+        key = duplicate_engine.make_key_function(case_sensitive=False, ignore_whitespace=True, unicode_form='NFKC')
+        self.assertEqual(key('  Ｆoo   BAR '), key('foo bar'))
+
+    def test_each_call_gets_its_own_cache(self):
+        self.assertIsNot(duplicate_engine.make_key_function(False), duplicate_engine.make_key_function(False))
+
+    def test_long_lines_bypass_the_cache(self):
+        key = duplicate_engine.make_key_function(case_sensitive=False)
+        long_line = 'A' * (duplicate_engine.NORMALIZED_KEY_CACHE_MAX_LENGTH + 1)
+        self.assertEqual(key(long_line), long_line.lower())
+        self.assertEqual(key('ABC'), 'abc')
+
+
+def sample_lines(count, distinct, seed=0):
+    rng = random.Random(seed)
+    return [f"line {rng.randrange(distinct)}" for _ in range(count)]
+
+
+class FingerprintSetTest(unittest.TestCase):
+    def test_digests_match_exact_dedup(self):
+        lines = sample_lines(5000, 1500)
+        for bits in (64, 128):
+            with self.subTest(bits=bits):
+                seen = duplicate_engine.FingerprintSet(bits)
+                self.assertEqual(duplicate_engine.find_duplicates(lines, seen=seen), duplicate_engine.find_duplicates(lines))
+                self.assertEqual(len(seen), len(set(lines)))
+
+    def test_growth_keeps_every_key_and_position(self):
+        for bits in (64, 128):
+            with self.subTest(bits=bits):
+                seen = duplicate_engine.FingerprintSet(bits, capacity=1)
+                for position in range(5000):
+                    self.assertTrue(seen.add(f"key {position}", position))
+                self.assertGreater(seen._mask + 1, 5000)
+                self.assertEqual(len(seen), 5000)
+                for position in range(0, 5000, 7):
+                    self.assertIn(f"key {position}", seen)
+                    self.assertEqual(seen.first_position(f"key {position}"), position)
+                    self.assertFalse(seen.add(f"key {position}", position + 5000))
+                self.assertNotIn("missing", seen)
+                self.assertIsNone(seen.first_position("missing"))
+
+    def test_forced_collisions_are_verified(self):
+        lines = ['a', 'b', 'a', 'c', 'b', 'c']
+        # Every key gets the same digest
+        with mock.patch.object(duplicate_engine.FingerprintSet, 'fingerprint', return_value=(5, 0)):
+            for bits in (64, 128):
+                with self.subTest(bits=bits):
+                    seen = duplicate_engine.FingerprintSet(bits, verify=duplicate_engine.sequence_verifier(lines))
+                    self.assertEqual(list(duplicate_engine.iter_unique(lines, seen=seen)), ['a', 'b', 'c'])
+                    self.assertEqual(seen.collisions, 2)
+                    self.assertEqual(len(seen), 3)
+                    self.assertIn('b', seen)
+                    self.assertNotIn('z', seen)
+
+    def test_forced_collisions_without_verifier_drop_lines(self):
+        lines = ['a', 'b', 'a', 'c']
+        with mock.patch.object(duplicate_engine.FingerprintSet, 'fingerprint', return_value=(5, 0)):
+            seen = duplicate_engine.FingerprintSet()
+            self.assertEqual(list(duplicate_engine.iter_unique(lines, seen=seen)), ['a'])
+            self.assertEqual(seen.collisions, 0)
+
+    def test_rejects_other_digest_sizes(self):
+        with self.assertRaises(ValueError):
+            duplicate_engine.FingerprintSet(32)
+
+
+class SequenceVerifierTest(unittest.TestCase):
+    def test_compares_against_source_position(self):
+        lines = ['Alpha', 'beta']
+        verify = duplicate_engine.sequence_verifier(lines)
+        self.assertTrue(verify('Alpha', 0))
+        self.assertFalse(verify('alpha', 0))
+        self.assertFalse(verify('Alpha', 1))
+
+    def test_applies_key_to_source_line(self):
+        lines = ['Alpha', 'beta']
+        verify = duplicate_engine.sequence_verifier(lines, key=str.lower)
+        self.assertTrue(verify('alpha', 0))
+        self.assertFalse(verify('Alpha', 0))
+
+
+class BloomFilterTest(unittest.TestCase):
+    def test_repeated_keys_are_never_new(self):
+        bloom = duplicate_engine.BloomFilter(1000, 0.01)
+        keys = [f"key {i}" for i in range(3000)]
+        for key in keys:
+            bloom.add(key)
+        # Past capacity the filter errs more, but only towards "seen"
+        for key in keys:
+            self.assertFalse(bloom.add(key))
+            self.assertIn(key, bloom)
+
+    def test_false_positive_rate_near_expected_error_at_capacity(self):
+        bloom = duplicate_engine.BloomFilter(20000, 0.01)
+        for i in range(20000):
+            bloom.add(f"key {i}")
+        self.assertAlmostEqual(bloom.expected_error, 0.01, delta=0.002)
+        false_positives = sum(f"other {i}" in bloom for i in range(20000))
+        self.assertAlmostEqual(false_positives / 20000, bloom.expected_error, delta=bloom.expected_error * 0.3)
+
+    def test_for_memory_fits_budget(self):
+        bloom = duplicate_engine.BloomFilter.for_memory(64 * 1024, 0.001)
+        self.assertLessEqual(bloom.memory_bytes, 64 * 1024)
+        self.assertGreater(bloom.memory_bytes, 64 * 1024 * 0.99)
+        for i in range(bloom.capacity):
+            bloom.add(f"key {i}")
+        self.assertAlmostEqual(bloom.expected_error, 0.001, delta=0.0003)
+
+    def test_rejects_bad_parameters(self):
+        for capacity, error_rate in ((0, 0.01), (10, 0), (10, 1)):
+            with self.subTest(capacity=capacity, error_rate=error_rate), self.assertRaises(ValueError):
+                duplicate_engine.BloomFilter(capacity, error_rate)
+
+    def test_find_duplicates_approximate(self):
+        lines = sample_lines(20000, 5000)
+        duplicates, bloom = duplicate_engine.find_duplicates_approximate(lines, 5000, 0.01)
+        exact = collections.Counter(duplicate_engine.find_duplicates(lines))
+        # Every repeat is reported; a false positive can only add a first occurrence
+        self.assertEqual(collections.Counter(duplicates) & exact, exact)
+        extra = len(duplicates) - sum(exact.values())
+        self.assertLessEqual(extra, len(set(lines)) * bloom.expected_error * 2 + 5)
+        self.assertEqual(len(bloom), len(set(lines)) - extra)
+
+
+class LineMultisetTest(unittest.TestCase):
+    def test_random_replaces_match_recount(self):
+        rng = random.Random(0)
+        # Blank lines have no key and are not counted
+        key = lambda line: line.lower() or None
+        multiset = duplicate_engine.LineMultiset(sample_lines(50, 10), key=key)
+        lines = list(multiset.lines)
+        for _ in range(2000):
+            start = rng.randrange(len(lines) + 1)
+            stop = rng.randrange(start, min(len(lines), start + 5) + 1)
+            new_lines = [rng.choice(['', 'LINE 1', 'line 2', f'line {rng.randrange(10)}']) for _ in range(rng.randrange(4))]
+            multiset.replace(start, stop, new_lines)
+            lines[start:stop] = new_lines
+            counts = collections.Counter(key(line) for line in lines if key(line) is not None)
+            self.assertEqual(multiset.lines, lines)
+            self.assertEqual(multiset.counts, counts)
+            self.assertEqual((multiset.total, multiset.unique_count), (sum(counts.values()), len(counts)))
+        self.assertEqual(multiset.count('Line 1'), counts['line 1'])
+
+
+@unittest.skipIf(duplicate_engine._numpy() is None, "NumPy is not installed")
+class VectorizedMergeTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.lines = [f"line {rng.randrange(5000)}" for _ in range(6000)]
+        patcher = mock.patch.object(duplicate_engine, 'VECTORIZED_THRESHOLD', 1000)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_matches_merge_loop(self):
+        self.assertTrue(duplicate_engine._use_vectorized(self.lines))
+        for mode in ('last', 'count'):
+            with self.subTest(mode=mode):
+                self.assertEqual(duplicate_engine._vectorized_merge(self.lines, mode),
+                                 list(duplicate_engine.iter_merge_lines(self.lines, mode=mode)))
+
+    def test_hash_collisions_fall_back(self):
+        # Every line of the same length shares a hash
+        with mock.patch.object(duplicate_engine, 'hash', len, create=True):
+            self.assertIsNone(duplicate_engine._vectorized_occurrences(self.lines))
+            for mode in ('last', 'count'):
+                with self.subTest(mode=mode):
+                    self.assertEqual(duplicate_engine.merge_lines(self.lines, mode=mode),
+                                     list(duplicate_engine.iter_merge_lines(self.lines, mode=mode)))
+
+    def test_repeat_heavy_input_stays_on_the_loop(self):
+        self.assertFalse(duplicate_engine._use_vectorized([f"line {i % 10}" for i in range(6000)]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,320 @@
+import hashlib
+import os
+import random
+import shutil
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+import duplicate_engine
+import duplicate_files
+import duplicate_manifest
+
+
+def sample_lines(count, distinct, seed=0):
+    rng = random.Random(seed)
+    return [f"line {rng.randrange(distinct)} {'x' * rng.randrange(20)}" for _ in range(count)]
+
+
+class ExternalDeduplicatorTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def dedup(self, lines, memory_limit, **kwargs):
+        deduplicator = duplicate_files.ExternalDeduplicator(memory_limit, tmp_dir=self.tmp_dir, **kwargs)
+        return deduplicator, list(deduplicator.unique(lines))
+
+    def test_in_memory(self):
+        lines = sample_lines(1000, 100)
+        deduplicator, unique = self.dedup(lines, duplicate_files.DEFAULT_MEMORY_LIMIT)
+        self.assertFalse(deduplicator.spilled)
+        self.assertEqual(unique, list(duplicate_engine.iter_unique(lines)))
+
+    def test_spill_keeps_first_occurrence_order(self):
+        lines = sample_lines(20000, 3000)
+        deduplicator, unique = self.dedup(lines, 200000)
+        self.assertTrue(deduplicator.spilled)
+        self.assertEqual(unique, list(duplicate_engine.iter_unique(lines)))
+        self.assertEqual(deduplicator.total_lines, len(lines))
+        self.assertEqual(deduplicator.unique_lines, len(unique))
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_resplit_buckets(self):
+        lines = sample_lines(20000, 15000)
+        partition_lines = duplicate_files.ExternalDeduplicator._partition
+        with mock.patch.object(duplicate_files.ExternalDeduplicator, '_partition', autospec=True,
+                               side_effect=partition_lines) as partition:
+            deduplicator, unique = self.dedup(lines, 20000)
+        depths = {call.args[4] for call in partition.call_args_list}
+        self.assertGreater(len(depths), 1)
+        self.assertEqual(unique, list(duplicate_engine.iter_unique(lines)))
+
+    def test_bounded_survivor_merge(self):
+        lines = sample_lines(20000, 15000)
+        with mock.patch.object(duplicate_files, 'MAX_MERGE_RUNS', 4), \
+                mock.patch.object(duplicate_files, 'heapq', wraps=duplicate_files.heapq) as heapq:
+            deduplicator, unique = self.dedup(lines, 20000)
+        self.assertTrue(all(len(call.args) <= 4 for call in heapq.merge.call_args_list))
+        self.assertGreater(heapq.merge.call_count, 1)
+        self.assertEqual(unique, list(duplicate_engine.iter_unique(lines)))
+
+    def test_single_key_bucket_is_not_split_forever(self):
+        lines = ['same'] * 5000 + ['other']
+        deduplicator, unique = self.dedup(lines, 20000)
+        self.assertEqual(unique, ['same', 'other'])
+
+    def test_key_and_on_duplicate(self):
+        lines = [line.upper() if i % 2 else line for i, line in enumerate(sample_lines(5000, 500))] + ['', '']
+        removed = []
+        # Blank lines have no key and are never duplicates
+        deduplicator, unique = self.dedup(lines, 20000, key=lambda line: line.lower() or None,
+                                          on_duplicate=lambda _, line: removed.append(line))
+        self.assertTrue(deduplicator.spilled)
+        self.assertEqual(unique, list(duplicate_engine.iter_unique(lines, key=lambda line: line.lower() or None)))
+        self.assertEqual(len(unique) + len(removed), len(lines))
+        self.assertEqual(unique[-2:], ['', ''])
+
+    def test_spilled_merge_modes(self):
+        lines = ['' if i % 1000 == 0 else line for i, line in enumerate(sample_lines(20000, 3000))]
+        key = lambda line: line.lower() or None
+        for mode in duplicate_engine.MERGE_MODES:
+            with self.subTest(mode=mode):
+                merger = duplicate_files.ExternalDeduplicator(20000, key=key, tmp_dir=self.tmp_dir)
+                merged = list(merger.merge(lines, mode))
+                self.assertTrue(merger.spilled)
+                self.assertEqual(merged, duplicate_engine.merge_lines(lines, mode=mode, key=key))
+                self.assertEqual((merger.total_lines, merger.unique_lines), (len(lines), len(merged)))
+                self.assertEqual(os.listdir(self.tmp_dir), [])
+
+
+class AtomicWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'output.txt')
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write('old\n')
+
+    def read(self):
+        with open(self.path, encoding='utf-8') as file:
+            return file.read()
+
+    def assert_only_target_left(self):
+        self.assertEqual(os.listdir(self.tmp_dir), ['output.txt'])
+
+    def test_replaces_target(self):
+        digest = hashlib.sha256()
+        with duplicate_files.AtomicWriter(self.path, 'w', 'utf-8', digest=digest) as out:
+            out.write('new\n')
+            # Nothing is visible before the rename
+            self.assertEqual(self.read(), 'old\n')
+        self.assertEqual(self.read(), 'new\n')
+        self.assertEqual(digest.digest(), hashlib.sha256(b'new\n').digest())
+        self.assertEqual(out.stat.st_ino, os.stat(self.path).st_ino)
+        self.assert_only_target_left()
+
+    def test_discard(self):
+        with duplicate_files.AtomicWriter(self.path, 'w', 'utf-8') as out:
+            out.write('new\n')
+            out.discard()
+        self.assertEqual(self.read(), 'old\n')
+        self.assertIsNone(out.stat)
+        self.assert_only_target_left()
+
+    def test_exception_rolls_back(self):
+        with self.assertRaises(KeyError):
+            with duplicate_files.AtomicWriter(self.path, 'w', 'utf-8') as out:
+                out.write('new\n')
+                raise KeyError('interrupted')
+        self.assertEqual(self.read(), 'old\n')
+        self.assert_only_target_left()
+
+    def test_failed_rename_removes_temp_file(self):
+        with mock.patch.object(duplicate_files.os, 'replace', side_effect=PermissionError('busy')):
+            with self.assertRaises(PermissionError):
+                with duplicate_files.AtomicWriter(self.path, 'wb') as out:
+                    out.write(b'new\n')
+        self.assertEqual(self.read(), 'old\n')
+        self.assert_only_target_left()
+
+    @unittest.skipIf(os.name == 'nt', "POSIX permission bits")
+    def test_keeps_permission_bits(self):
+        os.chmod(self.path, 0o640)
+        with duplicate_files.AtomicWriter(self.path, 'w', 'utf-8') as out:
+            out.write('new\n')
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o640)
+        new_path = os.path.join(self.tmp_dir, 'new.txt')
+        with duplicate_files.AtomicWriter(new_path, 'wb') as out:
+            out.write(b'new\n')
+        self.assertEqual(stat.S_IMODE(os.stat(new_path).st_mode), 0o666 & ~duplicate_files._UMASK)
+
+
+class DedupFileJobTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'input.txt')
+        self.lines = sample_lines(20000, 3000)
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(self.lines) + '\n')
+
+    def expected_removed(self):
+        counts = {}
+        for line in self.lines:
+            counts[line] = counts.get(line, 0) + 1
+        return {line: count - 1 for line, count in counts.items() if count > 1}
+
+    def run_job(self, memory_limit):
+        removed_dir = os.path.join(self.tmp_dir, 'removed')
+        os.mkdir(removed_dir)
+        result = duplicate_files.dedup_file_job(self.path, memory_limit, encoding='utf-8', removed_dir=removed_dir)
+        rows = list(duplicate_files.iter_removed_counts(result.removed_path))
+        self.assertEqual(len(rows), len(dict(rows)), "every removed line is reported once")
+        self.assertEqual(dict(rows), self.expected_removed())
+        with open(self.path, encoding='utf-8') as file:
+            self.assertEqual(file.read().splitlines(), list(dict.fromkeys(self.lines)))
+        return result
+
+    def test_in_memory(self):
+        self.run_job(duplicate_files.DEFAULT_MEMORY_LIMIT)
+
+    def test_spilled(self):
+        with mock.patch.object(duplicate_files, '_fits_mapped', return_value=False):
+            self.run_job(100000)
+
+    def test_mapped(self):
+        with mock.patch.object(duplicate_files, 'REMOVED_COUNTS_BATCH', 100), \
+                mock.patch.object(duplicate_files, '_fits_mapped', return_value=True):
+            self.run_job(100000)
+
+    def assert_state_matches_file(self, result):
+        stat = os.stat(self.path)
+        self.assertEqual((result.content_hash, result.size, result.mtime_ns),
+                         (duplicate_manifest.file_state(self.path)[0], stat.st_size, stat.st_mtime_ns))
+
+    def test_hash_without_rereading(self):
+        for mapped in (False, True):
+            with self.subTest(mapped=mapped), mock.patch.object(duplicate_files, '_fits_mapped', return_value=mapped), \
+                    mock.patch.object(duplicate_manifest, 'file_state', side_effect=AssertionError("file read again")):
+                result = duplicate_files.dedup_file_job(self.path, encoding='utf-8', removed_dir=self.tmp_dir, hash_content=True)
+                os.remove(result.removed_path)
+            self.assert_state_matches_file(result)
+            # A second run finds nothing to remove and hashes the unchanged source
+            with mock.patch.object(duplicate_files, '_fits_mapped', return_value=mapped):
+                result = duplicate_files.dedup_file_job(self.path, encoding='utf-8', hash_content=True)
+            self.assertIsNone(result.removed_path)
+            self.assert_state_matches_file(result)
+            with open(self.path, 'w', encoding='utf-8') as file:
+                file.write('\n'.join(self.lines) + '\n')
+
+    def test_no_hash_without_manifest(self):
+        with mock.patch.object(duplicate_manifest, 'new_digest', side_effect=AssertionError("hashed")):
+            result = duplicate_files.dedup_file_job(self.path, encoding='utf-8', removed_dir=self.tmp_dir)
+        self.assertEqual((result.content_hash, result.size, result.mtime_ns), (None, None, None))
+
+    def test_known_hash_skips(self):
+        file_hash = duplicate_manifest.file_state(self.path)[0]
+        result = duplicate_files.dedup_file_job(self.path, encoding='utf-8', known_hash=file_hash)
+        self.assertTrue(result.skipped)
+        self.assert_state_matches_file(result)
+
+    def test_undecodable_bytes_pass_through(self):
+        for mapped in (False, True):
+            with open(self.path, 'wb') as file:
+                file.write(b'caf\xe9\nok\ncaf\xe9\n\xff\n')
+            with self.subTest(mapped=mapped), mock.patch.object(duplicate_files, '_fits_mapped', return_value=mapped):
+                duplicate_files.dedup_file(self.path, encoding='utf-8')
+                with open(self.path, 'rb') as file:
+                    self.assertEqual(file.read().split(os.linesep.encode()), [b'caf\xe9', b'ok', b'\xff', b''])
+
+    def test_no_duplicates(self):
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write('a\nb\n')
+        result = duplicate_files.dedup_file_job(self.path, encoding='utf-8', removed_dir=self.tmp_dir)
+        self.assertIsNone(result.removed_path)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), ['input.txt'])
+
+
+class ParallelDedupTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'input.txt')
+
+    def write_input(self, data):
+        with open(self.path, 'wb') as file:
+            file.write(data)
+
+    def expected(self, data):
+        lines = data.split(b'\n')
+        if data.endswith(b'\n'):
+            lines.pop()
+        return b''.join(line + b'\n' for line in dict.fromkeys(lines))
+
+    def run_phases(self, ranges, shards, memory_limit=duplicate_files.DEFAULT_MEMORY_LIMIT):
+        # The worker functions run in this process, so patched module constants apply
+        work_dir = tempfile.mkdtemp(dir=self.tmp_dir)
+        ranges = duplicate_files.line_aligned_ranges(self.path, ranges)
+        for range_index, (start, end) in enumerate(ranges):
+            duplicate_files._shard_range(self.path, start, end, shards, work_dir, range_index, memory_limit)
+        for shard in range(shards):
+            duplicate_files._dedup_shard(shard, len(ranges), work_dir, memory_limit)
+        output = b''
+        for range_index, (start, end) in enumerate(ranges):
+            part_path = os.path.join(work_dir, f"part-{range_index}")
+            duplicate_files._write_range(self.path, start, end, range_index, shards, work_dir, part_path)
+            with open(part_path, 'rb') as part:
+                output += part.read()
+            os.remove(part_path)
+        self.assertEqual(os.listdir(work_dir), [])
+        return output
+
+    def test_phases_across_chunks_and_ranges(self):
+        data = '\n'.join(sample_lines(5000, 800)).encode() + b'\n\n\nno newline'
+        self.write_input(data)
+        with mock.patch.object(duplicate_files, 'PARALLEL_CHUNK_SIZE', 1000):
+            for ranges, shards in ((1, 1), (3, 5), (7, 2)):
+                self.assertEqual(self.run_phases(ranges, shards), self.expected(data))
+
+    def test_phases_within_memory_limit(self):
+        data = '\n'.join(sample_lines(5000, 800)).encode() + b'\n'
+        self.write_input(data)
+        with mock.patch.object(duplicate_files, 'PARALLEL_CHUNK_SIZE', 1000), \
+                mock.patch.object(duplicate_files, '_split_shard_file', autospec=True,
+                                  side_effect=duplicate_files._split_shard_file) as split:
+            self.assertEqual(self.run_phases(3, 2, memory_limit=4000), self.expected(data))
+        self.assertTrue(split.called)
+
+    def test_crlf_lines_match_lf_lines(self):
+        data = b'a\r\nb\na\nb\r\nc\r\nc'
+        self.write_input(data)
+        for ranges, shards in ((1, 1), (3, 2)):
+            self.assertEqual(self.run_phases(ranges, shards), b'a\nb\nc\n')
+        self.write_input(b'c\nc\r')
+        self.assertEqual(self.run_phases(2, 2), b'c\n')
+
+    def test_process_pool(self):
+        data = '\n'.join(sample_lines(3000, 500)).encode() + b'\n'
+        self.write_input(data)
+        out_path = os.path.join(self.tmp_dir, 'output.txt')
+        total, unique = duplicate_files.parallel_dedup_file(self.path, out_path, workers=2)
+        with open(out_path, 'rb') as file:
+            self.assertEqual(file.read(), self.expected(data))
+        self.assertEqual(total, 3000)
+        self.assertEqual(unique, len(set(data.split(b'\n'))) - 1)
+
+    def test_empty_file(self):
+        self.write_input(b'')
+        out_path = os.path.join(self.tmp_dir, 'output.txt')
+        self.assertEqual(duplicate_files.parallel_dedup_file(self.path, out_path, workers=2), (0, 0))
+        self.assertEqual(os.path.getsize(out_path), 0)
+
+    def test_rejects_multibyte_newlines(self):
+        with self.assertRaises(ValueError):
+            duplicate_files.parallel_dedup(self.path, None, encoding='utf-16')
+
+
+if __name__ == '__main__':
+    unittest.main()
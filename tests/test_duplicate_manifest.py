@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import duplicate_manifest
+
+
+class BatchManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.manifest_path = os.path.join(self.tmp_dir, 'state', 'manifest.json')
+        self.path = os.path.join(self.tmp_dir, 'input.txt')
+        self.write('a\nb\n', mtime_ns=1_000_000_000)
+
+    def write(self, content, mtime_ns):
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def recorded(self, options='exact'):
+        manifest = duplicate_manifest.BatchManifest(self.manifest_path, options)
+        file_hash, size, mtime_ns = duplicate_manifest.file_state(self.path)
+        manifest.record(self.path, 2, 2, file_hash, size, mtime_ns)
+        manifest.save()
+        return duplicate_manifest.BatchManifest(self.manifest_path, options)
+
+    def test_unchanged_after_reload(self):
+        manifest = self.recorded()
+        self.assertEqual(os.listdir(os.path.dirname(self.manifest_path)), ['manifest.json'])
+        entry = manifest.unchanged(self.path)
+        self.assertEqual((entry['size'], entry['mtime_ns'], entry['total_lines']), (4, 1_000_000_000, 2))
+        # Entries are keyed by absolute path
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        os.chdir(self.tmp_dir)
+        self.assertIs(manifest.unchanged('input.txt'), entry)
+
+    def test_changed_size_or_mtime(self):
+        manifest = self.recorded()
+        file_hash = manifest.known_hash(self.path)
+        self.assertEqual(file_hash, duplicate_manifest.file_state(self.path)[0])
+        # Same size, new mtime: not unchanged, but the hash is still worth comparing
+        self.write('a\nc\n', mtime_ns=2_000_000_000)
+        self.assertIsNone(manifest.unchanged(self.path))
+        self.assertEqual(manifest.known_hash(self.path), file_hash)
+        # A new size rules the entry out without hashing
+        self.write('a\nb\nc\n', mtime_ns=1_000_000_000)
+        self.assertIsNone(manifest.unchanged(self.path))
+        self.assertIsNone(manifest.known_hash(self.path))
+        os.remove(self.path)
+        self.assertIsNone(manifest.unchanged(self.path))
+        self.assertIsNone(manifest.known_hash(self.path))
+
+    def test_touch_after_matching_hash(self):
+        manifest = self.recorded()
+        # Rewritten with the same content, so only the stat moved
+        self.write('a\nb\n', mtime_ns=3_000_000_000)
+        self.assertIsNone(manifest.unchanged(self.path))
+        file_hash, size, mtime_ns = duplicate_manifest.file_state(self.path)
+        self.assertEqual(manifest.known_hash(self.path), file_hash)
+        manifest.touch(self.path, size, mtime_ns)
+        manifest.save()
+        entry = duplicate_manifest.BatchManifest(self.manifest_path).unchanged(self.path)
+        self.assertEqual((entry['mtime_ns'], entry['hash'], entry['unique_lines']), (3_000_000_000, file_hash, 2))
+
+    def test_other_options_are_ignored(self):
+        self.recorded('exact')
+        manifest = duplicate_manifest.BatchManifest(self.manifest_path, 'ignore-case')
+        self.assertIsNone(manifest.unchanged(self.path))
+        self.assertIsNone(manifest.known_hash(self.path))
+        # Recording under the new options replaces the entry for both
+        manifest = self.recorded('ignore-case')
+        self.assertIsNotNone(manifest.unchanged(self.path))
+        self.assertIsNone(duplicate_manifest.BatchManifest(self.manifest_path, 'exact').unchanged(self.path))
+
+    def test_unreadable_or_old_manifest_starts_empty(self):
+        self.recorded()
+        for content in ('{not json', json.dumps({'version': duplicate_manifest.MANIFEST_VERSION + 1, 'files': {}})):
+            with self.subTest(content=content):
+                with open(self.manifest_path, 'w', encoding='utf-8') as file:
+                    file.write(content)
+                manifest = duplicate_manifest.BatchManifest(self.manifest_path)
+                self.assertEqual(manifest.entries, {})
+                self.assertIsNone(manifest.unchanged(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import duplicate_report
+
+
+class BatchReportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        for name, value in (('REPORT_PAGE_SIZE', 4), ('REPORT_CACHED_PAGES', 2)):
+            patcher = mock.patch.object(duplicate_report, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.report = duplicate_report.BatchReport()
+        self.addCleanup(self.report.close)
+
+    def add_rows(self, start, stop):
+        rows = [(f'file{i % 3}.txt', f'line {i}', i, "Removed") for i in range(start, stop)]
+        for row in rows:
+            self.report.add(*row)
+        return rows
+
+    def test_paging_after_later_adds(self):
+        rows = self.add_rows(0, 6)
+        # Caches the second page while it holds only two rows
+        self.assertEqual(self.report.row(5), rows[5])
+        rows += self.add_rows(6, 11)
+        self.assertEqual(len(self.report), 11)
+        self.assertEqual([self.report.row(i) for i in range(11)], rows)
+        # Reads move the file position; the next add must still append
+        rows += self.add_rows(11, 13)
+        self.assertEqual([self.report.row(i) for i in (12, 0, 11)], [rows[12], rows[0], rows[11]])
+        self.assertEqual(list(self.report), rows)
+
+    def test_least_recently_used_page_is_evicted(self):
+        rows = self.add_rows(0, 12)
+        with mock.patch.object(self.report, '_read_page', wraps=self.report._read_page) as read_page:
+            for index in (0, 4, 1, 8, 2):
+                self.assertEqual(self.report.row(index), rows[index])
+        # Page 0 was used again before page 2 came in, so page 1 went first
+        self.assertEqual([call.args[0] for call in read_page.call_args_list], [0, 1, 2])
+        self.assertEqual(list(self.report._pages), [2, 0])
+        with mock.patch.object(self.report, '_read_page', wraps=self.report._read_page) as read_page:
+            self.report.row(4)
+        read_page.assert_called_once_with(1)
+
+    def test_add_removed(self):
+        removed_path = os.path.join(self.tmp_dir, 'removed.jsonl')
+        with open(removed_path, 'wb') as file:
+            for line, count in (('a', 2), ('caf\udce9', 1)):
+                file.write(json.dumps([line, count]).encode('utf-8') + b'\n')
+        self.report.add('input.txt', '', 0, "Error")
+        self.report.add_removed('input.txt', removed_path)
+        self.assertEqual(list(self.report), [('input.txt', '', 0, "Error"), ('input.txt', 'a', 2, "Removed"),
+                                             ('input.txt', 'caf\udce9', 1, "Removed")])
+
+    def test_exports(self):
+        # The last row holds an undecodable byte, read with surrogateescape
+        rows = self.add_rows(0, 5) + [('dir/b, "c".txt', 'é,"quoted"\tline', 3, "Removed"), ('input.txt', 'caf\udce9', 1, "Removed")]
+        for row in rows[-2:]:
+            self.report.add(*row)
+        jsonl_path = os.path.join(self.tmp_dir, 'report.jsonl')
+        csv_path = os.path.join(self.tmp_dir, 'report.csv')
+        self.report.export_jsonl(jsonl_path)
+        self.report.export_csv(csv_path)
+        with open(jsonl_path, encoding='utf-8') as file:
+            self.assertEqual([tuple(json.loads(data)) for data in file], rows)
+        with open(csv_path, encoding='utf-8', errors='surrogateescape', newline='') as file:
+            exported = list(csv.reader(file))
+        self.assertEqual(exported[0], list(duplicate_report.REPORT_FIELDS))
+        self.assertEqual(exported[1:], [[file_path, line, str(count), action] for file_path, line, count, action in rows])
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), ['report.csv', 'report.jsonl'])
+
+    def test_close(self):
+        temporary_path = self.report.path
+        self.report.close()
+        self.assertFalse(os.path.exists(temporary_path))
+        path = os.path.join(self.tmp_dir, 'kept.jsonl')
+        report = duplicate_report.BatchReport(path)
+        report.add('input.txt', 'a', 1, "Removed")
+        report.close()
+        with open(path, encoding='utf-8') as file:
+            self.assertEqual(json.loads(file.read()), ['input.txt', 'a', 1, "Removed"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import random
+import unittest
+from unittest import mock
+
+import duplicate_similarity
+
+
+def brute_force_groups(lines, max_distance):
+    texts = list(dict.fromkeys(line for line in lines if line.strip()))
+    union_find = duplicate_similarity._UnionFind(len(texts))
+    for i, text in enumerate(texts):
+        for j in range(i):
+            if duplicate_similarity.levenshtein(texts[j], text) <= max_distance:
+                union_find.union(i, j)
+    positions = {text: i for i, text in enumerate(texts)}
+    return [None if not line.strip() else union_find.find(positions[line]) for line in lines]
+
+
+def partition(keys):
+    groups = {}
+    for position, line_key in enumerate(keys):
+        if line_key is not None:
+            groups.setdefault(line_key, []).append(position)
+    return sorted(groups.values()), [position for position, line_key in enumerate(keys) if line_key is None]
+
+
+class CloseKeysTest(unittest.TestCase):
+    def test_crowded_variants_still_match(self):
+        keys = duplicate_similarity.close_keys(['Pabcd', 'aPbcd', 'abPcd', 'abcPd', 'abcdP', 'abcdQ'], 1)
+        self.assertEqual(keys[4], keys[5])
+
+    def test_blank_lines_have_no_key(self):
+        self.assertEqual(duplicate_similarity.close_keys(['abc', '', '  ', 'abd'], 1), [0, None, None, 0])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(3)
+        for _ in range(200):
+            max_distance = rng.randint(1, 3)
+            lines = [''.join(rng.choice('ab') for _ in range(rng.randint(0, 7))) for _ in range(rng.randint(1, 30))]
+            self.assertEqual(partition(duplicate_similarity.close_keys(lines, max_distance)),
+                             partition(brute_force_groups(lines, max_distance)), (lines, max_distance))
+
+    def test_signature_bound_holds(self):
+        rng = random.Random(5)
+        masks = {}
+        for _ in range(500):
+            first = ''.join(rng.choice('ab.= ') for _ in range(rng.randint(0, 12)))
+            second = list(first)
+            for _ in range(rng.randint(0, 3)):
+                position = rng.randint(0, len(second))
+                edit = rng.choice('isd') if second else 'i'
+                if edit == 'i':
+                    second.insert(position, rng.choice('ab.= '))
+                else:
+                    position = min(position, len(second) - 1)
+                    if edit == 's':
+                        second[position] = rng.choice('ab.= ')
+                    else:
+                        del second[position]
+            second = ''.join(second)
+            difference = (duplicate_similarity._char_signature(first, masks)
+                          ^ duplicate_similarity._char_signature(second, masks)).bit_count()
+            self.assertLessEqual(difference, 2 * duplicate_similarity.levenshtein(first, second), (first, second))
+
+
+def seeded_near_duplicates(seed, bases=300, variants=2, length=40):
+    """Random lines, each followed somewhere by copies with one character replaced."""
+    rng = random.Random(seed)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz '
+    lines = []
+    for _ in range(bases):
+        base = [rng.choice(alphabet) for _ in range(length)]
+        lines.append(''.join(base))
+        for _ in range(variants):
+            variant = base[:]
+            variant[rng.randrange(length)] = rng.choice(alphabet)
+            lines.append(''.join(variant))
+    rng.shuffle(lines)
+    return lines
+
+
+class SimilarKeysTest(unittest.TestCase):
+    def setUp(self):
+        self.lines = seeded_near_duplicates(4)
+        self.hasher = duplicate_similarity.MinHasher()
+        self.texts = list(duplicate_similarity._distinct_texts(self.lines))
+        self.shingles = {text: self.hasher.shingles(text) for text in self.texts}
+
+    def similarity(self, first, second):
+        return duplicate_similarity.jaccard(self.shingles[first], self.shingles[second])
+
+    def test_recall_on_seeded_near_duplicates(self):
+        keys = dict(zip(self.lines, duplicate_similarity.similar_keys(self.lines, 0.8)))
+        texts = self.texts
+        pairs = [(first, second) for i, first in enumerate(texts) for second in texts[:i] if self.similarity(first, second) >= 0.8]
+        self.assertGreater(len(pairs), 300)
+        found = sum(keys[first] == keys[second] for first, second in pairs)
+        self.assertGreaterEqual(found / len(pairs), 0.95)
+
+    def test_confirmed_pairs_reach_threshold(self):
+        union = duplicate_similarity._UnionFind.union
+        with mock.patch.object(duplicate_similarity._UnionFind, 'union', autospec=True, side_effect=union) as confirmed:
+            duplicate_similarity.similar_keys(self.lines, 0.8)
+        self.assertTrue(confirmed.called)
+        for call in confirmed.call_args_list:
+            _, first, second = call.args
+            self.assertGreaterEqual(self.similarity(self.texts[first], self.texts[second]), 0.8)
+
+    def test_identical_lines_share_a_key(self):
+        keys = duplicate_similarity.similar_keys(['same line', 'other text entirely', 'same line'])
+        self.assertEqual(keys[0], keys[2])
+        self.assertNotEqual(keys[0], keys[1])
+
+
+class MinHasherTest(unittest.TestCase):
+    def test_signature_shape_and_determinism(self):
+        hasher = duplicate_similarity.MinHasher(num_perm=32)
+        signature = hasher.signature('the quick brown fox')
+        self.assertEqual(len(signature), 32)
+        self.assertEqual(signature, hasher.signature('the quick brown fox'))
+
+    def test_empty_bins_borrow_from_the_next_filled_bin(self):
+        hasher = duplicate_similarity.MinHasher(num_perm=16)
+        # A line no longer than a shingle has a single shingle, so one bin is filled
+        signature = hasher.signature('ab')
+        empty = duplicate_similarity._EMPTY_BIN
+        filled = [i for i, value in enumerate(signature) if value < empty]
+        self.assertEqual(len(filled), 1)
+        base = signature[filled[0]]
+        for i, value in enumerate(signature):
+            self.assertEqual(value, base + (filled[0] - i) % 16 * empty)
+        self.assertEqual(signature, hasher.signature('ab'))
+        self.assertNotEqual(signature, hasher.signature('ac'))
+
+    def test_agreement_estimates_jaccard(self):
+        hasher = duplicate_similarity.MinHasher(num_perm=256)
+        rng = random.Random(2)
+        for _ in range(5):
+            first = ''.join(rng.choice('abcdefghij') for _ in range(120))
+            second = first[:60] + ''.join(rng.choice('abcdefghij') for _ in range(60))
+            expected = duplicate_similarity.jaccard(hasher.shingles(first), hasher.shingles(second))
+            agreement = sum(a == b for a, b in zip(hasher.signature(first), hasher.signature(second))) / 256
+            self.assertAlmostEqual(agreement, expected, delta=0.15)
+
+
+class LshParametersTest(unittest.TestCase):
+    def test_bands_times_rows_is_num_perm(self):
+        for threshold in (0.3, 0.5, 0.8, 0.95):
+            for num_perm in (16, 64, 100, 128):
+                bands, rows = duplicate_similarity.lsh_parameters(threshold, num_perm)
+                self.assertEqual(bands * rows, num_perm)
+
+    def test_crossing_is_closest_to_threshold(self):
+        def crossing(bands, rows):
+            return (1.0 / bands) ** (1.0 / rows)
+        for threshold in (0.3, 0.5, 0.8, 0.95):
+            bands, rows = duplicate_similarity.lsh_parameters(threshold, 64)
+            best = min(abs(crossing(64 // r, r) - threshold) for r in range(1, 65) if 64 % r == 0)
+            self.assertAlmostEqual(abs(crossing(bands, rows) - threshold), best)
+        self.assertEqual(duplicate_similarity.lsh_parameters(0.8, 64), (8, 8))
+
+
+class LevenshteinTest(unittest.TestCase):
+    def test_bounded_distance(self):
+        self.assertEqual(duplicate_similarity.levenshtein('kitten', 'sitting'), 3)
+        self.assertEqual(duplicate_similarity.levenshtein('kitten', 'sitting', 1), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
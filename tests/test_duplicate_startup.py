@@ -0,0 +1,41 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import duplicate_startup
+
+try:
+    from PyQt5.QtCore import QCoreApplication, QSettings
+except ImportError:
+    QSettings = None
+
+
+class RegressionsTest(unittest.TestCase):
+    def test_slower_phases_beyond_tolerance(self):
+        baseline = {'phases.main_window': 100.0, 'phases.imports': 1.0, 'phases.tutorial': 50.0}
+        results = {'phases.main_window': 130.0, 'phases.imports': 1.9, 'phases.tutorial': 55.0, 'phases.new': 80.0}
+        # imports is below timer noise and new has no baseline
+        self.assertEqual(duplicate_startup.regressions(results, baseline, 0.2), [('phases.main_window', 100.0, 130.0)])
+
+
+@unittest.skipIf(QSettings is None, "PyQt5 is not installed")
+class WriteSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def read_session(self):
+        settings = QSettings(os.path.join(self.work_dir, duplicate_startup.SETTINGS_FILE), QSettings.IniFormat)
+        return settings.value("last_opened_files", [], type="QStringList")
+
+    def test_paths_read_back_through_qsettings(self):
+        for paths in ([], ['/data/one.txt'], ['/data/café1.txt', '/data/a "b", c\\d.txt', '/data/\U0001f600a/ß']):
+            with self.subTest(paths=paths):
+                duplicate_startup.write_session(self.work_dir, paths)
+                self.assertEqual(self.read_session(), paths)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import collections
+import os
+import random
+import unittest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+try:
+    from PyQt5.QtGui import QColor, QTextCharFormat, QTextCursor
+    from PyQt5.QtWidgets import QApplication
+except ImportError:
+    QApplication = None
+else:
+    import main
+
+
+@unittest.skipIf(QApplication is None, "PyQt5 is not installed")
+class LiveLinesTest(unittest.TestCase):
+    def setUp(self):
+        self.app = QApplication.instance() or QApplication([])
+        self.tab = main.DuplicateRemoverTabPage(None)
+        self.addCleanup(self.tab.deleteLater)
+        self.rng = random.Random(0)
+
+    def random_text(self):
+        pieces = ['a', 'b b', 'line 1', 'line 2', ' ', '\n', '\n\n']
+        return ''.join(self.rng.choice(pieces) for _ in range(self.rng.randrange(1, 6)))
+
+    def random_cursor(self, select=True):
+        document = self.tab.textEdit.document()
+        end = document.characterCount() - 1
+        cursor = QTextCursor(document)
+        start = self.rng.randrange(end + 1)
+        cursor.setPosition(start)
+        if select:
+            cursor.setPosition(self.rng.randrange(start, min(end, start + 30) + 1), QTextCursor.KeepAnchor)
+        return cursor
+
+    def edit(self):
+        text_edit = self.tab.textEdit
+        action = self.rng.choice(['insert', 'delete', 'replace', 'block', 'undo', 'undo', 'redo', 'format', 'set'])
+        if action == 'insert':
+            self.random_cursor(select=False).insertText(self.random_text())
+        elif action == 'delete':
+            self.random_cursor().removeSelectedText()
+        elif action == 'replace':
+            self.random_cursor().insertText(self.random_text())
+        elif action == 'block':
+            # Several edits undone and redone as one step
+            cursor = self.random_cursor(select=False)
+            cursor.beginEditBlock()
+            cursor.insertText(self.random_text())
+            cursor.movePosition(QTextCursor.Start)
+            cursor.movePosition(QTextCursor.NextCharacter, QTextCursor.KeepAnchor, self.rng.randrange(4))
+            cursor.removeSelectedText()
+            cursor.endEditBlock()
+        elif action == 'undo':
+            text_edit.undo()
+        elif action == 'redo':
+            text_edit.redo()
+        elif action == 'format':
+            # Formatting reports a change of the same number of characters removed and added
+            highlight = QTextCharFormat()
+            highlight.setBackground(QColor('yellow'))
+            blocks = text_edit.document().blockCount()
+            self.tab.highlight_lines(self.rng.sample(range(blocks), min(blocks, 3)), highlight)
+        elif self.rng.random() < 0.1:
+            self.tab.set_text_lines(self.rng.choice(['', 'x', 'line 1\nline 1', 'a\n\nb b\n']).split('\n'))
+        return action
+
+    def assert_mirrors_document(self, action):
+        document = self.tab.textEdit.document()
+        lines = [document.findBlockByNumber(number).text() for number in range(document.blockCount())]
+        live_lines = self.tab.live_lines
+        self.assertEqual(live_lines.lines, lines, action)
+        self.assertEqual(live_lines.counts, collections.Counter(lines), action)
+        self.assertEqual(live_lines.duplicate_count, len(lines) - len(set(lines)), action)
+        self.assertEqual(self.tab.word_count, sum(len(line.split()) for line in lines), action)
+
+    def test_random_edits_undo_and_redo(self):
+        self.tab.set_text_lines(['line 1', 'b b', 'line 1', ''])
+        self.assert_mirrors_document('set')
+        for _ in range(1500):
+            self.assert_mirrors_document(self.edit())
+        while self.tab.textEdit.document().isUndoAvailable():
+            self.tab.textEdit.undo()
+            self.assert_mirrors_document('undo')
+
+
+if __name__ == '__main__':
+    unittest.main()